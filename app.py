@@ -1,21 +1,48 @@
 import streamlit as st
-import base64
-from pathlib import Path
-from src.utils.snowflake_utils import init_snowflake_session
+import json
+from src.utils.snowflake_utils import init_snowflake_session, start_snowflake_warmup
 from src.handlers.stage_handlers import (
     handle_welcome_screen,
     handle_problem_definition,
     handle_data_collection,
     handle_analysis
 )
+from src.utils.search_cache import get_search_cache
+from src.utils.llm_cache import get_llm_cache
+from src.utils.context_packer import get_packing_stats
+from src.utils.reference_store import get_reference_store
+from src.utils.task_card_cache import start_task_card_warmup
+from src.utils.metrics import get_metrics
+from src.utils.renderer_utils import render_page_header
 from src.models.consulting_session import ConsultingSession
-from src.config.snowflake_config import MODEL_NAME, ADVANCED_FEATURES
-from src.config.business_config import BUSINESS_CONFIG
+from src.config.snowflake_config import MODEL_NAME, ADVANCED_FEATURES, METRICS_PANEL_REFRESH_SECONDS
+from src.config.business_config import BUSINESS_CONFIG, TASK_CARDS
 
-def get_base64_encoded_image(image_path):
-    """Get base64 encoded image data"""
-    with open(image_path, "rb") as img_file:
-        return base64.b64encode(img_file.read()).decode()
+@st.fragment(run_every=METRICS_PANEL_REFRESH_SECONDS)
+def render_metrics_panel():
+    """Live view of span latencies and counters, refreshed on its own"""
+    metrics = get_metrics()
+    snapshot = metrics.snapshot()
+    
+    spans = [
+        {
+            "span": name[:-len("_duration_seconds")],
+            **series["labels"],
+            "count": series["count"],
+            "mean_ms": round(series["mean"] * 1000, 1),
+            "p50_ms": series["p50"] * 1000,
+            "p95_ms": series["p95"] * 1000,
+        }
+        for name, entries in snapshot["histograms"].items() if name.endswith("_duration_seconds")
+        for series in entries
+    ]
+    if spans:
+        st.dataframe(spans, hide_index=True)
+    st.json(snapshot["gauges"])
+    st.json(snapshot["counters"], expanded=False)
+    
+    st.download_button("Prometheus metrics", metrics.prometheus_text(), file_name="consultant.prom")
+    st.download_button("JSON snapshot", json.dumps(snapshot, indent=2, default=str), file_name="metrics.json")
 
 def setup_page():
     """Setup page configuration and layout"""
@@ -23,66 +50,11 @@ def setup_page():
         page_title="MyTea Business Consultant",
     )        
     
-    # Get encoded logo
+    # Logo and CSS are rendered once per process
     try:
-        root_dir = Path(__file__).parent
-        logo_path = root_dir / "assets" / "hilm_logo5-removebg.png"
-        
-        if logo_path.exists():
-            encoded_logo = get_base64_encoded_image(logo_path)
-            
-            # Custom CSS with updated logo styling
-            st.markdown("""
-                <style>
-                /* Logo container */
-                .logo-container {
-                    position: fixed;
-                    top: 0.25rem;
-                    left: 0.25rem;
-                    padding: 0.5rem;
-                    background: white;
-                    z-index: 9999;
-                    border-radius: 7px;
-                    min-width: 200px;  /* Ensure minimum width */
-                    min-height: 160px;  /* Ensure minimum height */
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                }
-                
-                /* Logo image specific styling */
-                .logo-image {
-                    display: block;
-                    height: 120px;  /* Increased height */
-                    width: auto;
-                    object-fit: contain;
-                }
-                
-                /* Main content padding */
-                .block-container {
-                    padding-top: 3rem;  /* Increased to accommodate larger logo */
-                }
-                
-                /* Hide Streamlit's default menu button */
-                #MainMenu {visibility: hidden;}
-                footer {visibility: hidden;}
-                
-                /* Ensure logo container is visible */
-                div[data-testid="stAppViewContainer"] > div:first-child {
-                    z-index: auto;
-                }
-                </style>
-            """, unsafe_allow_html=True)
-            
-            # Add the logo container with more specific styling
-            st.markdown(f"""
-                <div class="logo-container">
-                    <img class="logo-image" 
-                         src="data:image/png;base64,{encoded_logo}" 
-                         alt="HILM Logo"
-                    >
-                </div>
-            """, unsafe_allow_html=True)
+        page_header = render_page_header(st.get_option("server.enableStaticServing"))
+        if page_header:
+            st.markdown(page_header, unsafe_allow_html=True)
         else:
             st.error("Logo file not found!")
         
@@ -92,36 +64,64 @@ def setup_page():
                     "Enable Debug Mode", 
                     value=st.session_state.get('advanced_features', False)
                 )
+                
+                with st.expander("Cache statistics", expanded=False):
+                    st.markdown("**Cortex Search**")
+                    st.json(get_search_cache().stats())
+                    llm_cache = get_llm_cache()
+                    if llm_cache:
+                        st.markdown("**LLM responses**")
+                        st.json(llm_cache.stats())
+                    st.markdown("**Reference documents**")
+                    st.json(get_reference_store().stats())
+                
+                with st.expander("Prompt context packing", expanded=False):
+                    st.json(get_packing_stats())
+                
+                with st.expander("Performance metrics", expanded=False):
+                    render_metrics_panel()
     except Exception as e:
         st.error(f"Error loading logo: {str(e)}")
 
 def main():
+    # Connect to Snowflake in the background so first paint doesn't wait on login
+    start_snowflake_warmup()
+    # Precompute the research agenda cards so opening one is instant
+    start_task_card_warmup(TASK_CARDS)
+    
     # Setup page configuration and logo
     setup_page()
     
-    # Initialize Snowflake session
     st.session_state.model_name = MODEL_NAME
     # Debug mode config
     st.session_state['advanced_features'] = ADVANCED_FEATURES
-
-    session = init_snowflake_session()
-    if not session:
-        st.error("Failed to initialize Snowflake connection")
-        st.stop()
     
     # Initialize session state if not exists
     if 'consulting_session' not in st.session_state:
         st.session_state.consulting_session = ConsultingSession()
     
-    # Handle different stages
+    # The welcome screen only needs Snowflake once a research item is opened,
+    # and the search helpers wait for the warm-up connection on their own
     if st.session_state.consulting_session.stage == "welcome":
-        handle_welcome_screen(session)
-    elif st.session_state.consulting_session.stage == "problem_definition":
-        handle_problem_definition(session)
-    elif st.session_state.consulting_session.stage == "data_collection":
-        handle_data_collection(session)
-    elif st.session_state.consulting_session.stage == "analysis":
-        handle_analysis(session)
+        with get_metrics().span("stage", stage="welcome"):
+            handle_welcome_screen(None)
+        return
+    
+    # Initialize Snowflake session
+    session = init_snowflake_session()
+    if not session:
+        st.error("Failed to initialize Snowflake connection")
+        st.stop()
+    
+    # Handle different stages
+    stage = st.session_state.consulting_session.stage
+    with get_metrics().span("stage", stage=stage):
+        if stage == "problem_definition":
+            handle_problem_definition(session)
+        elif stage == "data_collection":
+            handle_data_collection(session)
+        elif stage == "analysis":
+            handle_analysis(session)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,308 @@
+"""Offline stand-in for the Snowflake surface the app uses.
+
+Implements `Session.sql(...).collect()` for the statements the app issues
+(Cortex COMPLETE / TRY_COMPLETE / EMBED_TEXT_768, document fetches, the
+document fingerprint and health probes), the session connection's host and
+token, the streaming Cortex REST completion endpoint (see `serve_http`) and
+the Cortex Search `.search()` call on both services. Every call sleeps for a sampled latency and returns
+deterministic, plausibly shaped content whose size follows a configurable
+distribution, so benchmark runs are repeatable without a Snowflake account.
+"""
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+import requests
+from snowflake.snowpark import Row
+from src.config.snowflake_config import CORTEX_COMPLETE_ENDPOINT
+
+WORDS = (
+    "market tea beverage channel restaurant distribution pricing margin growth consumer "
+    "segment competitor share revenue volume retail online platform brand premium supply "
+    "demand analysis strategy customer region indonesia outlet partner contract logistics "
+    "forecast capacity cost profit survey trend adoption digital marketplace wholesale"
+).split()
+FAKE_HOST = "fake-account.snowflakecomputing.com"
+FAKE_TOKEN = "fake-session-token"
+# Words per server-sent event of a streamed completion
+STREAM_CHUNK_WORDS = 8
+
+_WORD_PATTERN = re.compile(r"\S+\s*")
+
+@dataclass
+class Distribution:
+    """Log-normal distribution given by its median and spread (sigma)"""
+    median: float
+    sigma: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        if self.sigma <= 0:
+            return self.median
+        return self.median * math.exp(rng.gauss(0.0, self.sigma))
+
+@dataclass
+class FakeSnowflakeProfile:
+    """Latencies (seconds) and response sizes (words) of the fake backend"""
+    complete_first_token: Distribution = field(default_factory=lambda: Distribution(0.3, 0.3))
+    complete_per_word: float = 0.0005
+    batch_overhead: Distribution = field(default_factory=lambda: Distribution(0.4, 0.2))
+    search: Distribution = field(default_factory=lambda: Distribution(0.12, 0.3))
+    embed: Distribution = field(default_factory=lambda: Distribution(0.05, 0.2))
+    document_fetch: Distribution = field(default_factory=lambda: Distribution(0.08, 0.2))
+    probe: Distribution = field(default_factory=lambda: Distribution(0.01))
+    connect: Distribution = field(default_factory=lambda: Distribution(0.5, 0.1))
+    completion_words: Distribution = field(default_factory=lambda: Distribution(250, 0.4))
+    section_count: int = 6
+    required_fields: int = 5
+    chunk_words: Distribution = field(default_factory=lambda: Distribution(120, 0.3))
+    document_words: Distribution = field(default_factory=lambda: Distribution(1500, 0.5))
+    num_documents: int = 40
+    latency_scale: float = 1.0
+
+class FakeSnowflake:
+    """Fake backend shared by all sessions and search services of a run"""
+
+    def __init__(self, profile: Optional[FakeSnowflakeProfile] = None, seed: int = 0):
+        self.profile = profile or FakeSnowflakeProfile()
+        self.seed = seed
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self._latency_rng = random.Random(seed)
+
+    # Factories for snowflake_utils.configure_backend
+    def create_session(self) -> "FakeSession":
+        self._wait("connect", self.profile.connect)
+        return FakeSession(self)
+
+    def search_service(self, name: str) -> "FakeSearchService":
+        return FakeSearchService(self, name)
+
+    def call_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.calls)
+
+    def _wait(self, kind: str, distribution: Distribution, extra: float = 0.0):
+        with self._lock:
+            self.calls[kind] += 1
+            delay = distribution.sample(self._latency_rng)
+        time.sleep((delay + extra) * self.profile.latency_scale)
+
+    def _rng(self, *key) -> random.Random:
+        """Deterministic generator for content keyed by the request"""
+        return random.Random(zlib.crc32(json.dumps([self.seed, *key]).encode("utf-8")))
+
+    @staticmethod
+    def _words(rng: random.Random, count: float) -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(max(1, int(count))))
+
+    def completion(self, model_name: str, prompt: str) -> str:
+        """A response shaped like what the prompt asks for"""
+        rng = self._rng("complete", model_name, prompt)
+        words = self.profile.completion_words.sample(rng)
+        if "List exactly what data points" in prompt:
+            return json.dumps({
+                f"metric_{i}": {
+                    "description": f"{self._words(rng, 4)} in USD millions",
+                    "type": "number" if i % 2 == 0 else "text",
+                    "required": True,
+                }
+                for i in range(self.profile.required_fields)
+            })
+        if '"found": true/false' in prompt:
+            return json.dumps({
+                "found": True,
+                "value": round(rng.uniform(1, 1000), 2),
+                "confidence": rng.choice(["HIGH", "MEDIUM", "LOW"]),
+                "source": self._words(rng, 20),
+                "explanation": self._words(rng, 40),
+            })
+        if "clear headers" in prompt:
+            per_section = words / self.profile.section_count
+            return "\n\n".join(
+                f"{'#' if i == 0 else '##'} {self._words(rng, 3).title()}\n{self._words(rng, per_section)}"
+                for i in range(self.profile.section_count)
+            )
+        return self._words(rng, words)
+
+    def complete(self, model_name: str, prompt: str, kind: str = "complete") -> str:
+        response = self.completion(model_name, prompt)
+        self._wait(kind, self.profile.complete_first_token, len(response.split()) * self.profile.complete_per_word)
+        return response
+
+    def stream_complete(self, model_name: str, prompt: str) -> Iterator[str]:
+        """The completion in chunks, the first after the first-token latency and the rest as generated"""
+        words = _WORD_PATTERN.findall(self.completion(model_name, prompt))
+        self._wait("stream_complete", self.profile.complete_first_token)
+        for i in range(0, len(words), STREAM_CHUNK_WORDS):
+            chunk = words[i:i + STREAM_CHUNK_WORDS]
+            if i:
+                time.sleep(len(chunk) * self.profile.complete_per_word * self.profile.latency_scale)
+            yield "".join(chunk)
+
+    @contextmanager
+    def serve_http(self):
+        """Answer HTTP requests to the fake account host from this backend.
+
+        Patches `requests.post` for the duration; requests to any other host
+        go out unchanged.
+        """
+        original_post = requests.post
+
+        def post(url, *args, **kwargs):
+            if not url.startswith(f"https://{FAKE_HOST}/"):
+                return original_post(url, *args, **kwargs)
+            return self._handle_post(url[len(f"https://{FAKE_HOST}"):], kwargs.get("json") or {}, kwargs.get("headers") or {})
+
+        requests.post = post
+        try:
+            yield self
+        finally:
+            requests.post = original_post
+
+    def _handle_post(self, path: str, body: Dict, headers: Dict) -> "FakeStreamResponse":
+        if headers.get("Authorization") != f'Snowflake Token="{FAKE_TOKEN}"':
+            return FakeStreamResponse(401, [])
+        if path != CORTEX_COMPLETE_ENDPOINT or not body.get("stream"):
+            return FakeStreamResponse(404, [])
+        return FakeStreamResponse(200, self.stream_complete(body["model"], body["messages"][-1]["content"]))
+
+    def embedding(self, text: str) -> List[float]:
+        self._wait("embed", self.profile.embed)
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        rng = random.Random(digest)
+        return [rng.uniform(-1, 1) for _ in range(768)]
+
+    def document(self, path: str) -> str:
+        rng = self._rng("document", path)
+        return self._words(rng, self.profile.document_words.sample(rng))
+
+    def search_results(self, service_name: str, query: str, columns: List[str], limit: int) -> List[Dict]:
+        self._wait(f"search:{service_name}", self.profile.search)
+        rng = self._rng("search", service_name, query)
+        results = []
+        for _ in range(limit):
+            doc_id = rng.randrange(self.profile.num_documents)
+            result = {
+                "chunk": self._words(rng, self.profile.chunk_words.sample(rng)),
+                "relative_path": f"case_{doc_id:03d}.pdf",
+                "category": "ALL",
+            }
+            results.append({column: result[column] for column in columns if column in result})
+        return results
+
+class FakeStreamResponse:
+    """`requests.Response` stand-in for a server-sent event stream of completion chunks"""
+
+    def __init__(self, status_code: int, chunks):
+        self.status_code = status_code
+        self._chunks = chunks
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} from fake Cortex endpoint", response=self)
+
+    def iter_lines(self, decode_unicode: bool = False) -> Iterator[str]:
+        for chunk in self._chunks:
+            yield "data: " + json.dumps({"choices": [{"delta": {"content": chunk}}]})
+            yield ""
+        yield "data: [DONE]"
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class FakeRestClient:
+    def __init__(self, token: str):
+        self.token = token
+
+class FakeConnection:
+    """Just enough of the Snowflake connector connection for REST calls"""
+
+    def __init__(self):
+        self.host = FAKE_HOST
+        self.rest = FakeRestClient(FAKE_TOKEN)
+
+def _completion_document(text: str) -> str:
+    """COMPLETE's result when called with an options object"""
+    return json.dumps({"choices": [{"messages": text}], "usage": {"completion_tokens": len(text.split())}})
+
+class FakeDataFrame:
+    def __init__(self, rows_factory):
+        self._rows_factory = rows_factory
+
+    def collect(self) -> List[Row]:
+        return self._rows_factory()
+
+class FakeSession:
+    """Snowpark session stand-in; unrecognized statements raise like a SQL error would"""
+
+    def __init__(self, backend: FakeSnowflake):
+        self._backend = backend
+        self.connection = FakeConnection()
+        self.closed = False
+
+    def sql(self, query: str, params: Optional[list] = None) -> FakeDataFrame:
+        return FakeDataFrame(lambda: self._execute(query, params or []))
+
+    def _execute(self, query: str, params: list) -> List[Row]:
+        backend = self._backend
+        normalized = " ".join(query.split()).lower()
+        if normalized == "select 1":
+            backend._wait("probe", backend.profile.probe)
+            return [Row(**{"1": 1})]
+        if "cortex.try_complete" in normalized and "flatten" in normalized:
+            model_name, prompts = params[0], json.loads(params[2])
+            backend._wait("batch_complete", backend.profile.batch_overhead)
+            return [
+                Row(IDX=i, RESPONSE=_completion_document(backend.complete(model_name, prompt, kind="batch_prompt")))
+                for i, prompt in enumerate(prompts)
+            ]
+        if "cortex.complete" in normalized:
+            prompt = json.loads(params[1])[-1]["content"]
+            return [Row(RESPONSE=_completion_document(backend.complete(params[0], prompt)))]
+        if "cortex.embed_text_768" in normalized:
+            return [Row(EMBEDDING=backend.embedding(params[1]))]
+        if "listagg" in normalized and "relative_path in" in normalized:
+            backend._wait("document_fetch", backend.profile.document_fetch)
+            return [Row(RELATIVE_PATH=path, FULL_DOCUMENT=backend.document(path)) for path in params]
+        if "hash_agg" in normalized:
+            backend._wait("document_fingerprint", backend.profile.document_fetch)
+            paths = [f"case_{i:03d}.pdf" for i in range(backend.profile.num_documents)]
+            return [Row(RELATIVE_PATH=path, FINGERPRINT=f"{zlib.crc32(path.encode())}:1") for path in paths]
+        raise ValueError(f"Fake Snowflake does not support statement: {normalized[:200]}")
+
+    def close(self):
+        self.closed = True
+
+class FakeSearchResponse:
+    def __init__(self, results: List[Dict]):
+        self.results = results
+
+    def model_dump_json(self) -> str:
+        return json.dumps({"results": self.results})
+
+    def json(self) -> str:
+        return self.model_dump_json()
+
+class FakeSearchService:
+    """Cortex Search service stand-in"""
+
+    def __init__(self, backend: FakeSnowflake, name: str):
+        self._backend = backend
+        self.name = name
+
+    def search(self, query: str, columns: List[str], filter: Optional[Dict] = None, limit: int = 10) -> FakeSearchResponse:
+        return FakeSearchResponse(self._backend.search_results(self.name, query, columns, limit))
@@ -0,0 +1,396 @@
+"""Concurrent-user load test against the offline Snowflake stand-in.
+
+Simulates many consultations at once in a single process, as a Streamlit
+server would host them: every user is its own AppTest session walking
+welcome -> problem_definition -> data_collection -> analysis, with think time
+between steps, while module globals (session pool, job runner, caches) are
+shared. Reports throughput, per-stage latency percentiles, memory per
+session and any cross-session state corruption.
+
+Every user's question carries a unique marker (LT-0007). The fake backend
+echoes the markers it sees in a prompt into its response, and the data a
+user types is tagged the same way, so a session holding another user's
+marker, or missing its own, was given someone else's state.
+
+The simulated server runs in a subprocess whose working directory is a fresh
+temporary directory, so every cache and log written under data/ starts empty
+and stays out of the caller's tree, including files background threads
+write after the run.
+
+Usage, from the repository root:
+
+    python -m benchmarks.load_test --users 50
+    python -m benchmarks.load_test --users 200 --ramp-up 60 --output load.json
+"""
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from benchmarks.fake_snowflake import FakeSnowflake, FakeSnowflakeProfile, Distribution
+from benchmarks.run_benchmarks import APP_PATH, ROOT, _check, _click, _reload
+
+STAGES = ("welcome", "problem_definition", "data_collection", "analysis")
+MARKER_PATTERN = re.compile(r"\bLT-\d{4}\b")
+QUESTION_TEMPLATE = (
+    "[{marker}] Should we launch a premium bottled tea line for convenience stores in {city}, "
+    "and what market share could we capture in the first two years?"
+)
+CITIES = ("Jakarta", "Surabaya", "Bandung", "Medan", "Semarang", "Makassar", "Denpasar", "Palembang")
+
+def user_marker(user_id: int) -> str:
+    return f"LT-{user_id:04d}"
+
+class TracingFakeSnowflake(FakeSnowflake):
+    """Fake backend that echoes user markers and tracks calls in flight"""
+
+    def __init__(self, profile: Optional[FakeSnowflakeProfile] = None, seed: int = 0):
+        super().__init__(profile, seed)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def _wait(self, kind: str, distribution: Distribution, extra: float = 0.0):
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            super()._wait(kind, distribution, extra)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def completion(self, model_name: str, prompt: str) -> str:
+        response = super().completion(model_name, prompt)
+        markers = " ".join(sorted(set(MARKER_PATTERN.findall(prompt))))
+        if not markers:
+            return response
+        if not response.startswith("{"):
+            return f"{response}\n\nRef: {markers}"
+        data = json.loads(response)
+        if "found" in data:
+            data["source"] = f"{data['source']} ({markers})"
+        else:
+            for details in data.values():
+                details["description"] = f"{details['description']} ({markers})"
+        return json.dumps(data)
+
+@contextmanager
+def shared_runtime():
+    """Give every AppTest in the process one Streamlit runtime.
+
+    AppTest installs a fresh mock runtime at the start of each script run and
+    removes it at the end, which is fine for one test at a time but pulls the
+    runtime out from under any other session mid-run. It also compiles the
+    script anew for every session, and concurrent compiles can fail spuriously
+    on Python 3.11 ("AST constructor recursion depth mismatch"). Pinning one
+    runtime and one script cache makes the sessions share compiled code,
+    media and st.cache storage, like the sessions of one real server do.
+    """
+    from unittest.mock import MagicMock
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import local_script_runner
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    script_cache = ScriptCache()
+    original_instance, original_exists = Runtime.__dict__["instance"], Runtime.__dict__["exists"]
+    Runtime.instance = classmethod(lambda cls: runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+    local_script_runner.ScriptCache = lambda: script_cache
+    try:
+        yield runtime
+    finally:
+        Runtime.instance, Runtime.exists = original_instance, original_exists
+        local_script_runner.ScriptCache = ScriptCache
+
+def _walk(obj, seen: Set[int]):
+    """Yield every object reachable through containers and plain attributes"""
+    if id(obj) in seen:
+        return
+    seen.add(id(obj))
+    yield obj
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            yield from _walk(key, seen)
+            yield from _walk(value, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            yield from _walk(item, seen)
+    elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+        yield from _walk(vars(obj), seen)
+
+def session_size(state: Dict) -> int:
+    """Approximate bytes held by one session's state"""
+    return sum(sys.getsizeof(obj) for obj in _walk(state, set()))
+
+def find_corruption(user_id: int, question: str, state: Dict, entered: Dict) -> List[str]:
+    """Describe every way a finished session holds state that is not its own"""
+    marker = user_marker(user_id)
+    problems = []
+    foreign = {
+        found for obj in _walk(state, set()) if isinstance(obj, str)
+        for found in MARKER_PATTERN.findall(obj)
+    } - {marker}
+    if foreign:
+        problems.append(f"holds markers of other sessions: {', '.join(sorted(foreign))}")
+
+    consulting_session = state.get("consulting_session")
+    if consulting_session is None:
+        return problems + ["no consulting session"]
+    if consulting_session.current_problem != question:
+        problems.append("current problem belongs to another session")
+    if consulting_session.stage != "analysis":
+        problems.append(f"ended in stage {consulting_session.stage}")
+    framework_text = " ".join(section["content"] for section in consulting_session.framework_sections or [])
+    if marker not in framework_text:
+        problems.append("framework was not generated for this session")
+    if marker not in (state.get("analysis_response") or ""):
+        problems.append("analysis was not generated for this session")
+    collected = consulting_session.collected_data or {}
+    for field, value in entered.items():
+        if collected.get(field) != value:
+            problems.append(f"collected {field}={collected.get(field)!r}, entered {value!r}")
+    return problems
+
+class SimulatedUser:
+    """One consultation, driven step by step with think time in between"""
+
+    def __init__(self, user_id: int, think_time: float, timeout: float, seed: int):
+        self.user_id = user_id
+        self.question = QUESTION_TEMPLATE.format(marker=user_marker(user_id), city=CITIES[user_id % len(CITIES)])
+        self.think_time = think_time
+        self.timeout = timeout
+        self.rng = random.Random(seed * 100003 + user_id)
+        self.latencies: Dict[str, float] = {}
+        self.entered: Dict = {}
+        self.error: Optional[str] = None
+        self.failed_stage: Optional[str] = None
+        self.corruption: List[str] = []
+        self.state_bytes = 0
+        self.app = None
+
+    def _think(self):
+        if self.think_time > 0:
+            time.sleep(self.rng.expovariate(1 / self.think_time))
+
+    @contextmanager
+    def _stage(self, name: str):
+        self.failed_stage = name
+        start = time.perf_counter()
+        yield
+        self.latencies[name] = time.perf_counter() - start
+
+    def _fill_data(self, at):
+        marker = user_marker(self.user_id)
+        for number_input in at.number_input:
+            if number_input.key and number_input.key.startswith("input_"):
+                value = float(1000 + self.user_id)
+                number_input.set_value(value)
+                self.entered[number_input.key[len("input_"):]] = value
+        for text_input in at.text_input:
+            if text_input.key and text_input.key.startswith("input_"):
+                value = f"{marker} entered value"
+                text_input.set_value(value)
+                self.entered[text_input.key[len("input_"):]] = value
+
+    def run(self):
+        from streamlit.testing.v1 import AppTest
+
+        try:
+            with self._stage("welcome"):
+                at = AppTest.from_file(str(APP_PATH), default_timeout=self.timeout)
+                at.run()
+                _check(at, "welcome")
+            self._think()
+
+            at.text_input[0].input(self.question)
+            with self._stage("problem_definition"):
+                _click(at, "Start Analysis", "problem_definition")
+            at = _reload(at, self.timeout)
+            self._think()
+
+            with self._stage("data_collection"):
+                _click(at, "Proceed to Data Collection", "data_collection")
+            at = _reload(at, self.timeout)
+            self._think()
+
+            self._fill_data(at)
+            with self._stage("analysis"):
+                _click(at, "Submit Data", "analysis")
+            self.failed_stage = None
+
+            state = dict(at.session_state.filtered_state)
+            self.corruption = find_corruption(self.user_id, self.question, state, self.entered)
+            self.state_bytes = session_size(state)
+            # Keep the session alive until every user is done, as open browser tabs would
+            self.app = at
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            if not isinstance(e, RuntimeError):
+                traceback.print_exc()
+
+def _rss_kb() -> Optional[int]:
+    """Resident set size of this process in KB, where /proc is available"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    import resource
+    return pages * resource.getpagesize() // 1024
+
+def _percentiles(values: List[float]) -> Dict:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    rank = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        "count": len(ordered),
+        "p50": round(statistics.median(ordered), 3),
+        "p95": round(rank(0.95), 3),
+        "p99": round(rank(0.99), 3),
+        "max": round(ordered[-1], 3),
+    }
+
+def run_load_test(users: int, ramp_up: float, think_time: float, timeout: float, seed: int, profile_overrides: Dict) -> Dict:
+    """Run `users` concurrent consultations and summarize them"""
+    sys.path.insert(0, str(ROOT))
+    from src.utils.snowflake_utils import configure_backend
+
+    backend = TracingFakeSnowflake(FakeSnowflakeProfile(**profile_overrides), seed=seed)
+    configure_backend(backend.create_session, backend.search_service)
+    simulated = [SimulatedUser(user_id, think_time, timeout, seed) for user_id in range(users)]
+    rss_before = _rss_kb()
+    start = time.perf_counter()
+    try:
+        with shared_runtime(), backend.serve_http():
+            threads = []
+            for i, user in enumerate(simulated):
+                thread = threading.Thread(target=user.run, name=f"load-user-{user.user_id}", daemon=True)
+                thread.start()
+                threads.append(thread)
+                if ramp_up and i < users - 1:
+                    time.sleep(ramp_up / users)
+            for thread in threads:
+                thread.join()
+        elapsed = time.perf_counter() - start
+        rss_after = _rss_kb()
+    finally:
+        configure_backend()
+
+    completed = [user for user in simulated if user.error is None]
+    stage_runs = sum(len(user.latencies) for user in simulated)
+    failures = {}
+    for user in simulated:
+        if user.error:
+            failures.setdefault(user.failed_stage or "setup", []).append(f"user {user.user_id}: {user.error}")
+    state_sizes = [user.state_bytes for user in completed]
+    return {
+        "users": users,
+        "completed": len(completed),
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput": {
+            "consultations_per_minute": round(len(completed) / elapsed * 60, 2),
+            "stage_runs_per_second": round(stage_runs / elapsed, 2),
+        },
+        "latency_seconds": {
+            stage: _percentiles([user.latencies[stage] for user in simulated if stage in user.latencies])
+            for stage in STAGES
+        },
+        "memory": {
+            "session_state_kb_mean": round(statistics.mean(state_sizes) / 1024, 1) if state_sizes else None,
+            "session_state_kb_max": round(max(state_sizes) / 1024, 1) if state_sizes else None,
+            "rss_growth_kb_per_session": (rss_after - rss_before) // users if rss_before and rss_after else None,
+            "rss_kb": rss_after,
+        },
+        "backend": {
+            "calls": backend.call_counts(),
+            "peak_in_flight": backend.peak_in_flight,
+        },
+        "failures": failures,
+        "corruption": {
+            f"user {user.user_id}": user.corruption for user in completed if user.corruption
+        },
+    }
+
+def print_report(report: Dict):
+    print(f"{report['completed']}/{report['users']} consultations completed in {report['elapsed_seconds']}s "
+          f"({report['throughput']['consultations_per_minute']}/min, "
+          f"{report['throughput']['stage_runs_per_second']} stage runs/s)")
+    print(f"\n{'stage':<20} {'runs':>6} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'max s':>8}")
+    for stage, latency in report["latency_seconds"].items():
+        if latency["count"]:
+            print(f"{stage:<20} {latency['count']:>6} {latency['p50']:>8.2f} {latency['p95']:>8.2f} "
+                  f"{latency['p99']:>8.2f} {latency['max']:>8.2f}")
+    memory = report["memory"]
+    print(f"\nsession state: {memory['session_state_kb_mean']} KB mean, {memory['session_state_kb_max']} KB max; "
+          f"RSS growth {memory['rss_growth_kb_per_session']} KB/session, {memory['rss_kb']} KB total")
+    print(f"backend: {report['backend']['peak_in_flight']} calls in flight at peak, "
+          f"{json.dumps(report['backend']['calls'], sort_keys=True)}")
+    for stage, errors in report["failures"].items():
+        print(f"\n{len(errors)} failed in {stage}:")
+        for error in errors[:5]:
+            print(f"  {error}")
+    if report["corruption"]:
+        print(f"\nCross-session corruption in {len(report['corruption'])} sessions:")
+        for user, problems in report["corruption"].items():
+            print(f"  {user}: {'; '.join(problems)}")
+
+def _run_in_subprocess(args) -> Dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        output_path = Path(workdir) / "report.json"
+        command = [
+            sys.executable, "-m", "benchmarks.load_test", "--worker", str(output_path),
+            "--users", str(args.users), "--ramp-up", str(args.ramp_up), "--think-time", str(args.think_time),
+            "--timeout", str(args.timeout), "--seed", str(args.seed), "--latency-scale", str(args.latency_scale),
+        ]
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")]))}
+        # Fresh working directory, so cache files under data/ start empty
+        subprocess.run(command, cwd=workdir, env=env, check=True)
+        return json.loads(output_path.read_text())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=50, help="Concurrent consultations")
+    parser.add_argument("--ramp-up", type=float, default=10, help="Seconds over which users arrive")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Mean pause between a user's steps, in seconds")
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds allowed per script run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiply all fake backend latencies")
+    parser.add_argument("--output", type=Path, help="Also write the report as JSON to this path")
+    parser.add_argument("--worker", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        report = run_load_test(
+            args.users, args.ramp_up, args.think_time, args.timeout, args.seed,
+            {"latency_scale": args.latency_scale}
+        )
+        args.worker.write_text(json.dumps(report))
+        return
+
+    report = _run_in_subprocess(args)
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    if report["failures"] or report["corruption"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""End-to-end latency benchmarks against the offline Snowflake stand-in.
+
+Drives app.py through every stage with Streamlit's AppTest harness, backed
+by benchmarks.fake_snowflake, and reports per-stage wall time, backend call
+counts and peak Python memory. Each repeat runs in a fresh process and
+working directory so on-disk caches start cold. The per-stage medians are
+compared with a baseline, and the run fails if a tracked metric regresses by
+more than the threshold. Backend call counts are compared as is, except
+new connections, which depend on how the session pool's timing works out
+and are tracked separately with some slack; wall time
+is compared after scaling the baseline by how much slower this host runs a
+fixed calibration workload than the host that recorded it, so a slower CI
+machine does not fail on speed alone.
+
+Usage, from the repository root:
+
+    python -m benchmarks.run_benchmarks                    # compare with benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --update-baseline  # record a new baseline
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+APP_PATH = ROOT / "app.py"
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+TRACKED_METRICS = ("wall_seconds", "backend_calls", "connections", "peak_memory_kb")
+# Backend calls whose count depends on pool timing rather than on the code path
+CONNECTION_CALLS = ("connect",)
+CALIBRATION_ROUNDS = 5
+# Differences below these are noise regardless of the relative threshold
+ABSOLUTE_TOLERANCE = {"wall_seconds": 0.25, "backend_calls": 0, "connections": 2, "peak_memory_kb": 512}
+CUSTOM_QUERY = (
+    "Should we launch a premium bottled tea line for convenience stores in Jakarta, "
+    "and what market share could we capture in the first two years?"
+)
+
+class StageRecorder:
+    """Collects wall time, backend calls and peak memory per stage"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.results = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        calls_before = self.backend.call_counts()
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        yield
+        wall_seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        calls_after = self.backend.call_counts()
+        calls = {
+            kind: count - calls_before.get(kind, 0)
+            for kind, count in calls_after.items()
+            if count - calls_before.get(kind, 0)
+        }
+        self.results[name] = {
+            "wall_seconds": round(wall_seconds, 3),
+            "backend_calls": sum(count for kind, count in calls.items() if kind not in CONNECTION_CALLS),
+            "connections": sum(count for kind, count in calls.items() if kind in CONNECTION_CALLS),
+            "peak_memory_kb": peak // 1024,
+            "calls": calls,
+        }
+
+def _check(at, stage: str):
+    if at.exception:
+        raise RuntimeError(f"{stage} raised: {at.exception[0].value}")
+    if at.error:
+        raise RuntimeError(f"{stage} reported an error: {at.error[0].value}")
+    if not at.main.children:
+        # A script that fails to compile renders nothing and raises nothing
+        raise RuntimeError(f"{stage} rendered an empty page")
+
+def _click(at, label: str, stage: str):
+    buttons = [button for button in at.button if button.label == label]
+    if not buttons:
+        raise RuntimeError(f"{stage}: no '{label}' button on the page")
+    buttons[0].click()
+    at.run()
+    _check(at, stage)
+
+def _reload(at, timeout: float):
+    """Continue the same session in a fresh AppTest.
+
+    AppTest builds its element tree from every message of a run, so after an
+    st.rerun() it keeps widgets the browser would have dropped, and the next
+    interaction trips over their missing state. A fresh instance holding the
+    same session state renders only the current page. Reloads happen between
+    stages and are not measured.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    fresh = AppTest.from_file(str(APP_PATH), default_timeout=timeout)
+    for key, value in at.session_state.filtered_state.items():
+        fresh.session_state[key] = value
+    fresh.run()
+    _check(fresh, "reload")
+    return fresh
+
+def _wait_for_task_cards(timeout: float):
+    from src.utils.task_card_cache import get_task_card_cache
+    from src.config.business_config import TASK_CARDS
+    from src.config.snowflake_config import MODEL_NAME
+
+    cache = get_task_card_cache()
+    deadline = time.monotonic() + timeout
+    while cache and cache.stale_tasks(TASK_CARDS, MODEL_NAME) and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+def calibrate() -> float:
+    """Seconds this host takes for a fixed CPU workload similar to a script run (best of several)"""
+    source = APP_PATH.read_text()
+    payload = {"sections": [{"title": f"Section {i}", "content": source[:2000]} for i in range(50)]}
+    timings = []
+    for _ in range(CALIBRATION_ROUNDS):
+        start = time.perf_counter()
+        for _ in range(100):
+            compile(source, str(APP_PATH), "exec")
+            json.loads(json.dumps(payload))
+        timings.append(time.perf_counter() - start)
+    return round(min(timings), 4)
+
+def _run_scenarios(recorder: StageRecorder, timeout: float):
+    """Drive one consultation through every stage, recording each"""
+    from streamlit.testing.v1 import AppTest
+
+    # The task card warm-up runs in the background from the first page
+    # load, so it is measured together with it
+    with recorder.stage("startup"):
+        at = AppTest.from_file(str(APP_PATH), default_timeout=timeout)
+        at.run()
+        _check(at, "startup")
+        _wait_for_task_cards(timeout)
+
+    with recorder.stage("problem_definition"):
+        at.text_input[0].input(CUSTOM_QUERY)
+        _click(at, "Start Analysis", "problem_definition")
+    at = _reload(at, timeout)
+
+    with recorder.stage("data_collection"):
+        _click(at, "Proceed to Data Collection", "data_collection")
+    at = _reload(at, timeout)
+
+    for number_input in at.number_input:
+        if not number_input.value:
+            number_input.set_value(1.0)
+    for text_input in at.text_input:
+        if not text_input.value:
+            text_input.set_value("benchmark")
+    with recorder.stage("analysis"):
+        _click(at, "Submit Data", "analysis")
+    at = _reload(at, timeout)
+
+    _click(at, "Start New Consultation", "restart")
+    at = _reload(at, timeout)
+    with recorder.stage("task_card_problem_definition"):
+        _click(at, "Continue Research", "task_card_problem_definition")
+
+def run_once(profile_overrides: Dict, seed: int, timeout: float) -> Dict:
+    """Run every scenario once in the current process"""
+    sys.path.insert(0, str(ROOT))
+    from benchmarks.fake_snowflake import FakeSnowflake, FakeSnowflakeProfile
+    from src.utils.snowflake_utils import configure_backend
+
+    backend = FakeSnowflake(FakeSnowflakeProfile(**profile_overrides), seed=seed)
+    configure_backend(backend.create_session, backend.search_service)
+    recorder = StageRecorder(backend)
+    tracemalloc.start()
+    try:
+        with backend.serve_http():
+            _run_scenarios(recorder, timeout)
+    finally:
+        tracemalloc.stop()
+        configure_backend()
+    return {"calibration_seconds": calibrate(), "stages": recorder.results}
+
+def _run_in_subprocess(args) -> Dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        output_path = Path(workdir) / "result.json"
+        command = [
+            sys.executable, "-m", "benchmarks.run_benchmarks", "--worker", str(output_path),
+            "--seed", str(args.seed), "--timeout", str(args.timeout),
+            "--latency-scale", str(args.latency_scale),
+        ]
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")]))}
+        # Fresh working directory, so cache files under data/ start empty
+        subprocess.run(command, cwd=workdir, env=env, check=True)
+        return json.loads(output_path.read_text())
+
+def summarize(runs: List[Dict]) -> Dict:
+    """Per-stage medians of the tracked metrics across repeats"""
+    stages = {}
+    for stage in runs[0]["stages"]:
+        stages[stage] = {
+            metric: statistics.median(run["stages"][stage][metric] for run in runs)
+            for metric in TRACKED_METRICS
+        }
+        stages[stage]["calls"] = runs[0]["stages"][stage]["calls"]
+    return {
+        "calibration_seconds": statistics.median(run["calibration_seconds"] for run in runs),
+        "stages": stages,
+    }
+
+def host_slowdown(summary: Dict, baseline: Dict) -> float:
+    """How much slower this host ran the calibration than the baseline host did, at least 1"""
+    previous = baseline.get("calibration_seconds")
+    if not previous:
+        return 1.0
+    return max(1.0, summary["calibration_seconds"] / previous)
+
+def compare(summary: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Describe every tracked metric that regressed past the threshold"""
+    regressions = []
+    slowdown = host_slowdown(summary, baseline)
+    for stage, metrics in summary["stages"].items():
+        for metric in TRACKED_METRICS:
+            previous = baseline.get("stages", {}).get(stage, {}).get(metric)
+            if previous is None:
+                continue
+            if metric == "wall_seconds":
+                previous = round(previous * slowdown, 3)
+            current = metrics[metric]
+            if current > previous * (1 + threshold) and current - previous > ABSOLUTE_TOLERANCE[metric]:
+                regressions.append(f"{stage}.{metric}: {previous} -> {current} (+{(current / previous - 1) if previous else float('inf'):.0%})")
+    return regressions
+
+def print_report(summary: Dict, baseline: Dict):
+    print(
+        f"calibration: {summary['calibration_seconds']}s, baseline {baseline.get('calibration_seconds', '-')}s "
+        f"(wall time baselines scaled by {host_slowdown(summary, baseline):.2f})"
+    )
+    print(f"{'stage':<30} {'wall s':>8} {'base':>8} {'calls':>6} {'base':>6} {'peak KB':>9} {'base':>9}")
+    for stage, metrics in summary["stages"].items():
+        base = baseline.get("stages", {}).get(stage, {})
+        print(
+            f"{stage:<30} {metrics['wall_seconds']:>8.2f} {base.get('wall_seconds', '-'):>8} "
+            f"{metrics['backend_calls']:>6} {base.get('backend_calls', '-'):>6} "
+            f"{metrics['peak_memory_kb']:>9} {base.get('peak_memory_kb', '-'):>9}"
+        )
+        print(f"{'':<30} {json.dumps(metrics['calls'], sort_keys=True)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark; medians are reported")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative regression per metric")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--output", type=Path, help="Also write the results as JSON to this path")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds allowed per script run")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiply all fake backend latencies")
+    parser.add_argument("--worker", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        results = run_once({"latency_scale": args.latency_scale}, args.seed, args.timeout)
+        args.worker.write_text(json.dumps(results))
+        return
+
+    runs = [_run_in_subprocess(args) for _ in range(args.repeat)]
+    summary = summarize(runs)
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    print_report(summary, baseline)
+
+    if args.output:
+        args.output.write_text(json.dumps(summary, indent=2))
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(summary, indent=2) + "\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    regressions = compare(summary, baseline, args.threshold)
+    if regressions:
+        print("\nRegressions beyond threshold:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -8,11 +8,97 @@ CORTEX_SEARCH_DATABASE = "CC_QUICKSTART_CORTEX_SEARCH_DOCS"
 CORTEX_SEARCH_SCHEMA = "DATA"
 CORTEX_SEARCH_SERVICE_CONSULTING = "CC_SEARCH_SERVICE_CS_CONSULTING"
 CORTEX_SEARCH_SERVICE_WEBPAGES = "CC_SEARCH_SERVICE_CS_WEBPAGES"
+DOCS_CHUNKS_TABLE_CONSULTING = f"{CORTEX_SEARCH_DATABASE}.{CORTEX_SEARCH_SCHEMA}.DOCS_CHUNKS_TABLE_CONSULTING"
+DOCS_CHUNKS_TABLE_WEBPAGES = f"{CORTEX_SEARCH_DATABASE}.{CORTEX_SEARCH_SCHEMA}.DOCS_CHUNKS_TABLE_WEBPAGES"
+# Column used to order chunks inside a document. The quickstart chunks table has
+# no sequence column, so set this once one is added (e.g. "CHUNK_INDEX").
+DOCS_CHUNK_ORDER_COLUMN = None
+DOCS_FETCH_BATCH_SIZE = 500
+# Optional local memory-mapped snapshot of the consulting chunks table
+DOCUMENT_STORE_ENABLED = False
+DOCUMENT_STORE_DIR = "data/documents"
+DOCUMENT_STORE_REFRESH_SECONDS = 6 * 60 * 60
+# In-memory store of reference documents shared by all sessions
+REFERENCE_STORE_MAX_BYTES = 64 * 1024 * 1024
+SNOWFLAKE_POOL_SIZE = 4
+SNOWFLAKE_HEALTH_CHECK_INTERVAL = 300  # Seconds a session may idle before it is probed
+SNOWFLAKE_CHECKOUT_TIMEOUT = 30
 NUM_CHUNKS = 2
 NUM_CHUNKS_WEBPAGES = 7
+# Data collection searches all fields together and shares the deduplicated chunks
+RETRIEVAL_POOL_ENABLED = True
+RETRIEVAL_TOP_K_PER_FIELD = 4
+RETRIEVAL_MAX_FIELDS_PER_SEARCH = 3  # Related fields searched together with one merged query
+RETRIEVAL_GROUP_MIN_SIMILARITY = 0.2  # Term overlap (Jaccard) for a field to join a search group
+RETRIEVAL_MIN_TERM_OVERLAP = 0.25  # Share of a field's terms a chunk found for another field must contain
 COLUMNS = ["chunk", "relative_path", "category"]
 MODEL_NAME = "mistral-large2"
+# Token budget for the retrieved-context block of each prompt, per model
+MODEL_CONTEXT_BUDGETS = {
+    "mistral-large2": 12000,
+    "llama3.1-70b": 12000,
+    "mixtral-8x7b": 6000,
+}
+DEFAULT_CONTEXT_BUDGET = 4000
+DATA_COLLECTION_MAX_WORKERS = 4
+# Maximum prompts sent to Cortex in a single batched COMPLETE statement
+LLM_BATCH_SIZE = 25
+CORTEX_COMPLETE_ENDPOINT = "/api/v2/cortex/inference:complete"
+CORTEX_STREAM_TIMEOUT = (10, 120)  # (connect, read) seconds
+STREAM_RENDER_INTERVAL = 0.05  # Seconds between redraws of streamed text
+# Persistent cache for near-deterministic LLM calls
+LLM_CACHE_ENABLED = True
+LLM_CACHE_PATH = "data/cache/llm_responses.db"
+LLM_CACHE_MAX_BYTES = 256 * 1024 * 1024
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+LLM_CACHE_MAX_TEMPERATURE = 0.1
+# In-process cache in front of both Cortex Search services
+SEARCH_CACHE_MAX_ENTRIES = 512
+SEARCH_CACHE_TTL_SECONDS = 10 * 60
+# Where searches are answered: "cortex", "local" (in-process index built from
+# chunk dumps exported with `python -m src.utils.local_search`) or "auto"
+# (Cortex, answered locally when it errors or exceeds CORTEX_SEARCH_TIMEOUT)
+RETRIEVAL_BACKEND = "cortex"
+LOCAL_SEARCH_DIR = "data/search"
+LOCAL_SEARCH_DENSE_ENABLED = False  # Hybrid BM25 + embedding ranking; queries are embedded with Cortex
+CORTEX_SEARCH_TIMEOUT = 2.0
+SEARCH_CHUNK_TABLES = {
+    CORTEX_SEARCH_SERVICE_CONSULTING: DOCS_CHUNKS_TABLE_CONSULTING,
+    CORTEX_SEARCH_SERVICE_WEBPAGES: DOCS_CHUNKS_TABLE_WEBPAGES,
+}
+# Embedding-based reuse of similar cases, frameworks and data requirements
+EMBEDDING_MODEL = "snowflake-arctic-embed-m"
+SEMANTIC_CACHE_ENABLED = True
+SEMANTIC_CACHE_DIR = "data/cache/semantic"
+SEMANTIC_CACHE_THRESHOLD = 0.92  # Minimum cosine similarity to reuse a result
+SEMANTIC_CACHE_MAX_ENTRIES = 1000
+# Precomputed results for the research agenda task cards
+TASK_CARD_WARMUP_ENABLED = True
+TASK_CARD_CACHE_PATH = "data/cache/task_cards.json"
+TASK_CARD_REFRESH_SECONDS = 24 * 60 * 60
 ADVANCED_FEATURES = False
+# Background generations that survive Streamlit reruns
+JOB_RUNNER_MAX_WORKERS = 8
+JOB_POLL_INTERVAL = 0.25  # Seconds between redraws while waiting on a job
+JOB_RETENTION_SECONDS = 60 * 60
+# Start the next stage in the background while the user reviews the current one
+SPECULATIVE_PREFETCH = False
+# Persistent storage for consulting sessions
+SESSION_STORE_BACKEND = "sqlite"
+SESSION_STORE_PATH = "data/sessions/sessions.db"
+SESSION_TTL_SECONDS = 30 * 24 * 60 * 60
+SESSION_COMPACT_INTERVAL_SECONDS = 60 * 60  # How often a running server expires old sessions
+SESSION_COMPRESS_THRESHOLD = 4 * 1024  # Compress field values larger than this many bytes
+# Performance instrumentation
+METRICS_ENABLED = True
+METRICS_LOG_PATH = "data/metrics/events.jsonl"  # Structured JSON log, one event per line
+METRICS_PROMETHEUS_PATH = "data/metrics/consultant.prom"  # For a Prometheus textfile collector
+METRICS_EXPORT_INTERVAL = 15  # Seconds between rewrites of the Prometheus file
+METRICS_LOG_FLUSH_INTERVAL = 1.0  # Seconds between background writes of buffered log events
+METRICS_LOG_BUFFER_SIZE = 10000  # Events held for the next flush; the oldest are dropped beyond this
+METRICS_LOG_MAX_BYTES = 50 * 1024 * 1024  # Rotate the log file past this size
+METRICS_LOG_BACKUPS = 3  # Rotated log files kept
+METRICS_PANEL_REFRESH_SECONDS = 5
 
 def get_snowflake_config():
     return {
@@ -1,12 +1,209 @@
 import streamlit as st
 import json
-from ..utils.snowflake_utils import get_llm_response, get_similar_cases, get_webpages_data
-from ..utils.prompt_utils import create_consulting_prompt, create_refinement_prompt, parse_markdown_sections, create_webpages_prompt
+from ..utils.snowflake_utils import get_llm_response, get_similar_cases, get_webpages_data, run_llm_job
+from ..utils.prompt_utils import (
+    create_consulting_prompt, create_refinement_prompt, parse_markdown_sections, create_webpages_prompt, MarkdownSectionParser
+)
 from ..utils.renderer_utils import render_task_card, render_query_section
+from ..utils.discovery_utils import discover_field_values, parse_data_requirements, prefetch_data_collection
+from ..utils.semantic_cache import lookup_semantic_cache, store_semantic_cache
+from ..utils.reference_store import to_document_refs
+from ..utils.job_runner import get_job_runner, DONE, FAILED
+from ..utils.task_card_cache import get_task_card_cache, task_card_query
+from ..utils.refinement_utils import refine_sections
+from ..utils.retrieval_planner import field_query
 from ..models.consulting_session import ConsultingSession
 from ..config.business_config import BUSINESS_CONFIG, CONSULTING_SUGGESTIONS, TASK_CARDS
-from typing import List, Dict
+from ..config.snowflake_config import JOB_POLL_INTERVAL, SPECULATIVE_PREFETCH
+from typing import List, Dict, Optional
+import hashlib
 import re
+import time
+
+def get_similar_cases_with_cache(query: str) -> dict:
+    """Get similar cases, reusing those found for a semantically similar query"""
+    st.session_state.semantic_cache_hits = {}
+    hit = lookup_semantic_cache(None, query, "similar_cases", st.session_state.model_name, st.session_state.get('category_value', "ALL"))
+    if hit:
+        similar_cases, similarity = hit
+        st.session_state.semantic_cache_hits["similar_cases"] = similarity
+        return similar_cases
+    
+    similar_cases = to_document_refs(get_similar_cases(query))
+    store_semantic_cache(None, query, "similar_cases", similar_cases, st.session_state.model_name, st.session_state.get('category_value', "ALL"))
+    return similar_cases
+
+def render_semantic_cache_label(field: str, label: str):
+    """Show a caption when `field` was reused from a similar earlier question"""
+    similarity = st.session_state.get('semantic_cache_hits', {}).get(field)
+    if similarity:
+        st.caption(f"♻️ {label} reused from a similar earlier question ({similarity:.0%} match)")
+
+def get_stage_job(stage: str, session, prompt_factory, temperature: float):
+    """Get the generation job for this session and stage, submitting it on first call"""
+    runner = get_job_runner()
+    key = (st.session_state.consulting_session.session_id, stage)
+    job = runner.get(key)
+    if job is None:
+        job = runner.submit(key, run_llm_job, session, prompt_factory(), temperature, st.session_state.model_name)
+    return job
+
+def wait_for_job(job, label: str, show_partial: bool = True, stream_sections: bool = False):
+    """Render a job's progress until it finishes and return its result.
+
+    A rerun (click, reconnect) only interrupts the waiting, not the job, so
+    the next run picks up the same job where it is. With `stream_sections`,
+    each markdown section is rendered once as soon as it is complete and only
+    the section still being written is redrawn.
+    """
+    if not job.finished:
+        if st.button("Cancel", key=f"cancel_job_{job.key[1]}"):
+            job.cancel()
+        placeholder = st.empty()
+        stream_area = placeholder.container()
+        sections_area = stream_area.container()
+        pending_area = stream_area.empty()
+        parser = MarkdownSectionParser() if stream_sections else None
+        consumed = 0
+        with st.spinner(f"{label}..."):
+            while not job.finished:
+                partial_text = job.partial_text()
+                if parser:
+                    for section in parser.feed(partial_text[consumed:]):
+                        sections_area.markdown(f"## {section['title']}\n\n{section['content']}")
+                    consumed = len(partial_text)
+                    partial_text = parser.pending_text()
+                if show_partial and partial_text:
+                    pending_area.markdown(f"""
+                    <div style="font-size: 1rem; line-height: 1.5;">
+                    {partial_text}▌
+                    </div>
+                    <br>
+                    """, unsafe_allow_html=True)
+                time.sleep(JOB_POLL_INTERVAL)
+        placeholder.empty()
+    
+    if job.status == DONE:
+        return job.result
+    
+    if job.status == FAILED:
+        st.error(f"{label} failed: {job.error}")
+    else:
+        st.info(f"{label} was cancelled.")
+    if st.button("Retry", key=f"retry_job_{job.key[1]}"):
+        get_job_runner().discard(job.key)
+        st.rerun()
+    return None
+
+def get_final_framework_sections() -> List[Dict]:
+    """Framework sections with any regenerated content applied"""
+    final_sections = []
+    for i, section in enumerate(st.session_state.framework_sections):
+        section_key = f"regenerated_section_{i}"
+        if section_key in st.session_state:
+            final_sections.append({
+                "title": section["title"],
+                "content": st.session_state[section_key]
+            })
+        else:
+            final_sections.append(section)
+    return final_sections
+
+def data_collection_fingerprint(framework_sections: List[Dict]) -> str:
+    """Fingerprint of every input the data collection stage depends on"""
+    consulting_session = st.session_state.consulting_session
+    similar_cases = consulting_session.similar_cases or {}
+    inputs = {
+        "problem": consulting_session.current_problem,
+        # Paths only: resolving the cases can rewrite their content hashes in place
+        "similar_cases": [result.get("relative_path") for result in similar_cases.get("results", [])],
+        "framework_sections": framework_sections,
+        "model_name": st.session_state.model_name,
+        "category_value": st.session_state.get('category_value', "ALL"),
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def start_data_collection_prefetch(session):
+    """Speculatively run the data collection stage for the framework under review.
+
+    A new run replaces (and cancels) the previous one whenever the inputs
+    change, e.g. after a section is regenerated.
+    """
+    framework_sections = get_final_framework_sections()
+    fingerprint = data_collection_fingerprint(framework_sections)
+    runner = get_job_runner()
+    key = (st.session_state.consulting_session.session_id, "prefetch_data_collection")
+    job = runner.get(key)
+    if job and job.fingerprint == fingerprint:
+        return
+    runner.submit(
+        key,
+        prefetch_data_collection,
+        session,
+        st.session_state.consulting_session.current_problem,
+        st.session_state.consulting_session.resolve_similar_cases(),
+        st.session_state.model_name,
+        st.session_state.get('category_value', "ALL"),
+        fingerprint=fingerprint
+    )
+
+def take_data_collection_prefetch() -> Optional[Dict]:
+    """Result of the speculative data collection run, if it matches the agreed framework"""
+    if not SPECULATIVE_PREFETCH:
+        return None
+    key = (st.session_state.consulting_session.session_id, "prefetch_data_collection")
+    job = get_job_runner().get(key)
+    framework_sections = st.session_state.consulting_session.framework_sections
+    if not job or job.fingerprint != data_collection_fingerprint(framework_sections):
+        return None
+    if not job.finished:
+        with st.spinner("Finishing data collection..."):
+            while not job.finished:
+                time.sleep(JOB_POLL_INTERVAL)
+    return job.result if job.status == DONE else None
+
+def render_improve_all_button(session, sections: List[Dict], comment_prefix: str, section_prefix: str, button_key: str, use_rag: bool = False):
+    """Refine every section that has a comment in one batch and a single rerun"""
+    pending = []
+    for i, section in enumerate(sections):
+        comment = (st.session_state.get(f"{comment_prefix}{i}") or "").strip()
+        if comment:
+            pending.append({
+                "key": f"{section_prefix}{i}",
+                "title": section["title"],
+                "content": section["content"],
+                "comment": comment,
+            })
+    
+    # Report failures from the previous bulk refinement
+    for title, error in st.session_state.pop(f"{button_key}_errors", []):
+        st.warning(f"Could not improve {title}: {error}")
+    
+    # Comments typed since the last full run only rerun their own fragment, so
+    # the pending list is collected again when the click triggers a full run
+    if st.button("Improve All Commented Sections", key=button_key, use_container_width=True):
+        if not pending:
+            st.info("Add a comment to at least one section first.")
+            return
+        with st.spinner(f"Improving {len(pending)} sections..."):
+            results = refine_sections(
+                session,
+                pending,
+                model_name=st.session_state.model_name,
+                category_value=st.session_state.get('category_value', "ALL"),
+                use_rag=use_rag
+            )
+        
+        errors = []
+        for item in pending:
+            content, error = results[item["key"]]
+            if content:
+                st.session_state[item["key"]] = content
+                st.session_state.consulting_session.set_regenerated_section(item["key"], content)
+            else:
+                errors.append((item["title"], error or "No response from LLM"))
+        st.session_state[f"{button_key}_errors"] = errors
+        st.rerun()
 
 def handle_welcome_screen(session):
     """Handle welcome screen display and interactions"""
@@ -36,12 +233,26 @@ def handle_welcome_screen(session):
         
         # Add button below each card
         if st.button("Continue Research", key=f"continue_{task['title'].lower().replace(' ', '_')}"):
-            query = f"{task['title']}: {task['description']}\nQuery: {task['query']}"
-            similar_cases = get_similar_cases(query)
+            query = task_card_query(task)
+            task_card_cache = get_task_card_cache()
+            warmed = task_card_cache.get(
+                task, st.session_state.model_name, st.session_state.get('category_value', "ALL")
+            ) if task_card_cache else None
+            
+            if warmed:
+                # Serve the precomputed results instead of searching and generating again
+                st.session_state.semantic_cache_hits = {}
+                similar_cases = warmed["similar_cases"]
+                st.session_state.framework_sections = warmed["framework_sections"]
+            else:
+                similar_cases = get_similar_cases_with_cache(query)
             st.session_state.consulting_session = ConsultingSession()
             st.session_state.consulting_session.stage = "problem_definition"
             st.session_state.consulting_session.current_problem = query
-            st.session_state.consulting_session.similar_cases = similar_cases
+            st.session_state.consulting_session.set_similar_cases(similar_cases)
+            if warmed and warmed["required_data"]:
+                st.session_state.consulting_session.required_data = warmed["required_data"]
+            st.session_state.consulting_session.save()
             st.rerun()
     
     # Separator
@@ -63,17 +274,69 @@ def handle_welcome_screen(session):
     if st.button("Start Analysis", type="primary"):
         if custom_challenge:
             # Get similar cases first
-            similar_cases = get_similar_cases(custom_challenge)
+            similar_cases = get_similar_cases_with_cache(custom_challenge)
             
             # Initialize new session
             st.session_state.consulting_session = ConsultingSession()
             st.session_state.consulting_session.stage = "problem_definition"
             st.session_state.consulting_session.current_problem = custom_challenge
-            st.session_state.consulting_session.similar_cases = similar_cases
+            st.session_state.consulting_session.set_similar_cases(similar_cases)
+            st.session_state.consulting_session.save()
             st.rerun()
         else:
             st.warning("Please enter your question first.")
 
+@st.fragment
+def render_framework_section(session, i: int):
+    """Render one framework section card; commenting on it reruns only this card"""
+    section = st.session_state.framework_sections[i]
+    
+    # Display section title with larger font
+    st.markdown(f"""
+    <h1 style='font-size: 2rem; margin-bottom: 1rem;'>
+        {section["title"]}
+    </h1>
+    """, unsafe_allow_html=True)
+    
+    # Display section content
+    section_key = f"regenerated_section_{i}"
+    if section_key in st.session_state:
+        st.markdown(st.session_state[section_key])
+    else:
+        st.markdown(section["content"])
+    
+    # Add feedback in an expander
+    with st.expander("💭 Comment on this", expanded=False):
+        comment = st.text_area(
+            "Your thoughts:",
+            key=f"comment_{i}",
+            help="Share your insights or concerns about this section"
+        )
+        
+        if st.button("Improve Section", key=f"regenerate_btn_{i}"):
+            regeneration_prompt = create_refinement_prompt(
+                section['title'],
+                section['content'],
+                comment
+            )
+            
+            # Get regenerated content
+            regenerated_content = get_llm_response(
+                session, 
+                regeneration_prompt,
+                temperature=0.3,
+                stream=False,
+                use_cache=False
+            )
+            
+            if regenerated_content:
+                st.session_state[section_key] = regenerated_content
+                st.session_state.consulting_session.set_regenerated_section(section_key, regenerated_content)
+                # The framework changed, so restart the speculative data collection
+                if SPECULATIVE_PREFETCH and not st.session_state.consulting_session.required_data:
+                    start_data_collection_prefetch(session)
+                st.rerun(scope="fragment")
+
 def handle_problem_definition(session):
     """Handle problem definition stage"""
     # Display query section
@@ -93,96 +356,78 @@ def handle_problem_definition(session):
     if st.session_state.consulting_session.similar_cases:
         if st.session_state.get('advanced_features', False):
             st.write("Raw Similar Cases:")
-            st.code(st.session_state.consulting_session.similar_cases)
+            st.code(st.session_state.consulting_session.resolve_similar_cases())
         with st.expander("📚 Similar Cases Reference", expanded=False):
+            render_semantic_cache_label("similar_cases", "Reference cases")
             st.markdown(f"**Reference Cases:**")
-            st.json(st.session_state.consulting_session.similar_cases)
+            st.json(st.session_state.consulting_session.resolve_similar_cases())
     
     # Store initial framework in session state if not already there
     if 'framework_sections' not in st.session_state:
-        prompt = create_consulting_prompt(
-            st.session_state.consulting_session.current_problem,
-            st.session_state.consulting_session.similar_cases,
-            stage="problem_definition"
-        )
-        
-        framework_response = get_llm_response(session, prompt, temperature=0.05, stream=False)
-        
-        try:
-            sections = parse_markdown_sections(framework_response)
-            st.session_state.framework_sections = sections
-        except Exception as e:
-            st.error(f"Error processing framework: {str(e)}")
-            st.code(framework_response)
-            return
+        current_problem = st.session_state.consulting_session.current_problem
+        hit = lookup_semantic_cache(session, current_problem, "framework_sections", st.session_state.model_name, st.session_state.get('category_value', "ALL"))
+        if hit:
+            st.session_state.framework_sections, similarity = hit
+            st.session_state.setdefault('semantic_cache_hits', {})["framework_sections"] = similarity
+        else:
+            job = get_stage_job(
+                "framework",
+                session,
+                lambda: create_consulting_prompt(
+                    current_problem,
+                    st.session_state.consulting_session.resolve_similar_cases(),
+                    stage="problem_definition"
+                ),
+                temperature=0.05
+            )
+            framework_response = wait_for_job(job, "Generating framework", stream_sections=True)
+            if not framework_response:
+                return
+            
+            try:
+                sections = parse_markdown_sections(framework_response)
+                st.session_state.framework_sections = sections
+            except Exception as e:
+                st.error(f"Error processing framework: {str(e)}")
+                st.code(framework_response)
+                return
+            
+            if sections:
+                store_semantic_cache(session, current_problem, "framework_sections", sections, st.session_state.model_name, st.session_state.get('category_value', "ALL"))
+    
+    render_semantic_cache_label("framework_sections", "This framework was")
     
     # Display sections from session state
     if st.session_state.framework_sections:
-        for i, section in enumerate(st.session_state.framework_sections):
+        if SPECULATIVE_PREFETCH and not st.session_state.consulting_session.required_data:
+            start_data_collection_prefetch(session)
+        
+        for i in range(len(st.session_state.framework_sections)):
             # Add separator between sections (except for first one)
             if i > 0:
                 st.markdown("---")
-            
-            # Display section title with larger font
-            st.markdown(f"""
-            <h1 style='font-size: 2rem; margin-bottom: 1rem;'>
-                {section["title"]}
-            </h1>
-            """, unsafe_allow_html=True)
-            
-            # Display section content
-            section_key = f"regenerated_section_{i}"
-            if section_key in st.session_state:
-                st.markdown(st.session_state[section_key])
-            else:
-                st.markdown(section["content"])
-            
-            # Add feedback in an expander
-            with st.expander("💭 Comment on this", expanded=False):
-                comment = st.text_area(
-                    "Your thoughts:",
-                    key=f"comment_{i}",
-                    help="Share your insights or concerns about this section"
-                )
-                
-                if st.button("Improve Section", key=f"regenerate_btn_{i}"):
-                    regeneration_prompt = create_refinement_prompt(
-                        section['title'],
-                        section['content'],
-                        comment
-                    )
-                    
-                    # Get regenerated content
-                    regenerated_content = get_llm_response(
-                        session, 
-                        regeneration_prompt,
-                        temperature=0.3,
-                        stream=False
-                    )
-                    
-                    if regenerated_content:
-                        st.session_state[section_key] = regenerated_content
-                        st.rerun()
+            render_framework_section(session, i)
+        
+        st.markdown("---")
+        render_improve_all_button(
+            session,
+            st.session_state.framework_sections,
+            comment_prefix="comment_",
+            section_prefix="regenerated_section_",
+            button_key="improve_all_framework"
+        )
         
         # Navigation buttons
         col1, col2 = st.columns([1, 2])
         with col2:
             if st.button("Proceed to Data Collection", type="primary", use_container_width=True):
                 # Store the final version of all sections
-                final_sections = []
-                for i, section in enumerate(st.session_state.framework_sections):
-                    section_key = f"regenerated_section_{i}"
-                    if section_key in st.session_state:
-                        final_sections.append({
-                            "title": section["title"],
-                            "content": st.session_state[section_key]
-                        })
-                    else:
-                        final_sections.append(section)
+                final_sections = get_final_framework_sections()
                 
                 st.session_state.consulting_session.agreed_framework = True
                 st.session_state.consulting_session.framework_sections = final_sections
                 st.session_state.consulting_session.stage = "data_collection"
+                st.session_state.consulting_session.save()
                 st.rerun()
         
         with col1:
@@ -194,36 +439,153 @@ def handle_problem_definition(session):
                 st.session_state.consulting_session = ConsultingSession()
                 st.rerun()
 
+@st.fragment
+def render_data_field(session, field: str, details: dict):
+    """Render one data field with its source; refining it reruns only this field"""
+    # Display field title with larger font and emphasis
+    st.markdown(f"""
+    <h3 style='margin-bottom: 0px; font-size: 20px;'>
+        {details['description']}
+        {" (Required)" if details['required'] else ""}
+    </h3>
+    """, unsafe_allow_html=True)
+    
+    found_data = st.session_state.found_values.get(field)
+    
+    # Input field
+    try:
+        if details["type"] == "number":
+            default_value = 0.0
+            if found_data:
+                try:
+                    default_value = float(found_data['value'])
+                except (ValueError, TypeError):
+                    pass
+                    
+            st.number_input(
+                "Enter value",  # Simplified label since we have the title above
+                value=default_value,
+                help=f"Enter {'a different ' if found_data else 'a '}number for {field}",
+                key=f"input_{field}"
+            )
+        elif details["type"] == "date":
+            st.date_input(
+                "Select date",  # Simplified label
+                help=f"Select {'a different ' if found_data else 'a '}date for {field}",
+                key=f"input_{field}"
+            )
+        else:
+            default_value = str(found_data['value']) if found_data else ""
+            st.text_input(
+                "Enter text",  # Simplified label
+                value=default_value,
+                help=f"Enter {'different ' if found_data else ''}text for {field}",
+                key=f"input_{field}"
+            )
+        
+        # Display source info in an expander if available
+        if found_data:
+            with st.expander("📚 Source Reference", expanded=False):
+                st.markdown(f"**Found Value:** {found_data.get('value', 'Not found')}")
+                st.markdown(f"**Confidence:** {found_data.get('confidence', 'N/A')}")
+                st.markdown(f"**Source:** {found_data.get('source', 'N/A')}")
+                st.markdown(f"**Explanation:** {found_data.get('explanation', 'N/A')}")
+            
+            # Move comment expander below source reference
+            with st.expander("💭 Comment on this", expanded=False):
+                comment = st.text_area(
+                    "Your thoughts:",
+                    key=f"data_comment_{field}",
+                    help="Share your insights or concerns about this data point"
+                )
+                
+                if st.button(f"Refine {field}", key=f"refine_btn_{field}"):
+                    refine_data_field(session, field, details, comment)
+                    st.rerun(scope="fragment")
+    
+    except Exception as e:
+        st.error(f"Error displaying input for {field}: {str(e)}")
+
+def refine_data_field(session, field: str, details: dict, comment: str):
+    """Re-extract a field's value taking the user's comment into account"""
+    found_data = st.session_state.found_values.get(field)
+    
+    webpages_results = get_webpages_data(field_query(field, details))
+    if not webpages_results:
+        return
+    
+    prompt = create_webpages_prompt(
+        field, 
+        details, 
+        webpages_results,
+        user_comment=comment,
+        previous_response=found_data
+    )
+    
+    response = get_llm_response(session, prompt, temperature=0.1, stream=False, use_cache=False)
+    
+    try:
+        cleaned_response = response.strip().replace('```json', '').replace('```', '').strip()
+        result = json.loads(cleaned_response)
+        
+        st.session_state.found_values[field] = {
+            'value': result.get('value'),
+            'confidence': result.get('confidence', 'N/A'),
+            'source': result.get('source', 'N/A'),
+            'explanation': result.get('explanation', 'N/A')
+        }
+        # Let the input pick up the refined value as its new default
+        st.session_state.pop(f"input_{field}", None)
+        
+    except Exception as e:
+        if st.session_state.get('advanced_features', False):
+            st.error(f"Error parsing refined analysis: {str(e)}")
+            st.code(response)
+
 def handle_data_collection(session):
     """Handle data collection stage"""
     st.header("Required Information")
     
     if not st.session_state.consulting_session.required_data:
-        # First get required data fields without RAG
-        prompt = create_consulting_prompt(
-            st.session_state.consulting_session.current_problem,
-            st.session_state.consulting_session.similar_cases,
-            stage="data_collection"
-        )
-        
-        data_requirements_response = get_llm_response(
-            session, 
-            prompt, 
-            temperature=0.1, 
-            stream=False,
-        )
-        
-        try:
-            json_str = data_requirements_response.strip()
-            json_str = json_str.replace('```json', '').replace('```', '').strip()
+        current_problem = st.session_state.consulting_session.current_problem
+        prefetched = take_data_collection_prefetch()
+        hit = None if prefetched else lookup_semantic_cache(session, current_problem, "required_data", st.session_state.model_name, st.session_state.get('category_value', "ALL"))
+        if prefetched:
+            st.session_state.consulting_session.required_data = prefetched["required_data"]
+            st.session_state.found_values = prefetched["found_values"]
+            if prefetched["similarity"]:
+                st.session_state.setdefault('semantic_cache_hits', {})["required_data"] = prefetched["similarity"]
+        elif hit:
+            st.session_state.consulting_session.required_data, similarity = hit
+            st.session_state.setdefault('semantic_cache_hits', {})["required_data"] = similarity
+        else:
+            # First get required data fields without RAG
+            job = get_stage_job(
+                "data_requirements",
+                session,
+                lambda: create_consulting_prompt(
+                    current_problem,
+                    st.session_state.consulting_session.resolve_similar_cases(),
+                    stage="data_collection"
+                ),
+                temperature=0.1
+            )
+            data_requirements_response = wait_for_job(job, "Identifying required data", show_partial=False)
+            if not data_requirements_response:
+                return
             
-            data_requirements = json.loads(json_str)
-            st.session_state.consulting_session.required_data = data_requirements
+            try:
+                data_requirements = parse_data_requirements(data_requirements_response)
+                st.session_state.consulting_session.required_data = data_requirements
+                
+            except Exception as e:
+                st.error(f"Error processing data requirements: {str(e)}")
+                st.code(data_requirements_response)
+                return
             
-        except Exception as e:
-            st.error(f"Error processing data requirements: {str(e)}")
-            st.code(data_requirements_response)
-            return
+            store_semantic_cache(session, current_problem, "required_data", data_requirements, st.session_state.model_name, st.session_state.get('category_value', "ALL"))
+
+    render_semantic_cache_label("required_data", "These data requirements were")
 
     # Display data collection form
     st.markdown("Please provide the following information for analysis:")
@@ -231,193 +593,178 @@ def handle_data_collection(session):
     # Store found values in session state if not already present
     if 'found_values' not in st.session_state:
         st.session_state.found_values = {}
+        required_data = st.session_state.consulting_session.required_data
+
+        # Show per-field progress while the worker pool searches the database
+        progress_bar = st.progress(0.0, text="Searching for available data...")
+        status_placeholder = st.empty()
+        field_status = {field: "⏳ Searching" for field in required_data}
+
+        results = discover_field_values(
+            session,
+            required_data,
+            model_name=st.session_state.model_name,
+            category_value=st.session_state.get('category_value', "ALL")
+        )
+        for done_count, (field, found, response, error) in enumerate(results, start=1):
+            if found:
+                st.session_state.found_values[field] = found
+                field_status[field] = "✅ Found"
+            else:
+                field_status[field] = "➖ Not found"
+                if error and st.session_state.get('advanced_features', False):
+                    st.error(f"Error parsing LLM response for {field}: {error}")
+                    st.write("Raw response:")
+                    st.code(response)
+
+            progress_bar.progress(
+                done_count / len(required_data),
+                text=f"Searched {done_count} of {len(required_data)} fields"
+            )
+            status_placeholder.markdown(
+                "\n".join(f"- {status} — {field}" for field, status in field_status.items())
+            )
+
+        progress_bar.empty()
+        status_placeholder.empty()
+    
+    # Each field is its own fragment, so editing or refining one doesn't redraw the others
+    for i, (field, details) in enumerate(st.session_state.consulting_session.required_data.items()):
+        # Create a visual separator between fields
+        if i > 0:
+            st.markdown("---")
+        render_data_field(session, field, details)
+    
+    # Add some space before the submit button
+    st.markdown("<br>", unsafe_allow_html=True)
+    
+    # Main submit button
+    if st.button("Submit Data", type="primary", use_container_width=True):
+        collected_data = {
+            field: st.session_state.get(f"input_{field}")
+            for field in st.session_state.consulting_session.required_data
+        }
         
-        # Search for each required field in the database
-        for field, details in st.session_state.consulting_session.required_data.items():
-            # First get relevant chunks from webpages database
-            webpages_results = get_webpages_data(f"{field} {details['description']}")
-            
+        # Validate required fields
+        missing_fields = [
+            field for field, details in st.session_state.consulting_session.required_data.items()
+            if details["required"] and not collected_data.get(field)
+        ]
+        
+        if missing_fields:
+            st.error(f"Please fill in all required fields: {', '.join(missing_fields)}")
+        else:
+            # Store collected data and proceed
+            st.session_state.consulting_session.collected_data = collected_data
+            st.session_state.consulting_session.stage = "analysis"
+            st.session_state.consulting_session.save()
+            st.rerun()
+
+@st.fragment
+def render_analysis_section(session, i: int, section: Dict):
+    """Render one analysis section; commenting on it reruns only this section"""
+    # Get header level and clean title
+    header_match = re.match(r'^(#+)\s+(.+)$', section["title"])
+    if header_match:
+        header_level = len(header_match.group(1))
+        clean_title = header_match.group(2)
+        
+        # Adjust font size based on header level
+        font_size = {
+            1: "2.5rem",
+            2: "2rem",
+            3: "1.5rem"
+        }.get(header_level, "1.2rem")
+        
+        st.markdown(f"""
+        <h{header_level} style='font-size: {font_size}; margin-bottom: 16px;'>
+            {clean_title}
+        </h{header_level}>
+        """, unsafe_allow_html=True)
+    
+    # Display section content with refinement option
+    section_key = f"regenerated_analysis_{i}"
+    if section_key in st.session_state:
+        st.markdown(st.session_state[section_key])
+    else:
+        st.markdown(section["content"])
+    
+    # Add feedback expander
+    with st.expander("💭 Comment on this", expanded=False):
+        comment = st.text_area(
+            "Your thoughts:",
+            key=f"analysis_comment_{i}",
+            help="Share your insights or concerns about this section"
+        )
+        
+        if st.button("Improve Section", key=f"regenerate_analysis_btn_{i}"):
+            webpages_results = get_webpages_data(section["content"])
             if webpages_results:
-                # Create prompt to extract specific value
-                prompt = create_webpages_prompt(field, details, webpages_results)
+                regeneration_prompt = create_refinement_prompt(
+                    section['title'],
+                    section['content'],
+                    comment,
+                    rag_context=webpages_results
+                )
                 
-                # Get LLM response
-                response = get_llm_response(session, prompt, temperature=0.1, stream=False)
+                regenerated_content = get_llm_response(
+                    session,
+                    regeneration_prompt,
+                    temperature=0.3,
+                    stream=False,
+                    use_cache=False
+                )
                 
-                try:
-                    # Clean up the response before parsing
-                    cleaned_response = response.strip()
-                    # Remove any potential markdown code block markers
-                    cleaned_response = cleaned_response.replace('```json', '').replace('```', '').strip()
-                    
-                    # Parse cleaned LLM response
-                    result = json.loads(cleaned_response)
-                    
-                    # Handle numeric values that might be lists or complex strings
-                    value = result['value']
-                    if details["type"] == "number" and isinstance(value, str):
-                        # Remove any commas from number strings
-                        value = value.replace(',', '')
-                        try:
-                            value = float(value.split()[0].strip())  # Take first number if multiple
-                        except ValueError:
-                            continue
-                    
-                    st.session_state.found_values[field] = {
-                        'value': value,
-                        'source': result.get('source', 'N/A'),
-                        'confidence': result.get('confidence', 'N/A'),
-                        'explanation': result.get('explanation', 'N/A')
-                    }
-                except Exception as e:
-                    if st.session_state.get('advanced_features', False):
-                        st.error(f"Error parsing LLM response for {field}: {str(e)}")
-                        st.write("Raw response:")
-                        st.code(response)
-                        st.write("Cleaned response:")
-                        st.code(cleaned_response)
-    
-    with st.form("data_collection_form", clear_on_submit=False):
-        collected_data = {}
-        first_field = True
-        
-        # Store which field to refine
-        if 'field_to_refine' not in st.session_state:
-            st.session_state.field_to_refine = None
+                if regenerated_content:
+                    st.session_state[section_key] = regenerated_content
+                    st.session_state.consulting_session.set_regenerated_section(section_key, regenerated_content)
+                    st.rerun(scope="fragment")
+
+@st.fragment
+def render_share_report():
+    """Render the share button and popup; toggling them reruns only this fragment"""
+    # Show success message if needed
+    if st.session_state.share_state['show_success']:
+        st.success("✅ Report has been shared successfully!")
+        st.session_state.share_state['show_success'] = False
+    
+    # Share Report button and popup logic
+    if st.button("Share Report", type="primary", use_container_width=True):
+        st.session_state.share_state['show_popup'] = True
+        st.rerun(scope="fragment")
+
+    # Show popup if state indicates
+    if st.session_state.share_state['show_popup']:
+        popup_container = st.empty()
         
-        for field, details in st.session_state.consulting_session.required_data.items():
-            # Create a visual separator between fields
-            if not first_field:
-                st.markdown("---")
-            first_field = False
-            
-            # Display field title with larger font and emphasis
-            st.markdown(f"""
-            <h3 style='margin-bottom: 0px; font-size: 20px;'>
-                {details['description']}
-                {" (Required)" if details['required'] else ""}
-            </h3>
+        with popup_container.container():
+            st.markdown("""
+            <div>
+                <h3 style='margin-bottom: 16px;'>Share Analysis Report</h3>
+            </div>
             """, unsafe_allow_html=True)
             
-            found_data = st.session_state.found_values.get(field)
+            email = st.text_input("Enter recipient's email address:", key="share_email")
             
-            # Input field
-            try:
-                if details["type"] == "number":
-                    default_value = 0.0
-                    if found_data:
-                        try:
-                            default_value = float(found_data['value'])
-                        except (ValueError, TypeError):
-                            pass
-                            
-                    value = st.number_input(
-                        "Enter value",  # Simplified label since we have the title above
-                        value=default_value,
-                        help=f"Enter {'a different ' if found_data else 'a '}number for {field}",
-                        key=f"input_{field}"
-                    )
-                elif details["type"] == "date":
-                    value = st.date_input(
-                        "Select date",  # Simplified label
-                        help=f"Select {'a different ' if found_data else 'a '}date for {field}",
-                        key=f"input_{field}"
-                    )
-                else:
-                    default_value = str(found_data['value']) if found_data else ""
-                    value = st.text_input(
-                        "Enter text",  # Simplified label
-                        value=default_value,
-                        help=f"Enter {'different ' if found_data else ''}text for {field}",
-                        key=f"input_{field}"
-                    )
-                
-                collected_data[field] = value
+            if st.button("Send", key="send_report"):
+                # Show success message in main UI
+                st.success("✅ Report has been shared successfully!")
                 
-                # Display source info in an expander if available
-                if found_data:
-                    with st.expander("📚 Source Reference", expanded=False):
-                        st.markdown(f"**Found Value:** {found_data.get('value', 'Not found')}")
-                        st.markdown(f"**Confidence:** {found_data.get('confidence', 'N/A')}")
-                        st.markdown(f"**Source:** {found_data.get('source', 'N/A')}")
-                        st.markdown(f"**Explanation:** {found_data.get('explanation', 'N/A')}")
-                    
-                    # Move comment expander below source reference
-                    with st.expander("💭 Comment on this", expanded=False):
-                        comment = st.text_area(
-                            "Your thoughts:",
-                            key=f"data_comment_{field}",
-                            help="Share your insights or concerns about this data point"
-                        )
-                        
-                        # Single form submit button for refinement
-                        if st.form_submit_button(f"Refine {field}"):
-                            st.session_state.field_to_refine = (field, comment)
-            
-            except Exception as e:
-                st.error(f"Error displaying input for {field}: {str(e)}")
-                collected_data[field] = None
-        
-        # Add some space before the submit button
-        st.markdown("<br>", unsafe_allow_html=True)
-        
-        # Main form submit button
-        submit_button = st.form_submit_button("Submit Data", type="primary", use_container_width=True)
-        
-        # Handle form submission
-        if submit_button:
-            # Validate required fields
-            missing_fields = [
-                field for field, details in st.session_state.consulting_session.required_data.items()
-                if details["required"] and not collected_data.get(field)
-            ]
-            
-            if missing_fields:
-                st.error(f"Please fill in all required fields: {', '.join(missing_fields)}")
-            else:
-                # Store collected data and proceed
-                st.session_state.consulting_session.collected_data = collected_data
-                st.session_state.consulting_session.stage = "analysis"
-                st.rerun()
-        
-        # Handle refinement if requested
-        if st.session_state.field_to_refine:
-            field, comment = st.session_state.field_to_refine
-            details = st.session_state.consulting_session.required_data[field]
-            found_data = st.session_state.found_values.get(field)
-            
-            webpages_results = get_webpages_data(f"{field} {details['description']}")
-            
-            if webpages_results:
-                prompt = create_webpages_prompt(
-                    field, 
-                    details, 
-                    webpages_results,
-                    user_comment=comment,
-                    previous_response=found_data
-                )
+                # Close share popup and show success popup
+                st.session_state.share_state['show_popup'] = False
+                st.session_state.share_state['show_success'] = True
                 
-                response = get_llm_response(session, prompt, temperature=0.1, stream=False)
+                # Show success popup in new container
+                success_popup = st.empty()
+                with success_popup.container():
+                    st.markdown("""
+                    <div style='padding: 20px; background-color: #f0f9f0; border-radius: 8px; border: 1px solid #90EE90;'>
+                        <h4 style='color: #2E7D32; margin: 0;'>Report Shared Successfully!</h4>
+                        <p style='margin: 8px 0 0 0;'>The report has been sent to the recipient's email address.</p>
+                    </div>
+                    """, unsafe_allow_html=True)
                 
-                try:
-                    cleaned_response = response.strip().replace('```json', '').replace('```', '').strip()
-                    result = json.loads(cleaned_response)
-                    
-                    st.session_state.found_values[field] = {
-                        'value': result.get('value'),
-                        'confidence': result.get('confidence', 'N/A'),
-                        'source': result.get('source', 'N/A'),
-                        'explanation': result.get('explanation', 'N/A')
-                    }
-                    
-                except Exception as e:
-                    if st.session_state.get('advanced_features', False):
-                        st.error(f"Error parsing refined analysis: {str(e)}")
-                        st.code(response)
-            
-            # Clear the refinement state
-            st.session_state.field_to_refine = None
-            st.rerun()
+                st.rerun(scope="fragment")
 
 def handle_analysis(session):
     """Handle analysis stage"""
@@ -436,11 +783,6 @@ def handle_analysis(session):
             'show_success': False
         }
     
-    # Show success message if needed
-    if st.session_state.share_state['show_success']:
-        st.success("✅ Report has been shared successfully!")
-        st.session_state.share_state['show_success'] = False
-    
     # Initialize session state variables if they don't exist
     if 'analysis_response' not in st.session_state:
         st.session_state.analysis_response = None
@@ -452,16 +794,20 @@ def handle_analysis(session):
     
     # Get analysis if not already done
     if not st.session_state.analysis_complete:
-        prompt = create_consulting_prompt(
-            f"""Challenge: {st.session_state.consulting_session.current_problem}
-            Collected Data: {json.dumps(st.session_state.consulting_session.collected_data, indent=2)}""",
-            st.session_state.consulting_session.similar_cases,
-            stage="analysis"
-        )
-        
         if not st.session_state.analysis_response:
-            with stream_container:
-                response = get_llm_response(session, prompt, temperature=0.3, stream=False)
+            job = get_stage_job(
+                "analysis",
+                session,
+                lambda: create_consulting_prompt(
+                    f"""Challenge: {st.session_state.consulting_session.current_problem}
+            Collected Data: {json.dumps(st.session_state.consulting_session.collected_data, indent=2)}""",
+                    st.session_state.consulting_session.resolve_similar_cases(),
+                    stage="analysis"
+                ),
+                temperature=0.3
+            )
+            with stream_container.container():
+                response = wait_for_job(job, "Generating analysis", stream_sections=True)
                 if response:
                     st.session_state.analysis_response = response
                     st.session_state.analysis_complete = True
@@ -477,68 +823,24 @@ def handle_analysis(session):
             if st.session_state.consulting_session.similar_cases:
                 with st.expander("📚 Similar Cases Reference", expanded=False):
                     st.markdown(f"**Reference Cases:**")
-                    st.json(st.session_state.consulting_session.similar_cases)
+                    st.json(st.session_state.consulting_session.resolve_similar_cases())
             
             # Display sections with proper header hierarchy
             for i, section in enumerate(sections):
                 # Add separator between sections (except for first one)
                 if i > 0:
                     st.markdown("---")
-                
-                # Get header level and clean title
-                header_match = re.match(r'^(#+)\s+(.+)$', section["title"])
-                if header_match:
-                    header_level = len(header_match.group(1))
-                    clean_title = header_match.group(2)
-                    
-                    # Adjust font size based on header level
-                    font_size = {
-                        1: "2.5rem",
-                        2: "2rem",
-                        3: "1.5rem"
-                    }.get(header_level, "1.2rem")
-                    
-                    st.markdown(f"""
-                    <h{header_level} style='font-size: {font_size}; margin-bottom: 16px;'>
-                        {clean_title}
-                    </h{header_level}>
-                    """, unsafe_allow_html=True)
-                
-                # Display section content with refinement option
-                section_key = f"regenerated_analysis_{i}"
-                if section_key in st.session_state:
-                    st.markdown(st.session_state[section_key])
-                else:
-                    st.markdown(section["content"])
-                
-                # Add feedback expander
-                with st.expander("💭 Comment on this", expanded=False):
-                    comment = st.text_area(
-                        "Your thoughts:",
-                        key=f"analysis_comment_{i}",
-                        help="Share your insights or concerns about this section"
-                    )
-                    
-                    if st.button("Improve Section", key=f"regenerate_analysis_btn_{i}"):
-                        webpages_results = get_webpages_data(section["content"])
-                        if webpages_results:
-                            regeneration_prompt = create_refinement_prompt(
-                                section['title'],
-                                section['content'],
-                                comment,
-                                rag_context=webpages_results
-                            )
-                            
-                            regenerated_content = get_llm_response(
-                                session,
-                                regeneration_prompt,
-                                temperature=0.3,
-                                stream=False
-                            )
-                            
-                            if regenerated_content:
-                                st.session_state[section_key] = regenerated_content
-                                st.rerun()
+                render_analysis_section(session, i, section)
+            
+            st.markdown("---")
+            render_improve_all_button(
+                session,
+                sections,
+                comment_prefix="analysis_comment_",
+                section_prefix="regenerated_analysis_",
+                button_key="improve_all_analysis",
+                use_rag=True
+            )
 
         except Exception as e:
             st.error(f"Error processing analysis: {str(e)}")
@@ -555,40 +857,4 @@ def handle_analysis(session):
         st.session_state.consulting_session = ConsultingSession()
         st.rerun()
 
-    # Share Report button and popup logic
-    if st.button("Share Report", type="primary", use_container_width=True):
-        st.session_state.share_state['show_popup'] = True
-        st.rerun()
-    
-    # Show popup if state indicates
-    if st.session_state.share_state['show_popup']:
-        popup_container = st.empty()
-        
-        with popup_container.container():
-            st.markdown("""
-            <div>
-                <h3 style='margin-bottom: 16px;'>Share Analysis Report</h3>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            email = st.text_input("Enter recipient's email address:", key="share_email")
-            
-            if st.button("Send", key="send_report"):
-                # Show success message in main UI
-                st.success("✅ Report has been shared successfully!")
-                
-                # Close share popup and show success popup
-                st.session_state.share_state['show_popup'] = False
-                st.session_state.share_state['show_success'] = True
-                
-                # Show success popup in new container
-                success_popup = st.empty()
-                with success_popup.container():
-                    st.markdown("""
-                    <div style='padding: 20px; background-color: #f0f9f0; border-radius: 8px; border: 1px solid #90EE90;'>
-                        <h4 style='color: #2E7D32; margin: 0;'>Report Shared Successfully!</h4>
-                        <p style='margin: 8px 0 0 0;'>The report has been sent to the recipient's email address.</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                
-                st.rerun()
\ No newline at end of file
+    render_share_report()
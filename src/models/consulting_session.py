@@ -1,8 +1,14 @@
 import json
+import logging
 import os
+import weakref
 from dataclasses import dataclass, asdict
 from typing import Dict, List, Optional
 from pathlib import Path
+from .session_store import get_session_store
+from ..utils.reference_store import get_reference_store, to_document_refs, document_ref_hashes, resolve_document_refs
+
+logger = logging.getLogger(__name__)
 
 @dataclass
 class ConsultingSession:
@@ -16,40 +22,83 @@ class ConsultingSession:
     session_id: str = None  # To identify different sessions
     
     def __post_init__(self):
-        self.regenerated_sections = {}
+        if self.regenerated_sections is None:
+            self.regenerated_sections = {}
         if not self.session_id:
             import uuid
             self.session_id = str(uuid.uuid4())
-        self._ensure_data_dir()
+        self._release_similar_cases = None
+        if self.similar_cases:
+            self.set_similar_cases(self.similar_cases)
+    
+    def set_similar_cases(self, similar_cases: Optional[Dict]):
+        """Hold similar cases as references into the shared document store"""
+        self.similar_cases = to_document_refs(similar_cases)
+        self._hold_documents(document_ref_hashes(self.similar_cases))
     
-    @property
-    def _session_file(self) -> Path:
-        """Get path to session file"""
-        return Path("data/sessions") / f"session_{self.session_id}.json"
+    def _hold_documents(self, content_hashes: List[str]):
+        """Reference `content_hashes` in the document store, releasing the previous ones"""
+        store = get_reference_store()
+        store.acquire(content_hashes)
+        if self._release_similar_cases:
+            self._release_similar_cases()
+        self._release_similar_cases = weakref.finalize(self, store.release, content_hashes)
+        self._held_hashes = content_hashes
     
-    def _ensure_data_dir(self):
-        """Ensure data directory exists"""
-        os.makedirs("data/sessions", exist_ok=True)
+    def resolve_similar_cases(self) -> Optional[Dict]:
+        """Get similar cases with their full document content"""
+        resolved = resolve_document_refs(self.similar_cases)
+        content_hashes = document_ref_hashes(self.similar_cases)
+        if self._release_similar_cases and content_hashes != self._held_hashes:
+            self._hold_documents(content_hashes)
+        return resolved
+    
+    def _fields(self) -> Dict:
+        """Flatten session data into store fields, one per regenerated section"""
+        fields = asdict(self)
+        for section_key, content in fields.pop("regenerated_sections").items():
+            fields[f"regenerated_sections.{section_key}"] = content
+        return fields
     
     def save(self):
-        """Save session data to file"""
-        state_data = asdict(self)
-        with open(self._session_file, 'w') as f:
-            json.dump(state_data, f)
+        """Save session data, writing only fields that changed"""
+        get_session_store().save(self.session_id, self._fields())
     
     @classmethod
     def load(cls, session_id: str):
-        """Load session data from file"""
-        session_file = Path("data/sessions") / f"session_{session_id}.json"
-        if session_file.exists():
-            try:
-                with open(session_file) as f:
-                    data = json.load(f)
-                return cls(**data)
-            except Exception as e:
-                print(f"Error loading session data: {str(e)}")
+        """Load session data from the session store"""
+        try:
+            fields = get_session_store().load(session_id)
+            if fields is None:
+                return cls._load_legacy(session_id)
+            data = {"regenerated_sections": {}}
+            for name, value in fields.items():
+                if name.startswith("regenerated_sections."):
+                    data["regenerated_sections"][name[len("regenerated_sections."):]] = value
+                else:
+                    data[name] = value
+            return cls(**data)
+        except Exception as e:
+            logger.warning("Error loading session %s: %s", session_id, e)
         return None
     
+    @classmethod
+    def _load_legacy(cls, session_id: str):
+        """Load a pre-session-store JSON file and migrate it into the store"""
+        session_file = Path("data/sessions") / f"session_{session_id}.json"
+        if not session_file.exists():
+            return None
+        with open(session_file) as f:
+            session = cls(**json.load(f))
+        session.save()
+        os.remove(session_file)
+        return session
+    
+    @staticmethod
+    def list_saved(limit: int = 20) -> List[Dict]:
+        """List recently updated sessions for resuming"""
+        return get_session_store().list_sessions(limit)
+    
     def get_regenerated_section(self, section_key: str) -> Optional[str]:
         """Get regenerated section content"""
         return self.regenerated_sections.get(section_key)
@@ -57,4 +106,4 @@ class ConsultingSession:
     def set_regenerated_section(self, section_key: str, content: str):
         """Set regenerated section content"""
         self.regenerated_sections[section_key] = content
-        self.save() 
\ No newline at end of file
+        get_session_store().update_field(self.session_id, f"regenerated_sections.{section_key}", content) 
\ No newline at end of file
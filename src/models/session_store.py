@@ -0,0 +1,201 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+from ..config.snowflake_config import (
+    SESSION_STORE_BACKEND, SESSION_STORE_PATH, SESSION_TTL_SECONDS, SESSION_COMPRESS_THRESHOLD,
+    SESSION_COMPACT_INTERVAL_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+class SessionStore(ABC):
+    """Storage backend for consulting sessions.
+
+    Sessions are stored as independent named fields so a change to one field
+    (e.g. a single regenerated section) never rewrites the rest of the session.
+    """
+
+    @abstractmethod
+    def save(self, session_id: str, fields: Dict[str, Any]):
+        """Write all fields of a session, skipping those that did not change and deleting those it no longer has"""
+
+    @abstractmethod
+    def update_field(self, session_id: str, name: str, value: Any):
+        """Atomically write a single field of a session"""
+
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Load all fields of a session, or None if it does not exist"""
+
+    @abstractmethod
+    def list_sessions(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """List the most recently updated sessions"""
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        """Delete a session and all of its fields"""
+
+    @abstractmethod
+    def compact(self, ttl_seconds: float = SESSION_TTL_SECONDS) -> int:
+        """Delete sessions not updated within the TTL and reclaim space"""
+
+class SQLiteSessionStore(SessionStore):
+    """Session store backed by a local SQLite database.
+
+    A `sessions` table indexes every session for listing and resuming, and a
+    `session_fields` table holds one JSON value per field, zlib-compressed
+    above `compress_threshold` bytes. Each write is a single transaction.
+    """
+
+    def __init__(self, path: str = SESSION_STORE_PATH, compress_threshold: int = SESSION_COMPRESS_THRESHOLD):
+        self.path = path
+        self.compress_threshold = compress_threshold
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                stage TEXT,
+                current_problem TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at);
+            CREATE TABLE IF NOT EXISTS session_fields (
+                session_id TEXT NOT NULL REFERENCES sessions (session_id) ON DELETE CASCADE,
+                name TEXT NOT NULL,
+                value BLOB NOT NULL,
+                compressed INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                PRIMARY KEY (session_id, name)
+            );
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def _serialize(value: Any):
+        raw = json.dumps(value).encode("utf-8")
+        return raw, hashlib.sha1(raw).hexdigest()
+
+    def _encode(self, raw: bytes):
+        if len(raw) > self.compress_threshold:
+            return zlib.compress(raw), 1
+        return raw, 0
+
+    @staticmethod
+    def _decode(value: bytes, compressed: int) -> Any:
+        return json.loads(zlib.decompress(value) if compressed else value)
+
+    def _touch(self, session_id: str, fields: Dict[str, Any]):
+        now = time.time()
+        self._conn.execute(
+            "INSERT INTO sessions (session_id, created_at, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (session_id) DO UPDATE SET updated_at = excluded.updated_at",
+            (session_id, now, now)
+        )
+        for column in ("stage", "current_problem"):
+            if column in fields:
+                self._conn.execute(f"UPDATE sessions SET {column} = ? WHERE session_id = ?", (fields[column], session_id))
+
+    def _write_fields(self, session_id: str, fields: Dict[str, Any], replace: bool = False):
+        existing = dict(self._conn.execute(
+            "SELECT name, digest FROM session_fields WHERE session_id = ?", (session_id,)
+        ).fetchall())
+        if replace:
+            self._conn.executemany(
+                "DELETE FROM session_fields WHERE session_id = ? AND name = ?",
+                [(session_id, name) for name in existing if name not in fields]
+            )
+        for name, value in fields.items():
+            raw, digest = self._serialize(value)
+            if existing.get(name) == digest:
+                continue
+            encoded, compressed = self._encode(raw)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO session_fields VALUES (?, ?, ?, ?, ?)",
+                (session_id, name, encoded, compressed, digest)
+            )
+
+    def save(self, session_id: str, fields: Dict[str, Any]):
+        with self._lock, self._conn:
+            self._touch(session_id, fields)
+            self._write_fields(session_id, fields, replace=True)
+
+    def update_field(self, session_id: str, name: str, value: Any):
+        with self._lock, self._conn:
+            self._touch(session_id, {name: value})
+            self._write_fields(session_id, {name: value})
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, value, compressed FROM session_fields WHERE session_id = ?", (session_id,)
+            ).fetchall()
+        if not rows:
+            return None
+        return {name: self._decode(value, compressed) for name, value, compressed in rows}
+
+    def list_sessions(self, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id, stage, current_problem, created_at, updated_at FROM sessions "
+                "ORDER BY updated_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        columns = ("session_id", "stage", "current_problem", "created_at", "updated_at")
+        return [dict(zip(columns, row)) for row in rows]
+
+    def delete(self, session_id: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def compact(self, ttl_seconds: float = SESSION_TTL_SECONDS) -> int:
+        with self._lock:
+            with self._conn:
+                deleted = self._conn.execute(
+                    "DELETE FROM sessions WHERE updated_at < ?", (time.time() - ttl_seconds,)
+                ).rowcount
+            if deleted:
+                self._conn.execute("VACUUM")
+        return deleted
+
+SESSION_STORE_BACKENDS = {
+    "sqlite": SQLiteSessionStore,
+}
+
+_session_store = None
+_session_store_lock = threading.Lock()
+_last_compacted = None
+
+def _compact(store: SessionStore):
+    try:
+        store.compact()
+    except Exception as e:
+        logger.warning("Error compacting session store: %s", e)
+
+def get_session_store() -> SessionStore:
+    """Get the process-wide session store.
+
+    Expired sessions are compacted on first use, then in a background thread
+    every SESSION_COMPACT_INTERVAL_SECONDS so a long-running server keeps
+    expiring them.
+    """
+    global _session_store, _last_compacted
+    with _session_store_lock:
+        if _session_store is None:
+            _session_store = SESSION_STORE_BACKENDS[SESSION_STORE_BACKEND]()
+            _compact(_session_store)
+            _last_compacted = time.monotonic()
+        elif time.monotonic() - _last_compacted > SESSION_COMPACT_INTERVAL_SECONDS:
+            _last_compacted = time.monotonic()
+            threading.Thread(target=_compact, args=(_session_store,), name="session-store-compact", daemon=True).start()
+        return _session_store
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import re
+import threading
+from collections import deque
+from typing import Dict, List, Tuple
+from ..config.snowflake_config import MODEL_NAME, MODEL_CONTEXT_BUDGETS, DEFAULT_CONTEXT_BUDGET
+
+# Rough English average for the tokenizers behind Cortex models
+CHARS_PER_TOKEN = 4
+# Don't bother truncating a passage into less than this many tokens
+MIN_TRUNCATED_TOKENS = 64
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]{3,}")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+_stats_lock = threading.Lock()
+_recent_stats = deque(maxlen=50)
+_totals = {"prompts": 0, "original_tokens": 0, "packed_tokens": 0}
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of text"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def context_budget(model_name: str = None) -> int:
+    """Token budget for the retrieved-context block of a prompt"""
+    return MODEL_CONTEXT_BUDGETS.get(model_name or MODEL_NAME, DEFAULT_CONTEXT_BUDGET)
+
+def _extract_passages(context) -> List[Dict[str, str]]:
+    """Keep only source and text from similar-case documents or search results"""
+    if isinstance(context, str):
+        context = json.loads(context)
+    results = context.get("results", []) if isinstance(context, dict) else []
+    passages = []
+    for result in results:
+        text = result.get("content") or result.get("chunk") or ""
+        if text.strip():
+            passages.append({"source": result.get("relative_path", ""), "text": text.strip()})
+    return passages
+
+def _dedupe(passages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Drop exact duplicates and passages fully contained in another passage"""
+    normalized = [_WHITESPACE_PATTERN.sub(" ", p["text"]).lower() for p in passages]
+    seen = set()
+    unique = []
+    for i, passage in enumerate(passages):
+        digest = hashlib.sha1(normalized[i].encode("utf-8")).hexdigest()
+        if digest in seen:
+            continue
+        if any(j != i and len(normalized[j]) > len(normalized[i]) and normalized[i] in normalized[j] for j in range(len(passages))):
+            continue
+        seen.add(digest)
+        unique.append(passage)
+    return unique
+
+def query_terms(query: str) -> set:
+    """Distinct lowercase words of a query, as used for relevance scoring"""
+    return set(_WORD_PATTERN.findall(query.lower()))
+
+def relevance(text: str, query_terms: set) -> float:
+    """Fraction of the query terms that occur in text"""
+    if not query_terms:
+        return 0.0
+    return len(query_terms & set(_WORD_PATTERN.findall(text.lower()))) / len(query_terms)
+
+def _truncate(text: str, max_tokens: int) -> str:
+    cut = text[:max_tokens * CHARS_PER_TOKEN]
+    if " " in cut:
+        cut = cut[:cut.rindex(" ")]
+    return cut + " …"
+
+def pack_context(context, query: str = "", model_name: str = None, label: str = "context") -> Tuple[str, Dict]:
+    """Fit retrieved context into the model's token budget.
+
+    Strips everything but source and text, dedupes overlapping passages,
+    keeps the passages most relevant to `query` (search rank breaks ties),
+    truncates the last one that only partly fits and serializes compactly.
+    Returns the packed context string and packing statistics.
+    """
+    if not context:
+        return "", {"label": label, "original_tokens": 0, "packed_tokens": 0, "saved_tokens": 0, "passages": 0}
+
+    original = context if isinstance(context, str) else json.dumps(context, indent=2)
+    budget = context_budget(model_name)
+    terms = query_terms(query)
+
+    passages = _dedupe(_extract_passages(context))
+    ranked = sorted(
+        enumerate(passages),
+        key=lambda item: (-relevance(item[1]["text"], terms), item[0])
+    )
+
+    packed = []
+    used = 2  # Enclosing brackets
+    for _, passage in ranked:
+        cost = estimate_tokens(json.dumps(passage, separators=(",", ":"), ensure_ascii=False)) + 1
+        if used + cost <= budget:
+            packed.append(passage)
+            used += cost
+            continue
+        remaining = budget - used - estimate_tokens(passage["source"]) - 8
+        if remaining >= MIN_TRUNCATED_TOKENS:
+            packed.append({"source": passage["source"], "text": _truncate(passage["text"], remaining)})
+        break
+
+    packed_context = json.dumps(packed, separators=(",", ":"), ensure_ascii=False)
+    stats = {
+        "label": label,
+        "original_tokens": estimate_tokens(original),
+        "packed_tokens": estimate_tokens(packed_context),
+        "passages": len(packed),
+    }
+    stats["saved_tokens"] = stats["original_tokens"] - stats["packed_tokens"]
+    _record(stats)
+    return packed_context, stats
+
+def _record(stats: Dict):
+    with _stats_lock:
+        _recent_stats.append(stats)
+        _totals["prompts"] += 1
+        _totals["original_tokens"] += stats["original_tokens"]
+        _totals["packed_tokens"] += stats["packed_tokens"]
+
+def get_packing_stats() -> Dict:
+    """Totals and the most recent per-prompt packing results for this process"""
+    with _stats_lock:
+        return {
+            **_totals,
+            "saved_tokens": _totals["original_tokens"] - _totals["packed_tokens"],
+            "recent": list(_recent_stats),
+        }
@@ -0,0 +1,122 @@
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, Optional, Tuple
+from .snowflake_utils import get_llm_response, get_webpages_data
+from .prompt_utils import create_consulting_prompt, create_webpages_prompt
+from .semantic_cache import lookup_semantic_cache, store_semantic_cache
+from .retrieval_planner import field_query, plan_field_retrieval
+from .metrics import get_metrics
+from ..config.snowflake_config import DATA_COLLECTION_MAX_WORKERS, RETRIEVAL_POOL_ENABLED
+
+def parse_found_value(response: str, details: dict) -> Optional[Dict]:
+    """Parse an extraction response into a found value, or None if unusable"""
+    # Clean up the response before parsing
+    cleaned_response = response.strip()
+    # Remove any potential markdown code block markers
+    cleaned_response = cleaned_response.replace('```json', '').replace('```', '').strip()
+
+    # Parse cleaned LLM response
+    with get_metrics().span("json_parse", kind="found_value"):
+        result = json.loads(cleaned_response)
+
+    # Handle numeric values that might be lists or complex strings
+    value = result['value']
+    if details["type"] == "number" and isinstance(value, str):
+        # Remove any commas from number strings
+        value = value.replace(',', '')
+        try:
+            value = float(value.split()[0].strip())  # Take first number if multiple
+        except ValueError:
+            return None
+
+    return {
+        'value': value,
+        'source': result.get('source', 'N/A'),
+        'confidence': result.get('confidence', 'N/A'),
+        'explanation': result.get('explanation', 'N/A')
+    }
+
+def parse_data_requirements(response: str) -> Dict:
+    """Parse a data requirements response into the required_data mapping"""
+    json_str = response.strip()
+    json_str = json_str.replace('```json', '').replace('```', '').strip()
+    with get_metrics().span("json_parse", kind="data_requirements"):
+        return json.loads(json_str)
+
+def discover_field_value(session, field: str, details: dict, model_name: str, category_value: str) -> Tuple[Optional[Dict], Optional[str], Optional[str]]:
+    """Search the webpages corpus and extract a value for one field.
+
+    Runs without touching Streamlit session state so it can be called from
+    worker threads. Returns (found_value, raw_response, error).
+    """
+    # First get relevant chunks from webpages database
+    webpages_results = get_webpages_data(field_query(field, details), category_value=category_value)
+    return extract_field_value(session, field, details, webpages_results, model_name)
+
+def extract_field_value(session, field: str, details: dict, webpages_results, model_name: str) -> Tuple[Optional[Dict], Optional[str], Optional[str]]:
+    """Extract a value for one field from already retrieved webpages context"""
+    if not webpages_results:
+        return None, None, None
+
+    # Create prompt to extract specific value
+    prompt = create_webpages_prompt(field, details, webpages_results, model_name=model_name)
+    response = get_llm_response(session, prompt, temperature=0.1, stream=False, model_name=model_name)
+    if not response:
+        return None, None, "No response from LLM"
+
+    try:
+        return parse_found_value(response, details), response, None
+    except Exception as e:
+        return None, response, str(e)
+
+def discover_field_values(session, required_data: dict, model_name: str, category_value: str) -> Iterator[Tuple[str, Optional[Dict], Optional[str], Optional[str]]]:
+    """Discover values for all required fields on a bounded worker pool.
+
+    With the retrieval pool enabled, all fields are searched up front and
+    share deduplicated chunks. Yields (field, found_value, raw_response,
+    error) as each field finishes.
+    """
+    contexts = plan_field_retrieval(required_data, category_value) if RETRIEVAL_POOL_ENABLED else None
+    with ThreadPoolExecutor(max_workers=DATA_COLLECTION_MAX_WORKERS) as executor:
+        futures = {
+            (
+                executor.submit(extract_field_value, session, field, details, contexts[field], model_name)
+                if contexts is not None else
+                executor.submit(discover_field_value, session, field, details, model_name, category_value)
+            ): field
+            for field, details in required_data.items()
+        }
+        for future in as_completed(futures):
+            field = futures[future]
+            try:
+                found, response, error = future.result()
+            except Exception as e:
+                found, response, error = None, None, str(e)
+            yield field, found, response, error
+
+def prefetch_data_collection(job, session, problem: str, similar_cases: dict, model_name: str, category_value: str) -> Optional[Dict]:
+    """Job body that runs the data collection stage ahead of the user.
+
+    Produces the data requirements and the discovered field values exactly as
+    the data collection stage would, so it can adopt them on arrival.
+    """
+    similarity = None
+    hit = lookup_semantic_cache(session, problem, "required_data", model_name, category_value)
+    if hit:
+        required_data, similarity = hit
+    else:
+        prompt = create_consulting_prompt(problem, similar_cases, stage="data_collection", model_name=model_name)
+        response = get_llm_response(session, prompt, temperature=0.1, stream=False, model_name=model_name)
+        if not response:
+            raise ValueError("No response from LLM")
+        required_data = parse_data_requirements(response)
+        store_semantic_cache(session, problem, "required_data", required_data, model_name, category_value)
+
+    found_values = {}
+    for field, found, _, _ in discover_field_values(session, required_data, model_name, category_value):
+        if job.cancelled:
+            return None
+        if found:
+            found_values[field] = found
+
+    return {"required_data": required_data, "found_values": found_values, "similarity": similarity}
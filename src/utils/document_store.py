@@ -0,0 +1,198 @@
+import json
+import logging
+import mmap
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+from ..config.snowflake_config import (
+    DOCS_CHUNKS_TABLE_CONSULTING, DOCUMENT_STORE_ENABLED, DOCUMENT_STORE_DIR, DOCUMENT_STORE_REFRESH_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.json"
+
+class DocumentStore:
+    """Local snapshot of the consulting chunks table, served from a memory-mapped file.
+
+    The snapshot is a single data file holding every document as UTF-8 bytes
+    back to back, plus a JSON index mapping each relative path to its offset,
+    length and Snowflake fingerprint. Data files are immutable once written,
+    so every process maps the same pages and a refresh writes a new file
+    before atomically swapping the index.
+    """
+
+    def __init__(self, directory: str = DOCUMENT_STORE_DIR):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._index = {}
+        self._index_mtime = None
+        self._mmap = None
+
+    @property
+    def _index_path(self) -> Path:
+        return self.directory / INDEX_FILE
+
+    def _load(self):
+        """(Re)open the snapshot if the index changed on disk since the last read"""
+        try:
+            mtime = self._index_path.stat().st_mtime
+        except FileNotFoundError:
+            return
+        if mtime == self._index_mtime:
+            return
+
+        with open(self._index_path) as f:
+            index = json.load(f)
+
+        data_path = self.directory / index["data_file"]
+        mapped = None
+        # mmap cannot map an empty file, e.g. when every document is empty
+        if index["documents"] and data_path.stat().st_size > 0:
+            with open(data_path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap:
+            self._mmap.close()
+        self._index = index
+        self._index_mtime = mtime
+        self._mmap = mapped
+
+    def _read(self, entry: dict) -> str:
+        if not entry["length"]:
+            return ""
+        return self._mmap[entry["offset"]:entry["offset"] + entry["length"]].decode("utf-8")
+
+    @property
+    def last_refreshed(self) -> Optional[float]:
+        with self._lock:
+            self._load()
+            return self._index.get("refreshed_at")
+
+    def get(self, path: str) -> Optional[str]:
+        """Get a single document by relative path"""
+        return self.get_many([path]).get(path)
+
+    def get_many(self, paths: List[str]) -> Dict[str, str]:
+        """Get all documents present in the snapshot for the given paths"""
+        with self._lock:
+            self._load()
+            documents = self._index.get("documents", {})
+            return {path: self._read(documents[path]) for path in paths if path in documents}
+
+    def refresh(self, session) -> Dict[str, int]:
+        """Bring the snapshot up to date, re-fetching only paths whose chunks changed"""
+        # Imported here to avoid a circular import with snowflake_utils
+        from .snowflake_utils import fetch_full_documents
+        from .session_pool import session_scope
+
+        fingerprint_query = f"""
+        SELECT RELATIVE_PATH, TO_VARCHAR(HASH_AGG(CHUNK)) || ':' || COUNT(*) as FINGERPRINT
+        FROM {DOCS_CHUNKS_TABLE_CONSULTING}
+        GROUP BY RELATIVE_PATH
+        """
+        with session_scope(session) as sf:
+            rows = sf.sql(fingerprint_query).collect()
+        remote = {row["RELATIVE_PATH"]: row["FINGERPRINT"] for row in rows}
+
+        with self._lock:
+            self._load()
+            current = dict(self._index.get("documents", {}))
+            unchanged = {
+                path: self._read(entry) for path, entry in current.items()
+                if remote.get(path) == entry["fingerprint"]
+            }
+
+        changed = [path for path in remote if path not in unchanged]
+        fetched = fetch_full_documents(session, changed) if changed else {}
+        stats = {
+            "unchanged": len(unchanged),
+            "updated": len([path for path in fetched if path in current]),
+            "added": len([path for path in fetched if path not in current]),
+            "removed": len([path for path in current if path not in remote]),
+        }
+
+        if stats["updated"] or stats["added"] or stats["removed"] or not self._index_path.exists():
+            self._write({**unchanged, **fetched}, remote)
+        return stats
+
+    def _write(self, documents: Dict[str, str], fingerprints: Dict[str, str]):
+        """Write a new immutable data file and atomically point the index at it"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        data_file = f"documents_{uuid.uuid4().hex}.bin"
+        index = {"data_file": data_file, "refreshed_at": time.time(), "documents": {}}
+
+        offset = 0
+        with open(self.directory / data_file, "wb") as f:
+            for path in sorted(documents):
+                encoded = documents[path].encode("utf-8")
+                f.write(encoded)
+                index["documents"][path] = {
+                    "offset": offset,
+                    "length": len(encoded),
+                    "fingerprint": fingerprints[path],
+                }
+                offset += len(encoded)
+            f.flush()
+            os.fsync(f.fileno())
+
+        tmp_index = self.directory / f"{INDEX_FILE}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_index, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_index, self._index_path)
+
+        with self._lock:
+            self._load()
+        self._remove_stale_data_files(keep=data_file)
+
+    def _remove_stale_data_files(self, keep: str):
+        """Delete data files no longer referenced by the index.
+
+        Processes that still map an old file keep reading it until they
+        reload; unlinking only drops the directory entry.
+        """
+        keep_mtime = (self.directory / keep).stat().st_mtime
+        for data_path in self.directory.glob("documents_*.bin"):
+            if data_path.name != keep:
+                try:
+                    # Files newer than ours belong to a concurrent refresh
+                    if data_path.stat().st_mtime <= keep_mtime:
+                        data_path.unlink()
+                except OSError:
+                    pass
+
+_document_store = None
+_refresh_thread = None
+
+def get_document_store() -> Optional[DocumentStore]:
+    """Get the process-wide document store, or None when it is disabled"""
+    global _document_store
+    if not DOCUMENT_STORE_ENABLED:
+        return None
+    if _document_store is None:
+        _document_store = DocumentStore()
+    return _document_store
+
+def refresh_document_store_if_stale(session):
+    """Refresh the local snapshot in the background when it is missing or too old"""
+    global _refresh_thread
+    store = get_document_store()
+    if store is None or (_refresh_thread and _refresh_thread.is_alive()):
+        return
+
+    last_refreshed = store.last_refreshed
+    if last_refreshed and time.time() - last_refreshed < DOCUMENT_STORE_REFRESH_SECONDS:
+        return
+
+    def _refresh():
+        try:
+            stats = store.refresh(session)
+            logger.info("Document store refreshed: %s", stats)
+        except Exception as e:
+            logger.warning("Error refreshing document store: %s", e)
+
+    _refresh_thread = threading.Thread(target=_refresh, name="document-store-refresh", daemon=True)
+    _refresh_thread.start()
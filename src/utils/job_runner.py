@@ -0,0 +1,128 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional
+from ..config.snowflake_config import JOB_RUNNER_MAX_WORKERS, JOB_RETENTION_SECONDS
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+class Job:
+    """A long-running generation whose progress outlives Streamlit reruns.
+
+    The job body receives the Job itself so it can publish partial output
+    with `append` and stop early when `cancelled` is set.
+    """
+
+    def __init__(self, key: Hashable, fingerprint: Optional[str] = None):
+        self.key = key
+        self.fingerprint = fingerprint
+        self.status = PENDING
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._parts = []
+        self._lock = threading.Lock()
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def cancel(self):
+        """Ask the job body to stop at its next checkpoint"""
+        self._cancel_event.set()
+        if self.status == PENDING:
+            self._finish(CANCELLED)
+
+    def append(self, chunk: str):
+        with self._lock:
+            self._parts.append(chunk)
+
+    def partial_text(self) -> str:
+        with self._lock:
+            return "".join(self._parts)
+
+    def _finish(self, status: str, result: Any = None, error: Optional[str] = None):
+        self.result = result
+        self.error = error
+        self.finished_at = time.time()
+        self.status = status
+
+    def _run(self, fn: Callable, args: tuple, kwargs: dict):
+        if self.cancelled:
+            return
+        self.status = RUNNING
+        try:
+            result = fn(self, *args, **kwargs)
+            self._finish(CANCELLED if self.cancelled else DONE, result=result)
+        except Exception as e:
+            self._finish(FAILED, error=str(e))
+
+class JobRunner:
+    """Process-wide executor for generations keyed by (session id, stage).
+
+    Submitting a key that already has a live or finished job with the same
+    fingerprint returns that job instead of starting the work again, so each
+    generation runs exactly once however often the script reruns.
+    """
+
+    def __init__(self, max_workers: int = JOB_RUNNER_MAX_WORKERS, retention_seconds: float = JOB_RETENTION_SECONDS):
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: Dict[Hashable, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: Hashable, fn: Callable, *args, fingerprint: Optional[str] = None, **kwargs) -> Job:
+        """Start `fn(job, *args, **kwargs)` unless an equivalent job already exists"""
+        with self._lock:
+            self._prune()
+            job = self._jobs.get(key)
+            if job and job.fingerprint == fingerprint and job.status not in (FAILED, CANCELLED):
+                return job
+            if job and not job.finished:
+                job.cancel()
+            job = Job(key, fingerprint)
+            self._jobs[key] = job
+        self._executor.submit(job._run, fn, args, kwargs)
+        return job
+
+    def get(self, key: Hashable) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(key)
+
+    def cancel(self, key: Hashable):
+        job = self.get(key)
+        if job:
+            job.cancel()
+
+    def discard(self, key: Hashable):
+        """Forget a job, cancelling it if still running"""
+        with self._lock:
+            job = self._jobs.pop(key, None)
+        if job and not job.finished:
+            job.cancel()
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        for key in [key for key, job in self._jobs.items() if job.finished and job.finished_at < cutoff]:
+            del self._jobs[key]
+
+_job_runner = None
+_job_runner_lock = threading.Lock()
+
+def get_job_runner() -> JobRunner:
+    """Get the process-wide job runner"""
+    global _job_runner
+    with _job_runner_lock:
+        if _job_runner is None:
+            _job_runner = JobRunner()
+        return _job_runner
@@ -0,0 +1,138 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+from ..config.snowflake_config import (
+    LLM_CACHE_ENABLED, LLM_CACHE_PATH, LLM_CACHE_MAX_BYTES, LLM_CACHE_TTL_SECONDS
+)
+
+class LLMResponseCache:
+    """Persistent, content-addressed cache of LLM completions.
+
+    Entries are keyed on a hash of model, temperature and prompt and stored in
+    a local SQLite file, so every Streamlit process on the host shares them.
+    Expired entries are dropped on read, and the least recently used entries
+    are evicted once the stored responses exceed `max_bytes`. The stored size
+    is tracked as a running total and only recounted from the table when it
+    crosses the budget, since other processes write to the same file.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_bytes: int = LLM_CACHE_MAX_BYTES, ttl_seconds: float = LLM_CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                temperature REAL NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_accessed REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_accessed ON responses (last_accessed)")
+        self._conn.commit()
+        self._total_bytes = self._stored_bytes()
+
+    def _stored_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(model: str, prompt: str, temperature: float) -> str:
+        """Content address for a completion request"""
+        digest = hashlib.sha256()
+        digest.update(f"{model}\0{temperature:.4f}\0".encode("utf-8"))
+        digest.update(prompt.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, model: str, prompt: str, temperature: float) -> Optional[str]:
+        """Get a cached response, or None on a miss or expired entry"""
+        key = self.make_key(model, prompt, temperature)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at, size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self._total_bytes -= row[2]
+                row = None
+            if not row:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, model: str, prompt: str, temperature: float, response: str):
+        """Store a response and evict least recently used entries over budget"""
+        key = self.make_key(model, prompt, temperature)
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            replaced = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, temperature, response, size, now, now)
+            )
+            self._total_bytes += size - (replaced[0] if replaced else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Other processes may have added or evicted entries since the last count
+        total = self._stored_bytes()
+        self._total_bytes = total
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        stale_keys = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_accessed"):
+            stale_keys.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", stale_keys)
+        self._total_bytes -= freed
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters for this process plus current store size"""
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": total,
+        }
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Get the process-wide LLM response cache, or None when it is disabled"""
+    global _llm_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMResponseCache()
+        return _llm_cache
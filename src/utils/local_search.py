@@ -0,0 +1,258 @@
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from .metrics import get_metrics
+from ..config.snowflake_config import (
+    LOCAL_SEARCH_DIR, LOCAL_SEARCH_DENSE_ENABLED, COLUMNS, EMBEDDING_MODEL, SEARCH_CHUNK_TABLES
+)
+
+logger = logging.getLogger(__name__)
+
+# BM25 term saturation and document length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Rank offset when fusing the lexical and dense rankings
+FUSION_K = 60
+# Candidates taken from each ranking per requested result before fusing
+FUSION_DEPTH = 4
+# Cortex Search calls the auto backend keeps in flight; beyond this it answers locally without calling Cortex
+MAX_CORTEX_IN_FLIGHT = 8
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+class LocalSearchResponse:
+    """Search results shaped like a Cortex Search response"""
+
+    def __init__(self, results: List[Dict]):
+        self.results = results
+
+    def model_dump_json(self) -> str:
+        return json.dumps({"results": self.results})
+
+    def json(self) -> str:
+        return self.model_dump_json()
+
+class LocalSearchIndex:
+    """In-process search over an exported chunk dump.
+
+    The dump is a JSONL file with one chunk per line (chunk, relative_path,
+    category). Chunks are scored with BM25 from an inverted index of numpy
+    postings. If the export also wrote L2-normalized embeddings as a .npy
+    file next to it and a query embedder is given, the BM25 and cosine
+    rankings are merged by reciprocal rank fusion.
+    """
+
+    def __init__(self, rows: List[Dict], vectors: Optional[np.ndarray] = None, embed_query: Optional[Callable[[str], List[float]]] = None):
+        self.rows = rows
+        self.vectors = vectors if vectors is not None and len(vectors) == len(rows) else None
+        self.embed_query = embed_query
+        self._categories = np.array([row.get("category") for row in rows], dtype=object)
+
+        postings = {}
+        lengths = np.zeros(len(rows), dtype=np.float32)
+        for i, row in enumerate(rows):
+            counts = Counter(tokenize(row.get("chunk") or ""))
+            lengths[i] = sum(counts.values())
+            for term, count in counts.items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(i)
+                postings[term][1].append(count)
+        self._postings = {
+            term: (np.array(ids, dtype=np.int32), np.array(counts, dtype=np.float32))
+            for term, (ids, counts) in postings.items()
+        }
+        self._length_norm = 1 - BM25_B + BM25_B * lengths / (lengths.mean() if len(rows) else 1.0)
+
+    @classmethod
+    def load(cls, directory: str, name: str, embed_query: Optional[Callable[[str], List[float]]] = None) -> Optional["LocalSearchIndex"]:
+        """Load the dump for search service `name`, or None if it was never exported"""
+        dump_path = Path(directory) / f"{name}.jsonl"
+        if not dump_path.exists():
+            return None
+        with open(dump_path, "r", encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        vectors_path = dump_path.with_suffix(".npy")
+        vectors = np.load(vectors_path, mmap_mode="r") if embed_query and vectors_path.exists() else None
+        return cls(rows, vectors, embed_query)
+
+    def _mask(self, filter: Optional[Dict]) -> Optional[np.ndarray]:
+        """Rows allowed by a Cortex Search filter (@eq on category, @and of those)"""
+        if not filter:
+            return None
+        if "@and" in filter:
+            masks = [self._mask(clause) for clause in filter["@and"]]
+            return np.logical_and.reduce([mask for mask in masks if mask is not None])
+        if "@eq" in filter and set(filter["@eq"]) == {"category"}:
+            return self._categories == filter["@eq"]["category"]
+        raise ValueError(f"Unsupported local search filter: {filter}")
+
+    def bm25_scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.rows), dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term not in self._postings:
+                continue
+            ids, counts = self._postings[term]
+            idf = math.log(1 + (len(self.rows) - len(ids) + 0.5) / (len(ids) + 0.5))
+            scores[ids] += idf * counts * (BM25_K1 + 1) / (counts + BM25_K1 * self._length_norm[ids])
+        return scores
+
+    def search(self, query: str, columns: List[str] = COLUMNS, filter: Optional[Dict] = None, limit: int = 10,
+               dense: bool = True) -> LocalSearchResponse:
+        """Search the index; `dense=False` ranks by BM25 alone, without embedding the query"""
+        mask = self._mask(filter)
+        scores = self.bm25_scores(query)
+        if mask is not None:
+            scores[~mask] = 0
+        depth = limit * FUSION_DEPTH
+        ranked = [i for i in np.argsort(-scores, kind="stable")[:depth] if scores[i] > 0]
+
+        if dense and self.vectors is not None:
+            query_vector = np.asarray(self.embed_query(query), dtype=np.float32)
+            similarities = self.vectors @ (query_vector / (np.linalg.norm(query_vector) or 1.0))
+            if mask is not None:
+                similarities[~mask] = -np.inf
+            dense_ranked = [i for i in np.argsort(-similarities, kind="stable")[:depth] if np.isfinite(similarities[i])]
+            fused = Counter()
+            for ranking in (ranked, dense_ranked):
+                for rank, i in enumerate(ranking):
+                    fused[i] += 1 / (FUSION_K + rank)
+            ranked = [i for i, _ in fused.most_common()]
+
+        return LocalSearchResponse([
+            {column: self.rows[i][column] for column in columns if column in self.rows[i]}
+            for i in ranked[:limit]
+        ])
+
+class LocalSearchService:
+    """Drop-in for a Cortex Search service handle, answered in-process"""
+    backend = "local"
+
+    def __init__(self, name: str, index: LocalSearchIndex):
+        self.name = name
+        self.index = index
+
+    def search(self, query: str, columns: List[str], filter: Optional[Dict] = None, limit: int = 10,
+               dense: bool = True) -> LocalSearchResponse:
+        return self.index.search(query, columns, filter=filter, limit=limit, dense=dense)
+
+class FallbackSearchService:
+    """Cortex Search that answers from the local index when Cortex fails or is slow.
+
+    A slow Cortex call keeps running in the background after the local answer
+    is returned; its result is discarded. At most MAX_CORTEX_IN_FLIGHT calls
+    run at once, so hung calls cannot pile up; while all are busy, Cortex is
+    skipped. A Cortex error calls `on_primary_error` (e.g. to drop a dead
+    handle so the next search rebuilds it) before answering locally. Local
+    answers rank by BM25 alone, since embedding the query would call Cortex.
+    """
+    backend = "auto"
+
+    def __init__(self, primary, fallback: LocalSearchService, timeout: float, on_primary_error: Optional[Callable[[], None]] = None):
+        self.primary = primary
+        self.fallback = fallback
+        self.timeout = timeout
+        self.on_primary_error = on_primary_error
+
+    def search(self, query: str, columns: List[str], filter: Optional[Dict] = None, limit: int = 10):
+        return self.search_with_backend(query, columns, filter=filter, limit=limit)[0]
+
+    def search_with_backend(self, query: str, columns: List[str], filter: Optional[Dict] = None, limit: int = 10) -> Tuple[object, str]:
+        """Search, returning (response, backend) where backend is "cortex" or "local"."""
+        if _cortex_slots.acquire(blocking=False):
+            kwargs = {"limit": limit} if filter is None else {"filter": filter, "limit": limit}
+            future = _get_fallback_executor().submit(self.primary.search, query, columns, **kwargs)
+            future.add_done_callback(lambda _: _cortex_slots.release())
+            try:
+                return future.result(timeout=self.timeout), "cortex"
+            except FutureTimeoutError:
+                reason = "timeout"
+            except Exception as e:
+                logger.warning("Cortex Search failed, answering locally: %s", e)
+                reason = "error"
+                if self.on_primary_error:
+                    self.on_primary_error()
+        else:
+            reason = "saturated"
+        get_metrics().increment("retrieval_fallback_total", service=self.fallback.name, reason=reason)
+        return self.fallback.search(query, columns, filter=filter, limit=limit, dense=False), "local"
+
+_local_indexes = {}
+_local_indexes_lock = threading.Lock()
+_fallback_executor = None
+_cortex_slots = threading.BoundedSemaphore(MAX_CORTEX_IN_FLIGHT)
+
+def _get_fallback_executor() -> ThreadPoolExecutor:
+    global _fallback_executor
+    with _local_indexes_lock:
+        if _fallback_executor is None:
+            _fallback_executor = ThreadPoolExecutor(max_workers=MAX_CORTEX_IN_FLIGHT, thread_name_prefix="cortex-search")
+        return _fallback_executor
+
+def get_local_search_service(name: str, embed_query: Optional[Callable[[str], List[float]]] = None, directory: str = LOCAL_SEARCH_DIR) -> Optional[LocalSearchService]:
+    """Get the local search service for `name`, loading its dump once per process"""
+    with _local_indexes_lock:
+        if name not in _local_indexes:
+            _local_indexes[name] = LocalSearchIndex.load(directory, name, embed_query)
+        index = _local_indexes[name]
+    return LocalSearchService(name, index) if index else None
+
+def export_chunk_dump(session, table: str, name: str, embedding_model: Optional[str] = None, directory: str = LOCAL_SEARCH_DIR) -> int:
+    """Export a chunks table as the dump a local search index is built from.
+
+    With `embedding_model`, chunk embeddings are computed in Snowflake and
+    saved L2-normalized for hybrid search. Returns the number of chunks.
+    """
+    # Imported here to avoid a circular import with snowflake_utils
+    from .session_pool import session_scope
+
+    embedding_column = ", snowflake.cortex.embed_text_768(?, chunk) as embedding" if embedding_model else ""
+    query = f"select chunk, relative_path, category{embedding_column} from {table} order by relative_path"
+    with session_scope(session) as sf:
+        rows = sf.sql(query, params=[embedding_model] if embedding_model else None).collect()
+
+    os.makedirs(directory, exist_ok=True)
+    dump_path = Path(directory) / f"{name}.jsonl"
+    tmp_path = dump_path.with_suffix(".jsonl.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps({"chunk": row["CHUNK"], "relative_path": row["RELATIVE_PATH"], "category": row["CATEGORY"]}) + "\n")
+    if embedding_model:
+        vectors = np.array([
+            json.loads(row["EMBEDDING"]) if isinstance(row["EMBEDDING"], str) else list(row["EMBEDDING"])
+            for row in rows
+        ], dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        with open(dump_path.with_suffix(".npy.tmp"), "wb") as f:
+            np.save(f, vectors)
+        os.replace(dump_path.with_suffix(".npy.tmp"), dump_path.with_suffix(".npy"))
+    os.replace(tmp_path, dump_path)
+
+    with _local_indexes_lock:
+        _local_indexes.pop(name, None)
+    return len(rows)
+
+if __name__ == "__main__":
+    # Export a dump for every search service: python -m src.utils.local_search
+    from .snowflake_utils import create_snowflake_session
+
+    export_session = create_snowflake_session()
+    try:
+        for service_name, table in SEARCH_CHUNK_TABLES.items():
+            count = export_chunk_dump(
+                export_session, table, service_name,
+                embedding_model=EMBEDDING_MODEL if LOCAL_SEARCH_DENSE_ENABLED else None
+            )
+            print(f"Exported {count} chunks from {table} for {service_name}")
+    finally:
+        export_session.close()
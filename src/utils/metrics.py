@@ -0,0 +1,278 @@
+import atexit
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+from ..config.snowflake_config import (
+    METRICS_ENABLED, METRICS_LOG_PATH, METRICS_PROMETHEUS_PATH, METRICS_EXPORT_INTERVAL,
+    METRICS_LOG_FLUSH_INTERVAL, METRICS_LOG_BUFFER_SIZE, METRICS_LOG_MAX_BYTES, METRICS_LOG_BACKUPS
+)
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "consultant"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (100, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000)
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _format_labels(label_key: Tuple[Tuple[str, str], ...], **extra) -> str:
+    pairs = list(label_key) + [(key, str(value)) for key, value in extra.items()]
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+class MetricsRegistry:
+    """Process-wide counters, histograms and timing spans.
+
+    Spans time a block of work, count it by outcome and write one structured
+    JSON event per span. Events are buffered in memory and appended to the
+    log by a background thread, which rotates the file once it grows past
+    METRICS_LOG_MAX_BYTES. The registry renders itself in the Prometheus text
+    exposition format and rewrites `prometheus_path` at most once per export
+    interval for a textfile collector to pick up.
+    """
+
+    def __init__(self, log_path: Optional[str] = METRICS_LOG_PATH, prometheus_path: Optional[str] = METRICS_PROMETHEUS_PATH,
+                 export_interval: float = METRICS_EXPORT_INTERVAL):
+        # Resolved now, since events are written later from a background thread and at exit
+        self.log_path = os.path.abspath(log_path) if log_path else None
+        self.prometheus_path = os.path.abspath(prometheus_path) if prometheus_path else None
+        self.export_interval = export_interval
+        self._counters: Dict[str, Dict[Tuple, float]] = {}
+        self._histograms: Dict[str, Dict[Tuple, Histogram]] = {}
+        self._gauges: Dict[str, Callable[[], Optional[float]]] = {}
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self._log_buffer = deque(maxlen=METRICS_LOG_BUFFER_SIZE)
+        self._log_flusher = None
+        self._last_export = 0.0
+
+    def increment(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels):
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            key = _label_key(labels)
+            if key not in series:
+                series[key] = Histogram(buckets)
+            series[key].observe(value)
+
+    def observe_size(self, name: str, text: Optional[str], **labels):
+        """Record the length of a prompt or response in characters"""
+        if text is not None:
+            self.observe(name, len(text), buckets=SIZE_BUCKETS, **labels)
+
+    def register_gauge(self, name: str, fn: Callable[[], Optional[float]]):
+        """Export the value of `fn()` (e.g. a cache hit rate) at collection time"""
+        with self._lock:
+            self._gauges[name] = fn
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        """Time a block, count it by status and log it as a JSON event"""
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except Exception:
+            status = "error"
+            raise
+        except BaseException:
+            # Streamlit reruns and stops unwind through here as BaseException
+            status = "interrupted"
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            self.observe(f"{name}_duration_seconds", duration, **labels)
+            self.increment(f"{name}_total", status=status, **labels)
+            self._log({"event": "span", "name": name, "status": status, "duration_ms": round(duration * 1000, 2), **labels})
+            self._maybe_export()
+
+    def _log(self, event: Dict):
+        if not self.log_path:
+            return
+        self._log_buffer.append({"ts": time.time(), **event})
+        if self._log_flusher is None:
+            with self._log_lock:
+                if self._log_flusher is None:
+                    self._log_flusher = threading.Thread(target=self._flush_periodically, name="metrics-log", daemon=True)
+                    self._log_flusher.start()
+                    atexit.register(self.flush_log)
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(METRICS_LOG_FLUSH_INTERVAL)
+            self.flush_log()
+
+    def flush_log(self):
+        """Append buffered events to the log file, rotating it when it is full"""
+        with self._log_lock:
+            lines = []
+            while self._log_buffer:
+                lines.append(json.dumps(self._log_buffer.popleft(), default=str) + "\n")
+            if not lines:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+                self._rotate_log()
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.writelines(lines)
+            except OSError as e:
+                logger.warning("Error writing metrics log %s: %s", self.log_path, e)
+
+    def _rotate_log(self):
+        """Shift events.jsonl to events.jsonl.1 and so on, keeping METRICS_LOG_BACKUPS files"""
+        try:
+            if os.path.getsize(self.log_path) < METRICS_LOG_MAX_BYTES:
+                return
+        except FileNotFoundError:
+            return
+        for i in range(METRICS_LOG_BACKUPS - 1, 0, -1):
+            if os.path.exists(f"{self.log_path}.{i}"):
+                os.replace(f"{self.log_path}.{i}", f"{self.log_path}.{i + 1}")
+        if METRICS_LOG_BACKUPS:
+            os.replace(self.log_path, f"{self.log_path}.1")
+        else:
+            os.remove(self.log_path)
+
+    def _gauge_values(self) -> Dict[str, float]:
+        values = {}
+        for name, fn in list(self._gauges.items()):
+            try:
+                value = fn()
+            except Exception:
+                value = None
+            if value is not None:
+                values[name] = float(value)
+        return values
+
+    def snapshot(self) -> Dict:
+        """All metrics as plain data, with p50/p95 estimates for histograms"""
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+            histograms = {
+                name: [
+                    {
+                        "labels": dict(key),
+                        "count": histogram.count,
+                        "sum": round(histogram.sum, 6),
+                        "mean": round(histogram.sum / histogram.count, 6) if histogram.count else None,
+                        "p50": histogram.quantile(0.5),
+                        "p95": histogram.quantile(0.95),
+                    }
+                    for key, histogram in series.items()
+                ]
+                for name, series in self._histograms.items()
+            }
+        return {"counters": counters, "histograms": histograms, "gauges": self._gauge_values()}
+
+    def prometheus_text(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                metric = f"{METRIC_PREFIX}_{name}"
+                lines.append(f"# TYPE {metric} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{metric}{_format_labels(key)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                metric = f"{METRIC_PREFIX}_{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                for key, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{metric}_bucket{_format_labels(key, le=bound)} {cumulative}")
+                    lines.append(f"{metric}_bucket{_format_labels(key, le='+Inf')} {histogram.count}")
+                    lines.append(f"{metric}_sum{_format_labels(key)} {histogram.sum}")
+                    lines.append(f"{metric}_count{_format_labels(key)} {histogram.count}")
+        for name, value in sorted(self._gauge_values().items()):
+            metric = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def _maybe_export(self):
+        if not self.prometheus_path:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_export < self.export_interval:
+                return
+            self._last_export = now
+        try:
+            os.makedirs(os.path.dirname(self.prometheus_path) or ".", exist_ok=True)
+            tmp_path = f"{self.prometheus_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp_path, self.prometheus_path)
+        except OSError as e:
+            logger.warning("Error exporting metrics to %s: %s", self.prometheus_path, e)
+
+class _NullMetrics(MetricsRegistry):
+    """Registry that records nothing, used when metrics are disabled"""
+
+    def __init__(self):
+        super().__init__(log_path=None, prometheus_path=None)
+
+    def increment(self, name: str, value: float = 1, **labels):
+        pass
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels):
+        pass
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        yield
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+def get_metrics() -> MetricsRegistry:
+    """Get the process-wide metrics registry"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = MetricsRegistry() if METRICS_ENABLED else _NullMetrics()
+        return _metrics
@@ -1,14 +1,17 @@
 from ..config.business_config import BUSINESS_CONFIG
-from typing import List, Dict
+from functools import lru_cache
+from typing import List, Dict, Tuple
 import json
 import re
 import streamlit as st
+from .context_packer import pack_context
+from .metrics import get_metrics
 
-def create_consulting_prompt(query: str, similar_cases: dict, stage: str = "problem_definition") -> str:
+def create_consulting_prompt(query: str, similar_cases: dict, stage: str = "problem_definition", model_name: str = None) -> str:
     """Create stage-specific prompts with case examples"""
     cases_context = ""
     if similar_cases and isinstance(similar_cases, dict):
-        cases_context = json.dumps(similar_cases, indent=2)
+        cases_context, _ = pack_context(similar_cases, query, model_name, label=f"consulting:{stage}")
 
     base_prompt = f"""You are an experienced MBB (McKinsey, Bain, BCG) consulting case coach. 
     Your goal is to help analyze business problems using consulting frameworks and methodologies.
@@ -63,7 +66,7 @@ Provide a detailed analysis and specific recommendations. Structure your respons
 
     return prompt
 
-def create_refinement_prompt(section_title: str, section_content: str, feedback: str, rag_context: dict = None) -> str:
+def create_refinement_prompt(section_title: str, section_content: str, feedback: str, rag_context: dict = None, model_name: str = None) -> str:
     """Create a prompt for section refinement based on feedback and optional RAG context"""
     base_prompt = f"""You are an expert business consultant tasked with refining an analysis section.
     
@@ -81,7 +84,7 @@ def create_refinement_prompt(section_title: str, section_content: str, feedback:
     
     Additional context from research:
     <context>
-    {json.dumps(rag_context, indent=2)}
+    {pack_context(rag_context, f"{section_title} {feedback}", model_name, label="refinement")[0]}
     </context>
     """
     
@@ -97,7 +100,7 @@ def create_refinement_prompt(section_title: str, section_content: str, feedback:
     
     return base_prompt
 
-def create_webpages_prompt(field_name: str, field_details: dict, context: dict, user_comment: str = None, previous_response: dict = None) -> str:
+def create_webpages_prompt(field_name: str, field_details: dict, context: dict, user_comment: str = None, previous_response: dict = None, model_name: str = None) -> str:
     """Create RAG-enhanced prompt to find specific data value"""
     base_prompt = f"""You are an expert business consultant. You are to estimate the value for the following data using the context provided in the <context> tags. 
     You are free to make estimations if the data does not give you an exact value. Otherwise, stick to the data.
@@ -128,7 +131,7 @@ def create_webpages_prompt(field_name: str, field_details: dict, context: dict,
     
     base_prompt += f"""
     <context>          
-    {json.dumps(context, indent=2)}
+    {pack_context(context, f"{field_name} {field_details['description']}", model_name, label=f"webpages:{field_name}")[0]}
     </context>
     
     Return only a JSON object following this structure:
@@ -143,10 +146,94 @@ def create_webpages_prompt(field_name: str, field_details: dict, context: dict,
     
     return base_prompt
 
+HEADER_PATTERN = re.compile(r'^#{1,2}\s+(.+)$')
+PARSED_SECTIONS_CACHE_SIZE = 128
+
+class MarkdownSectionParser:
+    """Incremental parser that splits markdown into sections on # and ## headers.
+
+    Feed text as it arrives; every section is returned as soon as the header
+    of the next one is seen, and `close` returns the last one. Text before
+    the first header is dropped, or becomes a single "Analysis" section when
+    there are no headers and sections are not required.
+    """
+
+    def __init__(self, require_sections: bool = True):
+        self.require_sections = require_sections
+        self.has_headers = False
+        self._buffer = ""
+        self._title = ""
+        self._content = []
+
+    def _consume_line(self, line: str) -> List[Dict[str, str]]:
+        header_match = HEADER_PATTERN.match(line)
+        if not header_match:
+            self._content.append(line)
+            return []
+        completed = []
+        if self._title:
+            completed.append({"title": self._title, "content": '\n'.join(self._content).strip()})
+        self.has_headers = True
+        self._title = header_match.group(1)
+        self._content = []
+        return completed
+
+    def feed(self, text: str) -> List[Dict[str, str]]:
+        """Consume a chunk of text and return the sections it completed"""
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split('\n')
+        completed = []
+        for line in lines:
+            completed.extend(self._consume_line(line))
+        return completed
+
+    def pending_text(self) -> str:
+        """Text of the section still being received"""
+        return '\n'.join(self._content + [self._buffer]).strip()
+
+    def close(self) -> List[Dict[str, str]]:
+        """Flush the last section once the text is complete"""
+        completed = self._consume_line(self._buffer)
+        self._buffer = ""
+        if self._title:
+            completed.append({"title": self._title, "content": '\n'.join(self._content).strip()})
+        elif not self.has_headers and not self.require_sections:
+            completed.append({"title": "Analysis", "content": '\n'.join(self._content).strip()})
+        self._title = ""
+        self._content = []
+        return completed
+
+def iter_markdown_sections(chunks, require_sections: bool = True):
+    """Yield each section of a streamed markdown text as soon as it is complete"""
+    parser = MarkdownSectionParser(require_sections)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+@lru_cache(maxsize=PARSED_SECTIONS_CACHE_SIZE)
+def _split_markdown_sections(markdown_text: str, require_sections: bool) -> Tuple[Tuple[str, str], ...]:
+    parser = MarkdownSectionParser(require_sections)
+    sections = parser.feed(markdown_text) + parser.close()
+    return tuple((section["title"], section["content"]) for section in sections)
+
+def split_markdown_sections(markdown_text: str, require_sections: bool = True) -> List[Dict[str, str]]:
+    """Split markdown into {title, content} sections without touching Streamlit.
+
+    Safe to call from background threads; `parse_markdown_sections` adds the
+    in-app error reporting and debug output on top of it.
+    """
+    return [
+        {"title": title, "content": content}
+        for title, content in _split_markdown_sections(markdown_text, require_sections)
+    ]
+
 def parse_markdown_sections(markdown_text: str, require_sections: bool = True) -> List[Dict[str, str]]:
     """
     Parse markdown text into sections based on main headers (#) only.
     
+    Parsing is a single pass and memoized on the text, so reruns that parse
+    the same response again are free.
+    
     Args:
         markdown_text (str): The markdown text to parse
         require_sections (bool): If True, requires headers for sections. If False, treats entire text as one section
@@ -163,55 +250,18 @@ def parse_markdown_sections(markdown_text: str, require_sections: bool = True) -
         st.write("Raw markdown text:")
         st.code(markdown_text)
     
-    header_pattern = r'^#{1,2}\s+(.+)$'
-    sections = []
-    current_section = {"title": "", "content": ""}
-    current_content = []
-    
     try:
-        lines = markdown_text.split('\n')
-        has_headers = any(re.match(header_pattern, line) for line in lines)
-        
-        # If no headers found and sections not required, treat entire text as one section
-        if not has_headers and not require_sections:
-            return [{
-                "title": "Analysis",  # Default title
-                "content": markdown_text.strip()
-            }]
-        
-        for line in lines:
-            header_match = re.match(header_pattern, line)
-            if header_match:
-                # Save previous section if it exists
-                if current_section["title"]:
-                    current_section["content"] = '\n'.join(current_content).strip()
-                    sections.append(current_section.copy())
-                
-                # Start new section
-                current_section["title"] = header_match.group(1)
-                current_content = []
-            else:
-                current_content.append(line)
-        
-        # Add the last section
-        if current_section["title"]:
-            current_section["content"] = '\n'.join(current_content).strip()
-            sections.append(current_section.copy())
-        elif current_content and not require_sections:
-            # If there's content but no sections and sections aren't required
-            sections.append({
-                "title": "Analysis",
-                "content": '\n'.join(current_content).strip()
-            })
+        with get_metrics().span("markdown_parse"):
+            sections = split_markdown_sections(markdown_text, require_sections)
         
         # Debug output
         if not sections and st.session_state.get('advanced_features', False):
             st.warning("No sections found. Headers detected:")
-            headers = [line for line in lines if re.match(header_pattern, line)]
+            headers = [line for line in markdown_text.split('\n') if HEADER_PATTERN.match(line)]
             st.code("\n".join(headers) if headers else "No headers found")
         
         return sections
         
     except Exception as e:
         st.error(f"Error parsing markdown: {str(e)}")
-        return [] 
\ No newline at end of file
+        return []
@@ -0,0 +1,151 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from ..config.snowflake_config import REFERENCE_STORE_MAX_BYTES
+
+class ReferenceStore:
+    """Process-wide, reference-counted store for reference document content.
+
+    Sessions keep only {relative_path, content_hash} references while the
+    document text lives here once, however many sessions point at it. When the
+    store grows past `max_bytes` of UTF-8 encoded text, least recently used
+    documents are dropped, unreferenced ones first; a dropped document is
+    reloaded by path the next time a session needs it.
+    """
+
+    def __init__(self, max_bytes: int = REFERENCE_STORE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._refcounts = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def content_hash(content: str) -> str:
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def put(self, content: str) -> str:
+        """Store content and return its hash"""
+        encoded = content.encode("utf-8")
+        content_hash = hashlib.sha256(encoded).hexdigest()
+        with self._lock:
+            if content_hash in self._entries:
+                self._entries.move_to_end(content_hash)
+            else:
+                self._entries[content_hash] = content
+                self._sizes[content_hash] = len(encoded)
+                self._size += len(encoded)
+                self._evict()
+        return content_hash
+
+    def get(self, content_hash: str) -> Optional[str]:
+        with self._lock:
+            content = self._entries.get(content_hash)
+            if content is not None:
+                self._entries.move_to_end(content_hash)
+            return content
+
+    def acquire(self, content_hashes: List[str]):
+        with self._lock:
+            for content_hash in content_hashes:
+                self._refcounts[content_hash] = self._refcounts.get(content_hash, 0) + 1
+
+    def release(self, content_hashes: List[str]):
+        with self._lock:
+            for content_hash in content_hashes:
+                count = self._refcounts.get(content_hash, 0) - 1
+                if count > 0:
+                    self._refcounts[content_hash] = count
+                else:
+                    self._refcounts.pop(content_hash, None)
+            self._evict()
+
+    def _evict(self):
+        if self._size <= self.max_bytes:
+            return
+        unreferenced = [h for h in self._entries if h not in self._refcounts]
+        referenced = [h for h in self._entries if h in self._refcounts]
+        for content_hash in unreferenced + referenced:
+            if self._size <= self.max_bytes:
+                break
+            del self._entries[content_hash]
+            self._size -= self._sizes.pop(content_hash)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "documents": len(self._entries),
+                "bytes": self._size,
+                "referenced": len(self._refcounts),
+            }
+
+_reference_store = ReferenceStore()
+
+def get_reference_store() -> ReferenceStore:
+    """Get the process-wide reference document store"""
+    return _reference_store
+
+def to_document_refs(similar_cases: Optional[Dict]) -> Optional[Dict]:
+    """Move document content into the shared store, keeping only references"""
+    if not similar_cases or "results" not in similar_cases:
+        return similar_cases
+    store = get_reference_store()
+    results = []
+    for result in similar_cases["results"]:
+        if "content" in result:
+            result = {"relative_path": result["relative_path"], "content_hash": store.put(result["content"])}
+        results.append(result)
+    return {**similar_cases, "results": results}
+
+def document_ref_hashes(similar_cases: Optional[Dict]) -> List[str]:
+    if not similar_cases:
+        return []
+    return [result["content_hash"] for result in similar_cases.get("results", []) if "content_hash" in result]
+
+def resolve_document_refs(similar_cases: Optional[Dict]) -> Optional[Dict]:
+    """Materialize referenced documents, reloading any the store has dropped.
+
+    A reloaded document whose content changed since it was referenced is
+    stored under its new hash and the reference is rewritten in place, so
+    later calls find it in the store. Callers holding the old hashes should
+    move their references over (see `document_ref_hashes`).
+    """
+    if not similar_cases or "results" not in similar_cases:
+        return similar_cases
+    # Imported here to avoid a circular import with snowflake_utils
+    from .snowflake_utils import get_local_documents, fetch_full_documents, get_session_pool
+
+    store = get_reference_store()
+    contents = {}
+    reloaded_hashes = {}
+    missing_paths = []
+    for result in similar_cases["results"]:
+        if "content_hash" in result:
+            content = store.get(result["content_hash"])
+            if content is None:
+                missing_paths.append(result["relative_path"])
+            else:
+                contents[result["relative_path"]] = content
+
+    if missing_paths:
+        reloaded = get_local_documents(missing_paths)
+        still_missing = [path for path in missing_paths if path not in reloaded]
+        if still_missing:
+            reloaded.update(fetch_full_documents(get_session_pool(), still_missing))
+        for path, content in reloaded.items():
+            reloaded_hashes[path] = store.put(content)
+            contents[path] = content
+
+    for result in similar_cases["results"]:
+        if "content_hash" in result and result["relative_path"] in reloaded_hashes:
+            result["content_hash"] = reloaded_hashes[result["relative_path"]]
+
+    results = []
+    for result in similar_cases["results"]:
+        if "content" in result:
+            results.append(result)
+        elif result["relative_path"] in contents:
+            results.append({"relative_path": result["relative_path"], "content": contents[result["relative_path"]]})
+    return {**similar_cases, "results": results}
@@ -0,0 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from .snowflake_utils import get_llm_responses, get_webpages_data
+from .prompt_utils import create_refinement_prompt
+from ..config.snowflake_config import DATA_COLLECTION_MAX_WORKERS
+
+def refine_sections(session, sections: List[Dict], model_name: str, category_value: str, use_rag: bool = False) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+    """Refine every commented section at once.
+
+    Each item of `sections` has key, title, content and comment. With
+    `use_rag`, the webpages lookups run concurrently on a worker pool and a
+    section without research context is skipped, as for a single refinement.
+    All prompts then go out in one batched completion. Returns
+    {key: (refined_content, error)}.
+    """
+    rag_contexts = [None] * len(sections)
+    if use_rag:
+        with ThreadPoolExecutor(max_workers=DATA_COLLECTION_MAX_WORKERS) as executor:
+            rag_contexts = list(executor.map(
+                lambda section: get_webpages_data(section["content"], category_value=category_value),
+                sections
+            ))
+
+    results = {}
+    to_refine = []
+    for section, rag_context in zip(sections, rag_contexts):
+        if use_rag and not rag_context:
+            results[section["key"]] = (None, "No research context found")
+        else:
+            to_refine.append((section, rag_context))
+
+    prompts = [
+        create_refinement_prompt(section["title"], section["content"], section["comment"], rag_context=rag_context, model_name=model_name)
+        for section, rag_context in to_refine
+    ]
+    responses = get_llm_responses(session, prompts, temperature=0.3, model_name=model_name, use_cache=False)
+    for (section, _), response in zip(to_refine, responses):
+        results[section["key"]] = (response["response"], response["error"])
+    return results
@@ -1,5 +1,89 @@
+import base64
+import html
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+STATIC_DIR = Path(__file__).resolve().parents[2] / "static"
+LOGO_FILENAME = "hilm_logo5-removebg.png"
+# Task cards come from fixed configuration, so each is rendered once per process, keyed by title
+_task_card_html = {}
+
+PAGE_CSS = """
+    <style>
+    /* Logo container */
+    .logo-container {
+        position: fixed;
+        top: 0.25rem;
+        left: 0.25rem;
+        padding: 0.5rem;
+        background: white;
+        z-index: 9999;
+        border-radius: 7px;
+        min-width: 200px;  /* Ensure minimum width */
+        min-height: 160px;  /* Ensure minimum height */
+        display: flex;
+        align-items: center;
+        justify-content: center;
+    }
+    
+    /* Logo image specific styling */
+    .logo-image {
+        display: block;
+        height: 120px;  /* Increased height */
+        width: auto;
+        object-fit: contain;
+    }
+    
+    /* Main content padding */
+    .block-container {
+        padding-top: 3rem;  /* Increased to accommodate larger logo */
+    }
+    
+    /* Hide Streamlit's default menu button */
+    #MainMenu {visibility: hidden;}
+    footer {visibility: hidden;}
+    
+    /* Ensure logo container is visible */
+    div[data-testid="stAppViewContainer"] > div:first-child {
+        z-index: auto;
+    }
+    </style>
+"""
+
+@lru_cache(maxsize=2)
+def render_page_header(static_serving: bool) -> Optional[str]:
+    """Render the page CSS and logo, or None if the logo file is missing.
+
+    With static serving the browser fetches the logo once from app/static;
+    otherwise it is inlined as a data URI.
+    """
+    logo_path = STATIC_DIR / LOGO_FILENAME
+    if not logo_path.exists():
+        return None
+    if static_serving:
+        logo_src = f"app/static/{LOGO_FILENAME}"
+    else:
+        with open(logo_path, "rb") as img_file:
+            logo_src = f"data:image/png;base64,{base64.b64encode(img_file.read()).decode()}"
+    
+    return PAGE_CSS + f"""
+    <div class="logo-container">
+        <img class="logo-image" 
+             src="{logo_src}" 
+             alt="HILM Logo"
+        >
+    </div>
+    """
+
 def render_task_card(task):
     """Render a single task card using the task configuration"""
+    card_html = _task_card_html.get(task['title'])
+    if card_html is None:
+        card_html = _task_card_html[task['title']] = _render_task_card(task)
+    return card_html
+
+def _render_task_card(task) -> str:
     # Generate the tags HTML first
     tags_html = []
     for tag in task['tags']:
@@ -17,8 +101,6 @@ def render_task_card(task):
         <div style='display: flex; align-items: center;'>{''.join(tags_html)}</div>
     </div>"""
 
-import html
-
 def render_query_section(problem_text: str) -> str:
     """Render the query section with consistent styling"""
     # Handle different query formats
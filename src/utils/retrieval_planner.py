@@ -0,0 +1,157 @@
+import hashlib
+import json
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from .snowflake_utils import search_service
+from .search_cache import get_search_cache, make_search_key
+from .local_search import LocalSearchResponse
+from .context_packer import query_terms, relevance
+from .metrics import get_metrics
+from ..config.snowflake_config import (
+    COLUMNS, CORTEX_SEARCH_SERVICE_WEBPAGES, NUM_CHUNKS_WEBPAGES, RETRIEVAL_TOP_K_PER_FIELD, DATA_COLLECTION_MAX_WORKERS,
+    RETRIEVAL_MAX_FIELDS_PER_SEARCH, RETRIEVAL_GROUP_MIN_SIMILARITY, RETRIEVAL_MIN_TERM_OVERLAP
+)
+
+logger = logging.getLogger(__name__)
+
+# Reciprocal rank fusion constant; larger values flatten the difference between ranks
+RRF_K = 60
+# Words that say nothing about which chunk answers a field
+STOPWORDS = frozenset("""
+    the and for with from that this these those are was were has have had not but all any each per
+    its into over under than then them they their what which who whom how when where why will would
+    can could should may might must also such only other more most some both between about against
+""".split())
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+def field_query(field: str, details: dict) -> str:
+    """The webpages search query for one data field"""
+    return f"{field} {details['description']}"
+
+def _normalize(text: str) -> str:
+    return _WHITESPACE_PATTERN.sub(" ", text).strip().lower()
+
+def chunk_hash(text: str) -> str:
+    """Content hash of a chunk, ignoring case and whitespace"""
+    return hashlib.sha1(_normalize(text).encode("utf-8")).hexdigest()
+
+def content_terms(text: str) -> set:
+    """Query terms of `text` without stopwords"""
+    return query_terms(text) - STOPWORDS
+
+def group_fields(terms: Dict[str, set], max_fields: int = RETRIEVAL_MAX_FIELDS_PER_SEARCH,
+                 min_similarity: float = RETRIEVAL_GROUP_MIN_SIMILARITY) -> List[List[str]]:
+    """Group related fields for merged searches.
+
+    Each field joins the first group with room whose combined terms overlap
+    its own by at least `min_similarity` (Jaccard), or starts a new group.
+    """
+    groups = []
+    for field, field_terms in terms.items():
+        for group in groups:
+            if len(group["fields"]) >= max_fields:
+                continue
+            union = group["terms"] | field_terms
+            if union and len(group["terms"] & field_terms) / len(union) >= min_similarity:
+                group["fields"].append(field)
+                group["terms"] = union
+                break
+        else:
+            groups.append({"fields": [field], "terms": set(field_terms)})
+    return [group["fields"] for group in groups]
+
+def _search_webpages(query: str, category_value: str, limit: int = NUM_CHUNKS_WEBPAGES) -> List[Dict]:
+    try:
+        response = search_service(CORTEX_SEARCH_SERVICE_WEBPAGES, query, category_value, limit)
+        return json.loads(response.model_dump_json()).get("results", [])
+    except Exception as e:
+        logger.warning("Error retrieving chunks for %r: %s", query, e)
+        return []
+
+def plan_field_retrieval(required_data: Dict, category_value: str, top_k: int = RETRIEVAL_TOP_K_PER_FIELD) -> Dict[str, Optional[Dict]]:
+    """Retrieve context for all data fields from one shared chunk pool.
+
+    Related fields (see `group_fields`) are searched together with one merged
+    query that asks for NUM_CHUNKS_WEBPAGES results per field, so five fields
+    take as few as two searches. The returned chunks are merged and
+    deduplicated by content hash. Each field then gets its `top_k` best unique
+    chunks from the pool, ranked by fusing its group's search rank with the
+    share of the field's non-stopword terms a chunk contains; a chunk found by
+    another group must contain at least RETRIEVAL_MIN_TERM_OVERLAP of them.
+    Each field's context is also cached under its own `field_query`, so a
+    later refinement of that field searches nothing and sees the same chunks.
+    Runs without touching Streamlit session state. Returns {field: context}
+    with context in the search response shape, or None if nothing matched.
+    """
+    queries = {field: field_query(field, details) for field, details in required_data.items()}
+    terms = {field: content_terms(query) for field, query in queries.items()}
+    searches = {}
+    search_of_field = {}
+    for fields in group_fields(terms):
+        merged_query = "; ".join(queries[field] for field in fields)
+        key = _normalize(merged_query)
+        searches.setdefault(key, (merged_query, NUM_CHUNKS_WEBPAGES * len(fields)))
+        for field in fields:
+            search_of_field[field] = key
+
+    with ThreadPoolExecutor(max_workers=DATA_COLLECTION_MAX_WORKERS) as executor:
+        search_results = dict(zip(
+            searches,
+            executor.map(lambda search: _search_webpages(search[0], category_value, search[1]), searches.values())
+        ))
+
+    # Unique chunks in first-seen order, and each search's rank of them
+    pool = {}
+    search_ranks = {}
+    retrieved = 0
+    for search_key, results in search_results.items():
+        ranks = search_ranks[search_key] = {}
+        for result in results:
+            text = result.get("chunk") or ""
+            if not text.strip():
+                continue
+            retrieved += 1
+            digest = chunk_hash(text)
+            pool.setdefault(digest, result)
+            ranks.setdefault(digest, len(ranks))
+
+    planned = {}
+    prompted = 0
+    for field in queries:
+        own_ranks = search_ranks[search_of_field[field]]
+        overlap = {digest: relevance(result["chunk"], terms[field]) for digest, result in pool.items()}
+        candidates = [
+            digest for digest in pool
+            if digest in own_ranks or overlap[digest] >= RETRIEVAL_MIN_TERM_OVERLAP
+        ]
+        lexical_ranks = {
+            digest: rank for rank, digest in enumerate(sorted(candidates, key=lambda digest: -overlap[digest]))
+        }
+        scores = {
+            digest: (1 / (RRF_K + own_ranks[digest]) if digest in own_ranks else 0) + 1 / (RRF_K + lexical_ranks[digest])
+            for digest in candidates
+        }
+        selected = sorted(candidates, key=lambda digest: -scores[digest])[:top_k]
+        planned[field] = {"results": [pool[digest] for digest in selected]} if selected else None
+        prompted += len(selected)
+
+    # Only from merged searches Cortex answered; search_service never caches fallback answers either
+    cache = get_search_cache()
+    for field, context in planned.items():
+        merged_query, limit = searches[search_of_field[field]]
+        if context and make_search_key(CORTEX_SEARCH_SERVICE_WEBPAGES, merged_query, COLUMNS, category_value, limit) in cache:
+            cache.set(
+                make_search_key(CORTEX_SEARCH_SERVICE_WEBPAGES, queries[field], COLUMNS, category_value, NUM_CHUNKS_WEBPAGES),
+                LocalSearchResponse(context["results"])
+            )
+
+    metrics = get_metrics()
+    metrics.increment("retrieval_searches_total", len(searches))
+    metrics.increment("retrieval_searches_saved_total", len(queries) - len(searches))
+    metrics.increment("retrieval_chunks_total", retrieved, kind="retrieved")
+    metrics.increment("retrieval_chunks_total", len(pool), kind="unique")
+    metrics.increment("retrieval_chunks_total", prompted, kind="prompted")
+    return planned
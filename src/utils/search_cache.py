@@ -0,0 +1,68 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+from ..config.snowflake_config import SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_TTL_SECONDS
+
+class TTLCache:
+    """Bounded, thread-safe in-process LRU cache whose entries expire after a TTL"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Whether `key` has a live entry, without counting a hit or miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and time.monotonic() - entry[0] <= self.ttl_seconds
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+def normalize_query(query: str) -> str:
+    """Collapse whitespace and case so trivially different queries share a key"""
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+def make_search_key(service_name: str, query: str, columns: list, category_value: str, limit: int) -> tuple:
+    return (service_name, normalize_query(query), tuple(columns), category_value, limit)
+
+_search_cache = TTLCache(SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_TTL_SECONDS)
+
+def get_search_cache() -> TTLCache:
+    """Get the process-wide Cortex Search result cache"""
+    return _search_cache
@@ -0,0 +1,186 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional, Tuple
+import numpy as np
+from .search_cache import TTLCache
+from .metrics import get_metrics
+from ..config.snowflake_config import (
+    SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_DIR, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES, EMBEDDING_MODEL
+)
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "semantic_cache.sqlite3"
+# In-memory vectors kept for evicted entries before the matrix is rebuilt, as a multiple of max_entries
+STALE_VECTOR_FACTOR = 2
+
+class SemanticCache:
+    """Reuse generated artifacts for business problems that mean the same thing.
+
+    Each entry holds the normalized embedding of a problem statement plus the
+    artifacts generated for it (similar cases, framework sections, data
+    requirements), keyed by model and search category, since the similar
+    cases and everything built from them depend on the category filter.
+    Lookups compute cosine similarity against every stored vector in one
+    matrix product and return the best entry above the threshold. Entries and artifacts are rows in a local SQLite file, so a
+    store writes only its own row and processes sharing the directory pick up
+    each other's entries; vectors added since the last lookup are appended to
+    the in-memory matrix.
+    """
+
+    def __init__(self, directory: str = SEMANTIC_CACHE_DIR, threshold: float = SEMANTIC_CACHE_THRESHOLD, max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES):
+        self.directory = Path(directory)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._vectors = None
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.directory / INDEX_FILE), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                problem TEXT NOT NULL,
+                model TEXT NOT NULL,
+                category TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                updated_at REAL NOT NULL,
+                UNIQUE (problem, model, category)
+            );
+            CREATE TABLE IF NOT EXISTS artifacts (
+                entry_id INTEGER NOT NULL,
+                model TEXT NOT NULL,
+                category TEXT NOT NULL,
+                field TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (entry_id, field)
+            );
+            CREATE INDEX IF NOT EXISTS artifacts_model_field ON artifacts (model, category, field);
+        """)
+        self._conn.commit()
+
+    def _refresh(self):
+        """Append vectors stored since the last refresh, rebuilding once too many are evicted"""
+        if len(self._ids) > self.max_entries * STALE_VECTOR_FACTOR:
+            self._ids = np.zeros(0, dtype=np.int64)
+            self._vectors = None
+        last_id = int(self._ids[-1]) if len(self._ids) else 0
+        rows = self._conn.execute(
+            "SELECT id, vector FROM entries WHERE id > ? ORDER BY id", (last_id,)
+        ).fetchall()
+        if not rows:
+            return
+        vectors = np.stack([np.frombuffer(vector, dtype=np.float32) for _, vector in rows])
+        self._ids = np.concatenate([self._ids, np.array([row[0] for row in rows], dtype=np.int64)])
+        self._vectors = vectors if self._vectors is None else np.vstack([self._vectors, vectors])
+
+    def lookup(self, vector: np.ndarray, field: str, model_name: str, category_value: str) -> Optional[Tuple[Any, float]]:
+        """Return (value, similarity) of the closest entry that has `field`, if similar enough"""
+        with self._lock:
+            self._refresh()
+            if self._vectors is None:
+                return None
+            eligible_ids = [row[0] for row in self._conn.execute(
+                "SELECT entry_id FROM artifacts WHERE model = ? AND category = ? AND field = ?",
+                (model_name, category_value, field)
+            )]
+            eligible = np.isin(self._ids, eligible_ids)
+            if not eligible.any():
+                return None
+            similarities = np.where(eligible, self._vectors @ vector, -1.0)
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            row = self._conn.execute(
+                "SELECT value FROM artifacts WHERE entry_id = ? AND field = ?", (int(self._ids[best]), field)
+            ).fetchone()
+            if row is None:
+                return None
+            return json.loads(row[0]), float(similarities[best])
+
+    def store(self, vector: np.ndarray, problem: str, model_name: str, category_value: str, field: str, value: Any):
+        """Attach a generated artifact to the entry for this exact problem, creating it if needed"""
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO entries (problem, model, category, vector, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (problem, model_name, category_value, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                )
+                created = cursor.rowcount > 0
+                key = (problem, model_name, category_value)
+                if not created:
+                    self._conn.execute(
+                        "UPDATE entries SET updated_at = ? WHERE problem = ? AND model = ? AND category = ?", (now, *key)
+                    )
+                entry_id = self._conn.execute(
+                    "SELECT id FROM entries WHERE problem = ? AND model = ? AND category = ?", key
+                ).fetchone()[0]
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?, ?)",
+                    (entry_id, model_name, category_value, field, json.dumps(value))
+                )
+                if created:
+                    self._evict()
+
+    def _evict(self):
+        """Drop the oldest entries beyond `max_entries`"""
+        row = self._conn.execute(
+            "SELECT id FROM entries ORDER BY id DESC LIMIT 1 OFFSET ?", (self.max_entries,)
+        ).fetchone()
+        if row:
+            self._conn.execute("DELETE FROM artifacts WHERE entry_id <= ?", row)
+            self._conn.execute("DELETE FROM entries WHERE id <= ?", row)
+
+_semantic_cache = None
+_embedding_cache = TTLCache(max_entries=256, ttl_seconds=60 * 60)
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Get the process-wide semantic cache, or None when it is disabled"""
+    global _semantic_cache
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    if _semantic_cache is None:
+        _semantic_cache = SemanticCache()
+    return _semantic_cache
+
+def _problem_vector(session, problem: str) -> np.ndarray:
+    """Embed and L2-normalize a problem statement, memoized per process"""
+    # Imported here to avoid a circular import with snowflake_utils
+    from .snowflake_utils import get_text_embedding
+
+    key = (EMBEDDING_MODEL, problem)
+    vector = _embedding_cache.get(key)
+    if vector is None:
+        vector = np.asarray(get_text_embedding(session, problem), dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1.0
+        _embedding_cache.set(key, vector)
+    return vector
+
+def lookup_semantic_cache(session, problem: str, field: str, model_name: str, category_value: str) -> Optional[Tuple[Any, float]]:
+    """Find a previously generated `field` for a near-identical problem searched in the same category"""
+    cache = get_semantic_cache()
+    if not cache or not problem:
+        return None
+    try:
+        hit = cache.lookup(_problem_vector(session, problem), field, model_name, category_value)
+    except Exception as e:
+        logger.warning("Semantic cache lookup failed for %s: %s", field, e)
+        return None
+    get_metrics().increment("semantic_cache_requests_total", field=field, result="hit" if hit else "miss")
+    return hit
+
+def store_semantic_cache(session, problem: str, field: str, value: Any, model_name: str, category_value: str):
+    """Remember a generated `field` for this problem"""
+    cache = get_semantic_cache()
+    if not cache or not problem or value is None:
+        return
+    try:
+        cache.store(_problem_vector(session, problem), problem, model_name, category_value, field, value)
+    except Exception as e:
+        logger.warning("Semantic cache store failed for %s: %s", field, e)
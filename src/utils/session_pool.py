@@ -0,0 +1,115 @@
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+class SnowflakeSessionPool:
+    """Process-wide pool of Snowpark sessions shared by all Streamlit users.
+
+    Sessions are created lazily up to `size`, handed out with `checkout()` and
+    returned to the pool afterwards. A session that has been idle longer than
+    the health check interval, or whose last checkout raised, is probed with
+    `select 1` and transparently replaced if the probe fails.
+    """
+
+    def __init__(self, session_factory: Callable, size: int, health_check_interval: float, checkout_timeout: float):
+        self._session_factory = session_factory
+        self._size = size
+        self._health_check_interval = health_check_interval
+        self._checkout_timeout = checkout_timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._last_checked = {}
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def _create(self):
+        session = self._session_factory()
+        self._last_checked[id(session)] = time.monotonic()
+        return session
+
+    def _discard(self, session):
+        self._last_checked.pop(id(session), None)
+        try:
+            session.close()
+        except Exception:
+            pass
+
+    def _ensure_healthy(self, session):
+        """Return the session if it answers a probe, otherwise a fresh replacement"""
+        if time.monotonic() - self._last_checked.get(id(session), 0) < self._health_check_interval:
+            return session
+        try:
+            session.sql("select 1").collect()
+            self._last_checked[id(session)] = time.monotonic()
+            return session
+        except Exception as e:
+            logger.warning("Snowflake session failed health check, reconnecting: %s", e)
+            self._discard(session)
+            try:
+                return self._create()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+    def _acquire(self):
+        try:
+            session = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self._size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    return self._create()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            try:
+                session = self._idle.get(timeout=self._checkout_timeout)
+            except queue.Empty:
+                raise TimeoutError(f"No Snowflake session available after {self._checkout_timeout}s")
+        return self._ensure_healthy(session)
+
+    @contextmanager
+    def checkout(self):
+        """Borrow a session for the duration of the block"""
+        session = self._acquire()
+        try:
+            yield session
+        except Exception:
+            # Probe the connection before it is handed out again
+            self._last_checked[id(session)] = 0
+            raise
+        finally:
+            self._idle.put(session)
+
+    def close(self):
+        """Close all idle sessions"""
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(session)
+            with self._lock:
+                self._created -= 1
+
+@contextmanager
+def session_scope(session):
+    """Yield a usable Snowpark session from either a pool or a plain session"""
+    if isinstance(session, SnowflakeSessionPool):
+        with session.checkout() as pooled_session:
+            yield pooled_session
+    else:
+        yield session
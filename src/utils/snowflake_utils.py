@@ -1,51 +1,260 @@
 import streamlit as st
 import time
 import json
+import threading
+import logging
+import requests
+from typing import Callable, Optional
 from snowflake.snowpark import Session
 from snowflake.core import Root
-from ..config.snowflake_config import get_snowflake_config, CORTEX_SEARCH_SERVICE_CONSULTING, CORTEX_SEARCH_SERVICE_WEBPAGES, COLUMNS, NUM_CHUNKS, NUM_CHUNKS_WEBPAGES
+from ..config.snowflake_config import (
+    get_snowflake_config, CORTEX_SEARCH_SERVICE_CONSULTING, CORTEX_SEARCH_SERVICE_WEBPAGES, COLUMNS, NUM_CHUNKS, NUM_CHUNKS_WEBPAGES,
+    DOCS_CHUNKS_TABLE_CONSULTING, DOCS_CHUNK_ORDER_COLUMN, DOCS_FETCH_BATCH_SIZE, LLM_BATCH_SIZE,
+    CORTEX_COMPLETE_ENDPOINT, CORTEX_STREAM_TIMEOUT, STREAM_RENDER_INTERVAL,
+    SNOWFLAKE_POOL_SIZE, SNOWFLAKE_HEALTH_CHECK_INTERVAL, SNOWFLAKE_CHECKOUT_TIMEOUT, LLM_CACHE_MAX_TEMPERATURE,
+    EMBEDDING_MODEL, RETRIEVAL_BACKEND, LOCAL_SEARCH_DENSE_ENABLED, CORTEX_SEARCH_TIMEOUT
+)
+from .session_pool import SnowflakeSessionPool, session_scope
+from .llm_cache import get_llm_cache
+from .search_cache import get_search_cache, make_search_key
+from .document_store import get_document_store, refresh_document_store_if_stale
+from .local_search import get_local_search_service, FallbackSearchService
+from .metrics import get_metrics
 
-# Global variables for Snowflake services
-consulting_svc = None
-webpages_svc = None
-snowflake_session = None  # Add global session variable
+logger = logging.getLogger(__name__)
 
-def init_snowflake_session():
-    """Initialize Snowflake session and services based on environment"""
-    try:
-        global consulting_svc, webpages_svc, snowflake_session
-        
-        # Create new session if not exists
-        if not snowflake_session:
-            snowflake_session = Session.builder.configs(get_snowflake_config()).create()
-        
-        # Initialize Root
-        root = Root(snowflake_session)
+# Process-wide Snowpark session pool and Cortex Search service handles
+_session_pool = None
+_session_pool_lock = threading.Lock()
+_search_services = {}
+_search_services_lock = threading.Lock()
+# Dedicated session the Cortex Search handles are built on; it is never handed out by the pool
+_search_session = None
+_search_session_suspect = False
+_search_session_lock = threading.Lock()
+_warmup_thread = None
+# Optional stand-ins for the real Snowflake connection (see configure_backend)
+_session_factory = None
+_search_service_factory = None
+
+def configure_backend(session_factory: Callable = None, search_service_factory: Callable = None):
+    """Point the app at a different Snowflake backend, e.g. an offline stand-in.
+
+    `session_factory()` must return a Snowpark-like session and
+    `search_service_factory(name)` a Cortex Search-like service. The current
+    pool and service handles are dropped so the next call uses the new
+    factories; calling with no arguments restores the real connection.
+    """
+    global _session_factory, _search_service_factory, _session_pool
+    with _session_pool_lock:
+        _session_factory = session_factory
+        _search_service_factory = search_service_factory
+        if _session_pool is not None:
+            _session_pool.close()
+            _session_pool = None
+    _close_search_session()
+    invalidate_search_services()
+    get_search_cache().clear()
+
+def _register_cache_gauges():
+    """Export cache hit rates alongside the timing metrics"""
+    metrics = get_metrics()
+    metrics.register_gauge("search_cache_hit_rate", lambda: get_search_cache().stats()["hit_rate"])
+    metrics.register_gauge("llm_cache_hit_rate", lambda: get_llm_cache().stats()["hit_rate"] if get_llm_cache() else None)
+
+_register_cache_gauges()
+
+def create_snowflake_session():
+    """Create a new Snowpark session from the app configuration"""
+    with get_metrics().span("snowflake_login"):
+        if _session_factory:
+            return _session_factory()
+        return Session.builder.configs(get_snowflake_config()).create()
+
+def get_session_pool() -> SnowflakeSessionPool:
+    """Get the process-wide session pool, connecting on first use"""
+    global _session_pool
+    with _session_pool_lock:
+        if _session_pool is None:
+            pool = SnowflakeSessionPool(
+                create_snowflake_session,
+                size=SNOWFLAKE_POOL_SIZE,
+                health_check_interval=SNOWFLAKE_HEALTH_CHECK_INTERVAL,
+                checkout_timeout=SNOWFLAKE_CHECKOUT_TIMEOUT
+            )
+            # Open the first connection eagerly so login failures surface here
+            with pool.checkout():
+                pass
+            _session_pool = pool
+        return _session_pool
+
+def get_search_service(name: str):
+    """Get the search service for `name` from the configured retrieval backend, resolved once per process"""
+    with _search_services_lock:
+        service = _search_services.get(name)
+    if service is None:
+        # Resolved outside the lock, since it may have to connect first
+        service = _create_search_service(name)
+        with _search_services_lock:
+            service = _search_services.setdefault(name, service)
+    return service
+
+def _get_search_session():
+    """The session Cortex Search handles are built on, replaced if a failed search left it dead.
+
+    Handles keep using the session they were built on for every search, so it
+    is owned here rather than borrowed from the pool, where other requests
+    would check it out while the handles use it.
+    """
+    global _search_session, _search_session_suspect
+    with _search_session_lock:
+        if _search_session is not None and _search_session_suspect:
+            try:
+                _search_session.sql("select 1").collect()
+            except Exception as e:
+                logger.warning("Cortex Search session failed health check, reconnecting: %s", e)
+                _close_search_session_locked()
+                invalidate_search_services()
+        _search_session_suspect = False
+        if _search_session is None:
+            _search_session = create_snowflake_session()
+        return _search_session
+
+def _close_search_session_locked():
+    global _search_session
+    if _search_session is not None:
+        try:
+            _search_session.close()
+        except Exception:
+            pass
+        _search_session = None
+
+def _close_search_session():
+    with _search_session_lock:
+        _close_search_session_locked()
+
+def _create_search_service(name: str):
+    local = None
+    if RETRIEVAL_BACKEND in ("local", "auto"):
+        embed_query = (lambda text: get_text_embedding(None, text)) if LOCAL_SEARCH_DENSE_ENABLED else None
+        local = get_local_search_service(name, embed_query)
+        if RETRIEVAL_BACKEND == "local" and local:
+            return local
+        if not local:
+            logger.info("No local search index for %s, using Cortex Search only", name)
+    
+    if _search_service_factory:
+        cortex = _search_service_factory(name)
+    else:
+        root = Root(_get_search_session())
         db = root.databases[get_snowflake_config()['database']]
         schema = db.schemas[get_snowflake_config()['schema']]
+        cortex = schema.cortex_search_services[name]
+    if not local:
+        return cortex
+    return FallbackSearchService(cortex, local, CORTEX_SEARCH_TIMEOUT, on_primary_error=lambda: _invalidate_search_service(name))
+
+def _invalidate_search_service(name: str):
+    """Drop the handle for one service after a failed search, so it is rebuilt on the next one.
+
+    The search session is probed before that rebuild, in case it was the
+    session rather than the handle that failed.
+    """
+    global _search_session_suspect
+    with _search_services_lock:
+        _search_services.pop(name, None)
+    _search_session_suspect = True
+
+def invalidate_search_services():
+    """Drop cached service handles so they are rebuilt on the next search"""
+    with _search_services_lock:
+        _search_services.clear()
+
+def start_snowflake_warmup():
+    """Connect to Snowflake in the background, once per process.
+
+    Callers that need a session still go through get_session_pool, which
+    waits on the pool lock until the warm-up connection is ready.
+    """
+    global _warmup_thread
+    with _session_pool_lock:
+        if _warmup_thread is not None or _session_pool is not None:
+            return
+        _warmup_thread = threading.Thread(target=_warm_up_snowflake, name="snowflake-warmup", daemon=True)
+        _warmup_thread.start()
+
+def _warm_up_snowflake():
+    try:
+        pool = get_session_pool()
+        get_search_service(CORTEX_SEARCH_SERVICE_CONSULTING)
+        get_search_service(CORTEX_SEARCH_SERVICE_WEBPAGES)
+        refresh_document_store_if_stale(pool)
+    except Exception as e:
+        # The first handler that needs a session retries and reports the error
+        logger.warning("Snowflake warm-up failed: %s", e)
+
+def init_snowflake_session():
+    """Initialize the shared Snowflake session pool and search services"""
+    try:
+        pool = get_session_pool()
+        get_search_service(CORTEX_SEARCH_SERVICE_CONSULTING)
+        get_search_service(CORTEX_SEARCH_SERVICE_WEBPAGES)
         
-        # Initialize both Cortex Search services
-        consulting_svc = schema.cortex_search_services[CORTEX_SEARCH_SERVICE_CONSULTING]
-        webpages_svc = schema.cortex_search_services[CORTEX_SEARCH_SERVICE_WEBPAGES]
+        # Keep the optional local document snapshot up to date
+        refresh_document_store_if_stale(pool)
         
-        return snowflake_session
+        return pool
     except Exception as e:
         st.error(f"Failed to initialize Snowflake session: {str(e)}")
         return None
 
 
-def get_similar_cases(query: str) -> dict:
+def search_service(service_name: str, query: str, category_value: str, limit: int):
+    """Run a Cortex Search query, reusing recent identical results from the search cache.
+
+    Local answers given in place of a failed or slow Cortex call are not
+    cached, so other sessions keep getting Cortex results.
+    """
+    cache = get_search_cache()
+    key = make_search_key(service_name, query, COLUMNS, category_value, limit)
+    response = cache.get(key)
+    if response is not None:
+        return response
+    
+    svc = get_search_service(service_name)
+    fell_back = False
+    with get_metrics().span("cortex_search", service=service_name, backend=getattr(svc, "backend", "cortex")):
+        if category_value == "ALL":
+            search_kwargs = {"limit": limit}
+        else:
+            search_kwargs = {"filter": {"@eq": {"category": category_value}}, "limit": limit}
+        try:
+            if isinstance(svc, FallbackSearchService):
+                response, answered_by = svc.search_with_backend(query, COLUMNS, **search_kwargs)
+                fell_back = answered_by != "cortex"
+            else:
+                response = svc.search(query, COLUMNS, **search_kwargs)
+        except Exception:
+            _invalidate_search_service(service_name)
+            raise
+    
+    if not fell_back:
+        cache.set(key, response)
+    return response
+
+def get_similar_cases(query: str, category_value: str = None) -> dict:
     """Retrieve similar business cases from Snowflake using consulting service"""
     try:
-        if not consulting_svc:
-            st.error("Snowflake consulting service not initialized")
-            return None
-            
-        if st.session_state.get('category_value', "ALL") == "ALL":
-            response = consulting_svc.search(query, COLUMNS, limit=NUM_CHUNKS)
-        else:
-            filter_obj = {"@eq": {"category": st.session_state.category_value}}
-            response = consulting_svc.search(query, COLUMNS, filter=filter_obj, limit=NUM_CHUNKS)
+        # Background warm-up has no session state, so callers may pass the filter explicitly
+        if category_value is None:
+            category_value = st.session_state.get('category_value', "ALL")
+        
+        response = search_service(
+            CORTEX_SEARCH_SERVICE_CONSULTING,
+            query,
+            category_value,
+            NUM_CHUNKS
+        )
         
         raw_json = response.model_dump_json()
         search_results = json.loads(raw_json)
@@ -54,83 +263,274 @@ def get_similar_cases(query: str) -> dict:
         if not search_results or "results" not in search_results:
             return similar_cases
         
-        unique_paths = set([result["relative_path"] for result in search_results["results"]])
-        
+        # Keep search rank order so the prompt context is stable across runs
+        unique_paths = list(dict.fromkeys(result["relative_path"] for result in search_results["results"]))
+        documents = get_local_documents(unique_paths)
+        missing_paths = [path for path in unique_paths if path not in documents]
+        if missing_paths:
+            documents.update(fetch_full_documents(get_session_pool(), missing_paths))
+
         for path in unique_paths:
-            doc_query = f"""
-            SELECT LISTAGG(CHUNK, '\n\n') as FULL_DOCUMENT
-            FROM CC_QUICKSTART_CORTEX_SEARCH_DOCS.DATA.DOCS_CHUNKS_TABLE_CONSULTING
-            WHERE RELATIVE_PATH = '{path}'
-            GROUP BY RELATIVE_PATH
-            """
-            
-            result = snowflake_session.sql(doc_query).collect()
-            doc_result = result[0] if result else None
-            
-            if doc_result:
+            if path in documents:
                 similar_cases["results"].append({
                     "relative_path": path,
-                    "content": doc_result["FULL_DOCUMENT"],
+                    "content": documents[path],
                 })
 
         return similar_cases
-            
+
     except Exception as e:
         st.write(f"Error in get_similar_cases: {str(e)}")
         return None
 
-def get_webpages_data(query: str) -> dict:
+def get_local_documents(paths: list) -> dict:
+    """Resolve documents from the local snapshot, if enabled"""
+    store = get_document_store()
+    if not store:
+        return {}
+    try:
+        return store.get_many(paths)
+    except Exception as e:
+        logger.warning("Error reading local document store: %s", e)
+        return {}
+
+def fetch_full_documents(session, paths: list) -> dict:
+    """Fetch full documents for the given paths with one bound query per batch"""
+    documents = {}
+    order_clause = f" WITHIN GROUP (ORDER BY {DOCS_CHUNK_ORDER_COLUMN})" if DOCS_CHUNK_ORDER_COLUMN else ""
+
+    for start in range(0, len(paths), DOCS_FETCH_BATCH_SIZE):
+        batch = paths[start:start + DOCS_FETCH_BATCH_SIZE]
+        placeholders = ", ".join("?" for _ in batch)
+        doc_query = f"""
+        SELECT RELATIVE_PATH, LISTAGG(CHUNK, '\n\n'){order_clause} as FULL_DOCUMENT
+        FROM {DOCS_CHUNKS_TABLE_CONSULTING}
+        WHERE RELATIVE_PATH IN ({placeholders})
+        GROUP BY RELATIVE_PATH
+        """
+
+        with get_metrics().span("document_fetch"), session_scope(session) as sf:
+            rows = sf.sql(doc_query, params=batch).collect()
+        for row in rows:
+            documents[row["RELATIVE_PATH"]] = row["FULL_DOCUMENT"]
+            get_metrics().observe_size("document_chars", row["FULL_DOCUMENT"])
+
+    return documents
+
+def get_webpages_data(query: str, category_value: str = None) -> dict:
     """Get similar chunks from webpages search service for data collection"""
     try:
-        if not webpages_svc:
-            st.error("Snowflake webpages service not initialized")
-            return None
-            
-        if st.session_state.get('category_value', "ALL") == "ALL":
-            response = webpages_svc.search(query, COLUMNS, limit=NUM_CHUNKS_WEBPAGES)
-        else:
-            filter_obj = {"@eq": {"category": st.session_state.category_value}}
-            response = webpages_svc.search(query, COLUMNS, filter=filter_obj, limit=NUM_CHUNKS_WEBPAGES)
+        # Worker threads have no session state, so callers may pass the filter explicitly
+        if category_value is None:
+            category_value = st.session_state.get('category_value', "ALL")
         
+        response = search_service(CORTEX_SEARCH_SERVICE_WEBPAGES, query, category_value, NUM_CHUNKS_WEBPAGES)
         return response.json()
     except Exception as e:
         st.error(f"Error retrieving chunks: {str(e)}")
         return None
 
-def get_llm_response(session, prompt: str, temperature: float = 0.7, stream: bool = True):
-    """Get response from Snowflake's LLM with optional RAG"""
+# Completions take the prompt as a chat message and an options object, so the
+# requested temperature reaches Cortex; the result is then a JSON document
+COMPLETE_SQL = "select snowflake.cortex.complete(?, parse_json(?), parse_json(?)) as response"
+
+def _complete_params(model_name: str, prompt: str, temperature: float) -> list:
+    return [model_name, json.dumps([{"role": "user", "content": prompt}]), json.dumps({"temperature": temperature})]
+
+def _completion_text(response) -> Optional[str]:
+    """Text of a COMPLETE / TRY_COMPLETE result called with an options object"""
+    if response is None:
+        return None
+    data = json.loads(response) if isinstance(response, str) else response
+    return data["choices"][0]["messages"]
+
+def _response_cache_for(temperature: float, use_cache: bool):
+    """Return the LLM cache if this request is deterministic enough to reuse"""
+    if not use_cache or temperature > LLM_CACHE_MAX_TEMPERATURE:
+        return None
+    return get_llm_cache()
+
+def get_llm_response(session, prompt: str, temperature: float = 0.7, stream: bool = True, model_name: str = None, use_cache: bool = True):
+    """Get response from Snowflake's LLM with optional RAG.
+
+    Low-temperature responses are served from the persistent LLM cache;
+    pass use_cache=False to force a fresh generation (e.g. refinements).
+    """
     try:
-        cmd = "select snowflake.cortex.complete(?, ?) as response"
-        df_response = session.sql(cmd, params=[st.session_state.model_name, prompt]).collect()
+        model_name = model_name or st.session_state.model_name
+        cache = _response_cache_for(temperature, use_cache)
+        if cache:
+            cached_response = cache.get(model_name, prompt, temperature)
+            if cached_response is not None:
+                return cached_response
+        
+        metrics = get_metrics()
+        metrics.observe_size("prompt_chars", prompt, model=model_name)
+        with metrics.span("llm_complete", model=model_name, mode="stream" if stream else "sql"):
+            if stream:
+                response = stream_response(stream_llm_response(session, prompt, model_name=model_name, temperature=temperature))
+            else:
+                with session_scope(session) as sf:
+                    df_response = sf.sql(COMPLETE_SQL, params=_complete_params(model_name, prompt, temperature)).collect()
+                response = _completion_text(df_response[0].RESPONSE)
+        metrics.observe_size("response_chars", response, model=model_name)
         
-        if stream:
-            return stream_response(df_response[0].RESPONSE)
-        return df_response[0].RESPONSE
+        if cache and response:
+            cache.set(model_name, prompt, temperature, response)
+        return response
             
     except Exception as e:
         st.error(f"Error getting LLM response: {str(e)}")
         return None
 
-def stream_response(response: str):
-    """Stream the response with visual effect"""
+def run_llm_job(job, session, prompt: str, temperature: float, model_name: str, use_cache: bool = True):
+    """Job body that streams a completion into the job's partial output"""
+    cache = _response_cache_for(temperature, use_cache)
+    if cache:
+        cached_response = cache.get(model_name, prompt, temperature)
+        if cached_response is not None:
+            job.append(cached_response)
+            return cached_response
+    
+    metrics = get_metrics()
+    metrics.observe_size("prompt_chars", prompt, model=model_name)
+    with metrics.span("llm_complete", model=model_name, mode="job"):
+        for chunk in stream_llm_response(session, prompt, model_name=model_name, temperature=temperature):
+            if job.cancelled:
+                return None
+            job.append(chunk)
+    
+    response = job.partial_text()
+    metrics.observe_size("response_chars", response, model=model_name)
+    if cache and response:
+        cache.set(model_name, prompt, temperature, response)
+    return response
+
+def get_llm_responses(session, prompts: list, temperature: float = 0.7, model_name: str = None, use_cache: bool = True) -> list:
+    """Get responses for many prompts with one Cortex statement per batch.
+
+    Returns one {"response", "error"} dict per prompt, in input order. Cached
+    prompts are answered locally and left out of the statement.
+    """
+    model_name = model_name or st.session_state.model_name
+    cache = _response_cache_for(temperature, use_cache)
+    results = [{"response": None, "error": None} for _ in prompts]
+    cmd = """
+    select f.index as idx, snowflake.cortex.try_complete(
+        ?, array_construct(object_construct('role', 'user', 'content', f.value::string)), parse_json(?)
+    ) as response
+    from table(flatten(input => parse_json(?))) f
+    order by f.index
+    """
+
+    pending = []
+    for i, prompt in enumerate(prompts):
+        cached_response = cache.get(model_name, prompt, temperature) if cache else None
+        if cached_response is not None:
+            results[i]["response"] = cached_response
+        else:
+            pending.append(i)
+
+    for start in range(0, len(pending), LLM_BATCH_SIZE):
+        indices = pending[start:start + LLM_BATCH_SIZE]
+        batch = [prompts[i] for i in indices]
+        try:
+            with get_metrics().span("llm_batch", model=model_name), session_scope(session) as sf:
+                rows = sf.sql(cmd, params=[model_name, json.dumps({"temperature": temperature}), json.dumps(batch)]).collect()
+            get_metrics().observe("llm_batch_prompts", len(batch), buckets=(1, 2, 5, 10, 25, 50, 100), model=model_name)
+            for row in rows:
+                i = indices[int(row.IDX)]
+                response = _completion_text(row.RESPONSE)
+                if response is None:
+                    results[i]["error"] = "Cortex returned no completion for this prompt"
+                else:
+                    results[i]["response"] = response
+                    if cache:
+                        cache.set(model_name, prompts[i], temperature, response)
+        except Exception as e:
+            for i in indices:
+                results[i]["error"] = str(e)
+
+    return results
+
+def get_text_embedding(session, text: str, model_name: str = EMBEDDING_MODEL) -> list:
+    """Embed text with Cortex EMBED_TEXT_768, using the shared pool if no session is given"""
+    cmd = "select snowflake.cortex.embed_text_768(?, ?) as embedding"
+    with get_metrics().span("embedding", model=model_name), session_scope(session or get_session_pool()) as sf:
+        rows = sf.sql(cmd, params=[model_name, text]).collect()
+    embedding = rows[0].EMBEDDING
+    return json.loads(embedding) if isinstance(embedding, str) else list(embedding)
+
+def stream_llm_response(session, prompt: str, model_name: str = None, temperature: float = 0.7):
+    """Yield completion text chunks as Cortex generates them.
+
+    Uses the Cortex REST completion endpoint with server-sent events on the
+    session's own connection. Falls back to a single SQL completion if the
+    stream cannot be opened.
+    """
+    model_name = model_name or st.session_state.model_name
+    try:
+        # Only the connection's host and token are needed; the HTTP stream
+        # does not tie up the session's SQL channel
+        with session_scope(session) as sf:
+            host = sf.connection.host
+            token = sf.connection.rest.token
+        response = requests.post(
+            f"https://{host}{CORTEX_COMPLETE_ENDPOINT}",
+            json={
+                "model": model_name,
+                "messages": [{"content": prompt}],
+                "temperature": temperature,
+                "stream": True,
+            },
+            headers={
+                "Authorization": f'Snowflake Token="{token}"',
+                "Content-Type": "application/json",
+                "Accept": "application/json, text/event-stream",
+            },
+            stream=True,
+            timeout=CORTEX_STREAM_TIMEOUT,
+        )
+        response.raise_for_status()
+    except Exception as e:
+        logger.warning("Cortex streaming unavailable, falling back to SQL: %s", e)
+        with session_scope(session) as sf:
+            df_response = sf.sql(COMPLETE_SQL, params=_complete_params(model_name, prompt, temperature)).collect()
+        yield _completion_text(df_response[0].RESPONSE)
+        return
+
+    with response:
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            payload = line[len("data:"):].strip()
+            if payload == "[DONE]":
+                break
+            choices = json.loads(payload).get("choices") or [{}]
+            content = choices[0].get("delta", {}).get("content")
+            if content:
+                yield content
+
+def stream_response(chunks) -> str:
+    """Render streamed text chunks, redrawing at most once per render interval"""
     placeholder = st.empty()
-    words = response.split()
-    current_response = ""
+    parts = []
+    last_render = 0.0
     
-    # Stream the response first
-    for word in words:
-        current_response += word + " "
-        formatted_response = f"""
-        <div style="font-size: 1rem; line-height: 1.5;">
-        {current_response}▌
-        </div>
-        <br>
-        """
-        placeholder.markdown(formatted_response, unsafe_allow_html=True)
-        time.sleep(0.01)
+    for chunk in chunks:
+        parts.append(chunk)
+        now = time.monotonic()
+        if now - last_render >= STREAM_RENDER_INTERVAL:
+            placeholder.markdown(f"""
+            <div style="font-size: 1rem; line-height: 1.5;">
+            {"".join(parts)}▌
+            </div>
+            <br>
+            """, unsafe_allow_html=True)
+            last_render = now
     
     # Clear the streaming placeholder
     placeholder.empty()
     
     # Return the response without displaying it again
-    return response 
\ No newline at end of file
+    return "".join(parts)
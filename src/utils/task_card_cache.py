@@ -0,0 +1,216 @@
+import contextlib
+import copy
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+from .snowflake_utils import get_session_pool, get_similar_cases, get_llm_responses
+from .prompt_utils import create_consulting_prompt, split_markdown_sections
+from .discovery_utils import parse_data_requirements
+from ..config.snowflake_config import (
+    MODEL_NAME, TASK_CARD_WARMUP_ENABLED, TASK_CARD_CACHE_PATH, TASK_CARD_REFRESH_SECONDS
+)
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; every process warms its own cards there
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+def task_card_query(task: Dict) -> str:
+    """The problem statement a task card starts research with"""
+    return f"{task['title']}: {task['description']}\nQuery: {task['query']}"
+
+class TaskCardCache:
+    """Precomputed similar cases, framework and data requirements per task card.
+
+    Entries are keyed by a fingerprint of the card's query text, model and
+    category, so editing a card or switching models makes its entry stale
+    instead of serving results for a different question. The cache is a
+    single JSON file, replaced atomically on every write and re-read when
+    another process replaces it. Only the process holding the file lock
+    warms cards; the others pick up what it writes.
+    """
+
+    def __init__(self, path: str = TASK_CARD_CACHE_PATH, refresh_seconds: float = TASK_CARD_REFRESH_SECONDS):
+        # Resolved now, since the warm-up thread writes it later
+        self.path = os.path.abspath(path)
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._entries = self._load()
+
+    @staticmethod
+    def fingerprint(query: str, model_name: str, category_value: str) -> str:
+        key = json.dumps([query, model_name, category_value])
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _file_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load(self) -> Dict[str, Dict]:
+        self._mtime = self._file_mtime()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _reload_if_changed(self):
+        """Pick up entries another process wrote. Caller holds self._lock"""
+        if self._file_mtime() != self._mtime:
+            self._entries = self._load()
+
+    @contextlib.contextmanager
+    def _warmup_lock(self):
+        """Yield True if this process may warm cards, False if another process is already doing it"""
+        if fcntl is None:
+            yield True
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(f"{self.path}.lock", "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save(self):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        # A unique temp file per write, so processes sharing the cache never write to the same one
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, suffix=".tmp", delete=False) as f:
+            json.dump(self._entries, f)
+        try:
+            os.replace(f.name, self.path)
+        except OSError:
+            os.unlink(f.name)
+            raise
+        self._mtime = self._file_mtime()
+
+    def get(self, task: Dict, model_name: str, category_value: str = "ALL") -> Optional[Dict]:
+        """Warmed results for a task card, or None if missing or computed for other inputs.
+
+        Returns a copy, since sessions resolve and edit what they are given.
+        """
+        with self._lock:
+            self._reload_if_changed()
+            entry = self._entries.get(self.fingerprint(task_card_query(task), model_name, category_value))
+            return copy.deepcopy(entry)
+
+    def stale_tasks(self, tasks: List[Dict], model_name: str, category_value: str = "ALL") -> List[Dict]:
+        now = time.time()
+        with self._lock:
+            self._reload_if_changed()
+            return [
+                task for task in tasks
+                if now - self._entries.get(
+                    self.fingerprint(task_card_query(task), model_name, category_value), {}
+                ).get("created_at", 0) > self.refresh_seconds
+            ]
+
+    def warm(self, session, tasks: List[Dict], model_name: str = MODEL_NAME, category_value: str = "ALL") -> int:
+        """Recompute stale task cards, batching their LLM calls. Returns the number warmed"""
+        with self._warmup_lock() as acquired:
+            if not acquired:
+                return 0
+            return self._warm(session, tasks, model_name, category_value)
+
+    def _warm(self, session, tasks: List[Dict], model_name: str, category_value: str) -> int:
+        current = {self.fingerprint(task_card_query(task), model_name, category_value) for task in tasks}
+        tasks = self.stale_tasks(tasks, model_name, category_value)
+        if not tasks:
+            return 0
+        queries = [task_card_query(task) for task in tasks]
+        similar_cases = [get_similar_cases(query, category_value=category_value) for query in queries]
+
+        framework_responses = get_llm_responses(
+            session,
+            [create_consulting_prompt(q, cases, stage="problem_definition", model_name=model_name) for q, cases in zip(queries, similar_cases)],
+            temperature=0.05,
+            model_name=model_name
+        )
+        requirements_responses = get_llm_responses(
+            session,
+            [create_consulting_prompt(q, cases, stage="data_collection", model_name=model_name) for q, cases in zip(queries, similar_cases)],
+            temperature=0.1,
+            model_name=model_name
+        )
+
+        warmed = {}
+        for query, cases, framework, requirements in zip(queries, similar_cases, framework_responses, requirements_responses):
+            if cases is None or not framework["response"]:
+                continue
+            try:
+                framework_sections = split_markdown_sections(framework["response"])
+            except Exception as e:
+                logger.warning("Error parsing warmed framework: %s", e)
+                continue
+            try:
+                required_data = parse_data_requirements(requirements["response"]) if requirements["response"] else None
+            except Exception as e:
+                logger.warning("Error parsing warmed data requirements: %s", e)
+                required_data = None
+            warmed[self.fingerprint(query, model_name, category_value)] = {
+                "similar_cases": cases,
+                "framework_sections": framework_sections,
+                "required_data": required_data,
+                "created_at": time.time(),
+            }
+
+        if warmed:
+            with self._lock:
+                # Merge into what is on disk now, not what this process loaded earlier
+                self._reload_if_changed()
+                self._entries.update(warmed)
+                # Drop entries for cards whose query text or model changed
+                self._entries = {key: entry for key, entry in self._entries.items() if key in current}
+                self._save()
+        return len(warmed)
+
+_task_card_cache = None
+_task_card_cache_lock = threading.Lock()
+_warmup_thread = None
+
+def get_task_card_cache() -> Optional[TaskCardCache]:
+    """Get the process-wide task card cache, or None when warm-up is disabled"""
+    global _task_card_cache
+    if not TASK_CARD_WARMUP_ENABLED:
+        return None
+    with _task_card_cache_lock:
+        if _task_card_cache is None:
+            _task_card_cache = TaskCardCache()
+        return _task_card_cache
+
+def start_task_card_warmup(tasks: List[Dict]):
+    """Keep the task card cache warm from a background thread, once per process"""
+    global _warmup_thread
+    cache = get_task_card_cache()
+    if not cache:
+        return
+    with _task_card_cache_lock:
+        if _warmup_thread is not None:
+            return
+        _warmup_thread = threading.Thread(target=_warm_task_cards, args=(cache, tasks), name="task-card-warmup", daemon=True)
+        _warmup_thread.start()
+
+def _warm_task_cards(cache: TaskCardCache, tasks: List[Dict]):
+    while True:
+        try:
+            if cache.stale_tasks(tasks, MODEL_NAME):
+                cache.warm(get_session_pool(), tasks, MODEL_NAME)
+        except Exception as e:
+            logger.exception("Task card warm-up failed: %s", e)
+        time.sleep(min(cache.refresh_seconds, 60 * 60))
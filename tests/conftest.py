@@ -0,0 +1,15 @@
+import atexit
+import os
+import shutil
+import tempfile
+from src.config import snowflake_config
+
+# Point every on-disk cache, store and metrics file at a scratch directory
+# before the modules that read these settings are imported, so test runs
+# never write under the repository's data/ directory
+_scratch = tempfile.mkdtemp(prefix="consultant-tests-")
+# Registered first, so it runs after the metrics flush at exit
+atexit.register(shutil.rmtree, _scratch, ignore_errors=True)
+for _name, _value in vars(snowflake_config).copy().items():
+    if _name.endswith(("_PATH", "_DIR")) and isinstance(_value, str) and _value.startswith("data/"):
+        setattr(snowflake_config, _name, os.path.join(_scratch, _value))
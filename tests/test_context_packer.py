@@ -0,0 +1,40 @@
+import json
+from src.utils import context_packer
+from src.utils.context_packer import estimate_tokens, pack_context, query_terms, relevance
+
+def results(*texts):
+    return {"results": [{"relative_path": f"doc{i}.md", "chunk": text, "score": 0.5} for i, text in enumerate(texts)]}
+
+def test_relevance_is_the_share_of_query_terms_present():
+    terms = query_terms("Tea market size in Jakarta")
+    assert terms == {"tea", "market", "size", "jakarta"}
+    assert relevance("The Jakarta tea market", terms) == 0.75
+    assert relevance("anything", set()) == 0.0
+
+def test_packing_keeps_only_source_and_text_and_drops_contained_passages(monkeypatch):
+    monkeypatch.setattr(context_packer, "context_budget", lambda model_name=None: 1000)
+    packed, stats = pack_context(results("Tea sales grew.", "tea  SALES grew.", "Tea sales grew. Coffee fell."))
+
+    assert json.loads(packed) == [{"source": "doc2.md", "text": "Tea sales grew. Coffee fell."}]
+    assert stats["passages"] == 1
+    assert stats["saved_tokens"] == stats["original_tokens"] - stats["packed_tokens"] > 0
+
+def test_most_relevant_passages_are_kept_within_the_budget(monkeypatch):
+    monkeypatch.setattr(context_packer, "context_budget", lambda model_name=None: 40)
+    packed, _ = pack_context(results("Coffee prices " * 5, "Jakarta tea market " * 5), query="jakarta tea market")
+
+    passages = json.loads(packed)
+    assert passages[0]["source"] == "doc1.md"
+    assert estimate_tokens(packed) <= 40
+
+def test_a_partly_fitting_passage_is_truncated_at_a_word(monkeypatch):
+    monkeypatch.setattr(context_packer, "context_budget", lambda model_name=None: 200)
+    packed, _ = pack_context(results("word " * 400))
+
+    text = json.loads(packed)[0]["text"]
+    assert text.endswith("word …")
+    assert estimate_tokens(packed) <= 200
+
+def test_empty_context_packs_to_nothing():
+    assert pack_context(None)[0] == ""
+    assert pack_context({"results": []})[0] == "[]"
@@ -0,0 +1,44 @@
+import pytest
+from src.utils import discovery_utils
+from src.utils.discovery_utils import discover_field_values, parse_data_requirements, parse_found_value
+
+def test_parse_found_value_strips_code_fences_and_defaults_metadata():
+    found = parse_found_value('```json\n{"value": "Jakarta"}\n```', {"type": "text"})
+    assert found == {"value": "Jakarta", "source": "N/A", "confidence": "N/A", "explanation": "N/A"}
+
+def test_parse_found_value_takes_the_first_number():
+    found = parse_found_value('{"value": "1,250 units (2023)", "source": "report"}', {"type": "number"})
+    assert found["value"] == 1250.0
+    assert found["source"] == "report"
+
+def test_parse_found_value_rejects_non_numeric_numbers():
+    assert parse_found_value('{"value": "unknown"}', {"type": "number"}) is None
+
+def test_parse_data_requirements_strips_code_fences():
+    assert parse_data_requirements('```json\n{"Market size": {"type": "number"}}\n```') == {"Market size": {"type": "number"}}
+
+def test_discover_field_values_reports_each_field_failure_separately(monkeypatch):
+    def discover_field_value(session, field, details, model_name, category_value):
+        if field == "broken":
+            raise RuntimeError("search failed")
+        return {"value": field}, "raw", None
+
+    monkeypatch.setattr(discovery_utils, "RETRIEVAL_POOL_ENABLED", False)
+    monkeypatch.setattr(discovery_utils, "discover_field_value", discover_field_value)
+    results = {
+        field: (found, error)
+        for field, found, _, error in discover_field_values(None, {"ok": {}, "broken": {}}, "model", "ALL")
+    }
+
+    assert results == {"ok": ({"value": "ok"}, None), "broken": (None, "search failed")}
+
+@pytest.mark.parametrize("pool_enabled", [True, False])
+def test_discover_field_values_uses_planned_contexts_when_pooled(monkeypatch, pool_enabled):
+    calls = []
+    monkeypatch.setattr(discovery_utils, "RETRIEVAL_POOL_ENABLED", pool_enabled)
+    monkeypatch.setattr(discovery_utils, "plan_field_retrieval", lambda required_data, category_value: {"a": {"results": []}})
+    monkeypatch.setattr(discovery_utils, "extract_field_value", lambda *args: calls.append("planned") or (None, None, None))
+    monkeypatch.setattr(discovery_utils, "discover_field_value", lambda *args: calls.append("searched") or (None, None, None))
+
+    list(discover_field_values(None, {"a": {}}, "model", "ALL"))
+    assert calls == ["planned" if pool_enabled else "searched"]
@@ -0,0 +1,49 @@
+from src.utils import snowflake_utils
+from src.utils.document_store import DocumentStore
+
+class FakeRow(dict):
+    pass
+
+class FakeSession:
+    def __init__(self, fingerprints):
+        self.fingerprints = fingerprints
+
+    def sql(self, query, params=None):
+        return self
+
+    def collect(self):
+        return [FakeRow(RELATIVE_PATH=path, FINGERPRINT=value) for path, value in self.fingerprints.items()]
+
+def test_get_many_round_trips_written_documents(tmp_path):
+    store = DocumentStore(tmp_path)
+    store._write({"a.md": "Alpha", "b.md": "Bräu ✓", "empty.md": ""}, {"a.md": "1", "b.md": "2", "empty.md": "3"})
+
+    assert store.get_many(["a.md", "b.md", "empty.md", "missing.md"]) == {"a.md": "Alpha", "b.md": "Bräu ✓", "empty.md": ""}
+    assert store.get("missing.md") is None
+
+def test_other_instances_see_a_refreshed_snapshot(tmp_path):
+    writer, reader = DocumentStore(tmp_path), DocumentStore(tmp_path)
+    writer._write({"a.md": "old"}, {"a.md": "1"})
+    assert reader.get("a.md") == "old"
+
+    writer._write({"a.md": "new content"}, {"a.md": "2"})
+    assert reader.get("a.md") == "new content"
+    assert len(list(tmp_path.glob("documents_*.bin"))) == 1
+
+def test_refresh_fetches_only_changed_paths(tmp_path, monkeypatch):
+    store = DocumentStore(tmp_path)
+    store._write({"same.md": "kept", "changed.md": "old", "gone.md": "bye"}, {"same.md": "1", "changed.md": "1", "gone.md": "1"})
+    fetched = []
+
+    def fetch_full_documents(session, paths):
+        fetched.extend(paths)
+        return {path: f"fresh {path}" for path in paths}
+
+    monkeypatch.setattr(snowflake_utils, "fetch_full_documents", fetch_full_documents)
+    stats = store.refresh(FakeSession({"same.md": "1", "changed.md": "2", "new.md": "1"}))
+
+    assert sorted(fetched) == ["changed.md", "new.md"]
+    assert stats == {"unchanged": 1, "updated": 1, "added": 1, "removed": 1}
+    assert store.get_many(["same.md", "changed.md", "new.md", "gone.md"]) == {
+        "same.md": "kept", "changed.md": "fresh changed.md", "new.md": "fresh new.md"
+    }
@@ -0,0 +1,70 @@
+import threading
+import time
+import pytest
+from src.utils.job_runner import CANCELLED, DONE, FAILED, JobRunner
+
+def wait(job, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not job.finished:
+        assert time.monotonic() < deadline, f"{job.key} did not finish"
+        time.sleep(0.01)
+    return job
+
+@pytest.fixture
+def runner():
+    return JobRunner(max_workers=2, retention_seconds=60)
+
+def test_job_result_and_partial_output(runner):
+    def body(job, words):
+        for word in words:
+            job.append(word)
+        return job.partial_text().upper()
+
+    job = wait(runner.submit("key", body, ["a", "b"]))
+    assert (job.status, job.result, job.partial_text()) == (DONE, "AB", "ab")
+
+def test_same_fingerprint_reuses_the_job(runner):
+    calls = []
+    first = wait(runner.submit("key", lambda job: calls.append(1), fingerprint="f"))
+    assert runner.submit("key", lambda job: calls.append(2), fingerprint="f") is first
+    assert calls == [1]
+
+def test_new_fingerprint_cancels_the_running_job(runner):
+    started, release = threading.Event(), threading.Event()
+
+    def slow(job):
+        started.set()
+        release.wait(5)
+        return "stale"
+
+    old = runner.submit("key", slow, fingerprint="old")
+    started.wait(5)
+    new = runner.submit("key", lambda job: "fresh", fingerprint="new")
+    release.set()
+
+    assert wait(old).status == CANCELLED
+    assert wait(new).result == "fresh"
+    assert runner.get("key") is new
+
+def test_failed_jobs_record_the_error_and_are_retried(runner):
+    failed = wait(runner.submit("key", lambda job: 1 / 0, fingerprint="f"))
+    assert failed.status == FAILED and "division by zero" in failed.error
+
+    retried = runner.submit("key", lambda job: "ok", fingerprint="f")
+    assert retried is not failed and wait(retried).result == "ok"
+
+def test_finished_jobs_are_pruned_after_retention():
+    runner = JobRunner(max_workers=1, retention_seconds=0)
+    job = wait(runner.submit("old", lambda job: None))
+    job.finished_at -= 1
+    runner.submit("other", lambda job: None)
+    assert runner.get("old") is None
+
+def test_discard_cancels_and_forgets_the_job(runner):
+    release = threading.Event()
+    job = runner.submit("key", lambda job: release.wait(5))
+    runner.discard("key")
+    release.set()
+
+    assert runner.get("key") is None
+    assert wait(job).cancelled
@@ -0,0 +1,86 @@
+import json
+import pytest
+from src.utils import llm_cache
+from src.utils.llm_cache import LLMResponseCache
+from src.utils.snowflake_utils import _complete_params, _completion_text
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(llm_cache, "time", clock)
+    return clock
+
+def make_cache(tmp_path, max_bytes=100, ttl_seconds=3600):
+    return LLMResponseCache(str(tmp_path / "llm.sqlite3"), max_bytes=max_bytes, ttl_seconds=ttl_seconds)
+
+def test_entries_are_keyed_on_model_temperature_and_prompt(tmp_path, clock):
+    cache = make_cache(tmp_path)
+    cache.set("model", "prompt", 0.1, "answer")
+
+    assert cache.get("model", "prompt", 0.1) == "answer"
+    assert cache.get("model", "prompt", 0.2) is None
+    assert cache.get("other", "prompt", 0.1) is None
+    assert cache.get("model", "prompt!", 0.1) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 3
+
+def test_replacing_an_entry_counts_only_its_new_size(tmp_path, clock):
+    cache = make_cache(tmp_path)
+    cache.set("model", "prompt", 0.1, "x" * 40)
+    cache.set("model", "prompt", 0.1, "é" * 10)
+
+    assert cache._total_bytes == 20
+    assert cache.stats()["bytes"] == 20
+
+def test_least_recently_used_entries_are_evicted_over_budget(tmp_path, clock):
+    cache = make_cache(tmp_path, max_bytes=100)
+    for prompt in ("a", "b"):
+        cache.set("model", prompt, 0.1, "x" * 40)
+        clock.now += 1
+    assert cache.get("model", "a", 0.1)  # "b" is now the least recently used
+    clock.now += 1
+    cache.set("model", "c", 0.1, "x" * 40)
+
+    assert cache._total_bytes == 80
+    assert cache.get("model", "b", 0.1) is None
+    assert cache.get("model", "a", 0.1) and cache.get("model", "c", 0.1)
+
+def test_eviction_recounts_entries_written_by_other_processes(tmp_path, clock):
+    cache, other = make_cache(tmp_path), make_cache(tmp_path)
+    other.set("model", "a", 0.1, "x" * 60)
+    clock.now += 1
+    cache.set("model", "b", 0.1, "x" * 30)
+    clock.now += 1
+    cache.set("model", "c", 0.1, "x" * 80)
+
+    # 170 bytes are stored although this process only wrote 110
+    assert cache._total_bytes == 80
+    assert cache.get("model", "a", 0.1) is None and cache.get("model", "b", 0.1) is None
+    assert cache.get("model", "c", 0.1)
+
+def test_expired_entries_are_dropped_on_read(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl_seconds=10)
+    cache.set("model", "prompt", 0.1, "answer")
+    clock.now += 11
+
+    assert cache.get("model", "prompt", 0.1) is None
+    assert cache._total_bytes == 0
+    assert cache.stats()["entries"] == 0
+
+def test_completions_send_the_temperature_as_an_option():
+    model, messages, options = _complete_params("model", "prompt", 0.1)
+    assert model == "model"
+    assert json.loads(messages) == [{"role": "user", "content": "prompt"}]
+    assert json.loads(options) == {"temperature": 0.1}
+
+def test_completion_text_reads_the_first_choice():
+    document = json.dumps({"choices": [{"messages": "answer"}], "usage": {}})
+    assert _completion_text(document) == "answer"
+    assert _completion_text(json.loads(document)) == "answer"
+    assert _completion_text(None) is None
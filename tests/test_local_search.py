@@ -0,0 +1,91 @@
+import json
+import threading
+import numpy as np
+import pytest
+from src.utils.local_search import FallbackSearchService, LocalSearchIndex, LocalSearchService
+
+ROWS = [
+    {"chunk": "Tea consumption in Jakarta keeps growing", "relative_path": "tea.html", "category": "Beverages"},
+    {"chunk": "Tea tea tea prices", "relative_path": "prices.html", "category": "Beverages"},
+    {"chunk": "Convenience stores opened across Jakarta", "relative_path": "stores.html", "category": "Retail"},
+    {"chunk": "Coffee chains expand", "relative_path": "coffee.html", "category": "Beverages"},
+]
+
+def paths(response):
+    return [result["relative_path"] for result in json.loads(response.model_dump_json())["results"]]
+
+def test_bm25_ranks_matching_chunks_and_skips_the_rest():
+    index = LocalSearchIndex(ROWS)
+    scores = index.bm25_scores("jakarta tea")
+
+    assert scores[3] == 0
+    assert scores[0] > scores[2] > 0
+    assert paths(index.search("jakarta tea")) == ["tea.html", "prices.html", "stores.html"]
+
+def test_rare_terms_weigh_more_than_common_ones():
+    index = LocalSearchIndex(ROWS)
+    assert paths(index.search("coffee tea", limit=1)) == ["coffee.html"]
+
+def test_category_filters_mask_other_rows():
+    index = LocalSearchIndex(ROWS)
+    assert paths(index.search("jakarta", filter={"@eq": {"category": "Retail"}})) == ["stores.html"]
+    assert paths(index.search("jakarta", filter={"@and": [{"@eq": {"category": "Beverages"}}]})) == ["tea.html"]
+    with pytest.raises(ValueError):
+        index.search("jakarta", filter={"@eq": {"relative_path": "tea.html"}})
+
+def test_results_keep_only_the_requested_columns():
+    results = json.loads(LocalSearchIndex(ROWS).search("coffee", columns=["chunk"]).model_dump_json())["results"]
+    assert results == [{"chunk": "Coffee chains expand"}]
+
+def test_dense_ranking_is_fused_with_bm25():
+    vectors = np.eye(4, dtype=np.float32)
+    index = LocalSearchIndex(ROWS, vectors, embed_query=lambda text: [0, 0, 0, 1])
+
+    # Ranked second by both, tea.html overtakes the top BM25 and top dense results
+    assert paths(index.search("jakarta", limit=4)) == ["tea.html", "stores.html", "coffee.html", "prices.html"]
+    assert paths(index.search("jakarta", dense=False)) == ["stores.html", "tea.html"]
+
+def test_dump_round_trip(tmp_path):
+    with open(tmp_path / "service.jsonl", "w", encoding="utf-8") as f:
+        for row in ROWS:
+            f.write(json.dumps(row) + "\n")
+
+    index = LocalSearchIndex.load(str(tmp_path), "service")
+    assert paths(index.search("coffee")) == ["coffee.html"]
+    assert LocalSearchIndex.load(str(tmp_path), "missing") is None
+
+class FailingService:
+    def search(self, query, columns, **kwargs):
+        raise ConnectionError("search failed")
+
+class SlowService:
+    def __init__(self):
+        self.release = threading.Event()
+
+    def search(self, query, columns, **kwargs):
+        self.release.wait(5)
+        return "cortex answer"
+
+def test_cortex_errors_fall_back_to_the_local_index():
+    errors = []
+    local = LocalSearchService("service", LocalSearchIndex(ROWS))
+    service = FallbackSearchService(FailingService(), local, timeout=5, on_primary_error=lambda: errors.append(1))
+
+    response, backend = service.search_with_backend("coffee", ["relative_path"])
+    assert (paths(response), backend, errors) == (["coffee.html"], "local", [1])
+
+def test_slow_cortex_calls_fall_back_after_the_timeout():
+    slow = SlowService()
+    service = FallbackSearchService(slow, LocalSearchService("service", LocalSearchIndex(ROWS)), timeout=0.05)
+    try:
+        assert service.search_with_backend("coffee", ["relative_path"])[1] == "local"
+    finally:
+        slow.release.set()
+
+def test_cortex_answers_when_healthy():
+    class Healthy:
+        def search(self, query, columns, **kwargs):
+            return "cortex answer"
+
+    service = FallbackSearchService(Healthy(), LocalSearchService("service", LocalSearchIndex(ROWS)), timeout=5)
+    assert service.search_with_backend("coffee", ["relative_path"]) == ("cortex answer", "cortex")
@@ -0,0 +1,75 @@
+import json
+import math
+import pytest
+from src.utils import metrics
+from src.utils.metrics import Histogram, MetricsRegistry
+
+def make_registry(tmp_path, **kwargs):
+    return MetricsRegistry(log_path=str(tmp_path / "events.jsonl"), prometheus_path=None, **kwargs)
+
+def test_quantile_is_the_upper_bound_of_the_bucket_holding_the_rank():
+    histogram = Histogram((1, 2, 5))
+    for value in (0.5, 1, 1.5, 2, 4):
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 2, 1, 0]
+    assert histogram.quantile(0.4) == 1
+    assert histogram.quantile(0.5) == 2
+    assert histogram.quantile(0.95) == 5
+    assert (histogram.count, histogram.sum) == (5, 9.0)
+
+def test_quantile_beyond_the_last_bucket_is_infinite():
+    histogram = Histogram((1,))
+    histogram.observe(10)
+    assert math.isinf(histogram.quantile(0.5))
+    assert Histogram((1,)).quantile(0.5) is None
+
+def test_spans_count_by_status_and_time_the_block(tmp_path):
+    registry = make_registry(tmp_path)
+    with registry.span("search", service="web"):
+        pass
+    with pytest.raises(ValueError):
+        with registry.span("search", service="web"):
+            raise ValueError("failed")
+
+    snapshot = registry.snapshot()
+    counts = {entry["labels"]["status"]: entry["value"] for entry in snapshot["counters"]["search_total"]}
+    assert counts == {"ok": 1, "error": 1}
+    assert snapshot["histograms"]["search_duration_seconds"][0]["count"] == 2
+
+def test_log_path_is_resolved_when_the_registry_is_created(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    registry = MetricsRegistry(log_path="metrics/events.jsonl", prometheus_path=None)
+    registry._log({"event": "test"})
+    monkeypatch.chdir(tmp_path.parent)
+    registry.flush_log()
+
+    events = (tmp_path / "metrics" / "events.jsonl").read_text().splitlines()
+    assert json.loads(events[0])["event"] == "test"
+
+def test_full_logs_are_rotated(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_LOG_MAX_BYTES", 1)
+    monkeypatch.setattr(metrics, "METRICS_LOG_BACKUPS", 2)
+    registry = make_registry(tmp_path)
+    for i in range(4):
+        registry._log({"event": i})
+        registry.flush_log()
+
+    assert [json.loads((tmp_path / name).read_text())["event"] for name in ("events.jsonl", "events.jsonl.1", "events.jsonl.2")] == [3, 2, 1]
+    assert not (tmp_path / "events.jsonl.3").exists()
+
+def test_prometheus_text_has_cumulative_buckets_escaped_labels_and_gauges(tmp_path):
+    registry = make_registry(tmp_path)
+    registry.increment("requests_total", kind='say "hi"')
+    registry.observe("latency_seconds", 0.02, buckets=(0.01, 0.05))
+    registry.observe("latency_seconds", 0.5, buckets=(0.01, 0.05))
+    registry.register_gauge("hit_rate", lambda: 0.25)
+    registry.register_gauge("broken", lambda: 1 / 0)
+
+    text = registry.prometheus_text()
+    assert 'consultant_requests_total{kind="say \\"hi\\""} 1' in text
+    assert 'consultant_latency_seconds_bucket{le="0.01"} 0' in text
+    assert 'consultant_latency_seconds_bucket{le="0.05"} 1' in text
+    assert 'consultant_latency_seconds_bucket{le="+Inf"} 2' in text
+    assert "consultant_hit_rate 0.25" in text
+    assert "broken" not in text
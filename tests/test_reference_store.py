@@ -0,0 +1,70 @@
+import pytest
+from src.utils import reference_store, snowflake_utils
+from src.utils.reference_store import (
+    ReferenceStore, document_ref_hashes, get_reference_store, resolve_document_refs, to_document_refs
+)
+
+@pytest.fixture
+def store(monkeypatch):
+    store = ReferenceStore(max_bytes=100)
+    monkeypatch.setattr(reference_store, "_reference_store", store)
+    return store
+
+def test_identical_content_is_stored_once(store):
+    first = store.put("same text")
+    assert store.put("same text") == first
+    assert store.stats() == {"documents": 1, "bytes": 9, "referenced": 0}
+
+def test_size_is_counted_in_utf8_bytes(store):
+    store.put("é" * 10)
+    assert store.stats()["bytes"] == 20
+
+def test_unreferenced_documents_are_evicted_before_referenced_ones(store):
+    held = store.put("a" * 40)
+    store.acquire([held])
+    loose = store.put("b" * 40)
+    newest = store.put("c" * 40)
+
+    assert store.get(loose) is None
+    assert store.get(held) and store.get(newest)
+
+def test_referenced_documents_are_evicted_least_recently_used_first(store):
+    first, second = store.put("a" * 40), store.put("b" * 40)
+    store.acquire([first, second])
+    store.get(first)
+    third = ReferenceStore.content_hash("c" * 40)
+    store.acquire([third])
+    store.put("c" * 40)
+
+    assert store.get(second) is None
+    assert store.get(first) and store.get(third)
+
+def test_documents_stay_referenced_until_every_holder_releases(store):
+    content_hash = store.put("a" * 60)
+    store.acquire([content_hash])
+    store.acquire([content_hash])
+    store.release([content_hash])
+    other = store.put("b" * 60)
+    assert store.get(other) is None
+
+    store.release([content_hash])
+    assert store.stats()["referenced"] == 0
+    assert store.put("c" * 60) and store.get(content_hash) is None
+
+def test_refs_keep_paths_and_hashes_only(store):
+    refs = to_document_refs({"results": [{"relative_path": "a.md", "content": "Alpha", "score": 1}]})
+    assert refs == {"results": [{"relative_path": "a.md", "content_hash": ReferenceStore.content_hash("Alpha")}]}
+    assert document_ref_hashes(refs) == [ReferenceStore.content_hash("Alpha")]
+    assert resolve_document_refs(refs) == {"results": [{"relative_path": "a.md", "content": "Alpha"}]}
+
+def test_resolving_reloads_dropped_documents_and_rewrites_changed_hashes(store, monkeypatch):
+    refs = to_document_refs({"results": [{"relative_path": "a.md", "content": "a" * 60}]})
+    store.put("b" * 60)
+    assert store.get(document_ref_hashes(refs)[0]) is None
+
+    monkeypatch.setattr(snowflake_utils, "get_local_documents", lambda paths: {path: "updated" for path in paths})
+    resolved = resolve_document_refs(refs)
+
+    assert resolved == {"results": [{"relative_path": "a.md", "content": "updated"}]}
+    assert document_ref_hashes(refs) == [ReferenceStore.content_hash("updated")]
+    assert get_reference_store().get(document_ref_hashes(refs)[0]) == "updated"
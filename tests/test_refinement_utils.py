@@ -0,0 +1,45 @@
+import pytest
+from src.utils import refinement_utils
+from src.utils.refinement_utils import refine_sections
+
+SECTIONS = [
+    {"key": "regenerated_section_0", "title": "Market", "content": "Tea market", "comment": "Add numbers"},
+    {"key": "regenerated_section_1", "title": "Risks", "content": "Unknown risks", "comment": "Be specific"},
+]
+
+@pytest.fixture
+def batches(monkeypatch):
+    batches = []
+
+    def get_llm_responses(session, prompts, temperature=0.7, model_name=None, use_cache=True):
+        batches.append({"prompts": prompts, "use_cache": use_cache})
+        return [
+            {"response": None, "error": "LLM failed"} if "Risks" in prompt else {"response": f"refined {i}", "error": None}
+            for i, prompt in enumerate(prompts)
+        ]
+
+    monkeypatch.setattr(refinement_utils, "get_llm_responses", get_llm_responses)
+    monkeypatch.setattr(
+        refinement_utils, "create_refinement_prompt",
+        lambda title, content, comment, rag_context=None, model_name=None: f"{title}|{rag_context}"
+    )
+    return batches
+
+def test_all_sections_go_out_in_one_uncached_batch(batches):
+    results = refine_sections(None, SECTIONS, "model", "ALL")
+
+    assert len(batches) == 1 and not batches[0]["use_cache"]
+    assert results == {
+        "regenerated_section_0": ("refined 0", None),
+        "regenerated_section_1": (None, "LLM failed"),
+    }
+
+def test_sections_without_research_context_are_skipped_with_rag(batches, monkeypatch):
+    contexts = {"Tea market": '{"results": []}', "Unknown risks": None}
+    monkeypatch.setattr(refinement_utils, "get_webpages_data", lambda query, category_value=None: contexts[query])
+
+    results = refine_sections(None, SECTIONS, "model", "Retail", use_rag=True)
+
+    assert batches[0]["prompts"] == ['Market|{"results": []}']
+    assert results["regenerated_section_1"] == (None, "No research context found")
+    assert results["regenerated_section_0"] == ("refined 0", None)
@@ -0,0 +1,107 @@
+import json
+import pytest
+from src.utils import retrieval_planner
+from src.utils.retrieval_planner import chunk_hash, content_terms, field_query, group_fields, plan_field_retrieval
+from src.utils.search_cache import get_search_cache, make_search_key
+from src.utils.snowflake_utils import search_service
+from src.config.snowflake_config import COLUMNS, CORTEX_SEARCH_SERVICE_WEBPAGES, NUM_CHUNKS_WEBPAGES
+
+REQUIRED_DATA = {
+    "Market size": {"description": "total tea market revenue in Jakarta"},
+    "Market growth": {"description": "annual tea market revenue growth in Jakarta"},
+    "Store count": {"description": "number of convenience stores"},
+}
+
+class FakeResponse:
+    def __init__(self, results):
+        self.results = results
+
+    def model_dump_json(self):
+        return json.dumps({"results": self.results})
+
+class FakeSearch:
+    """Stands in for snowflake_utils.search_service, caching answers unless they fell back"""
+
+    def __init__(self):
+        self.queries = []
+        self.fell_back = False
+
+    def __call__(self, service_name, query, category_value, limit):
+        self.queries.append((query, limit))
+        texts = []
+        if "tea" in query:
+            texts += ["Jakarta tea market revenue reached 5 trillion rupiah", "Annual tea market revenue growth was 8%"]
+        if "stores" in query:
+            texts += ["Jakarta has 9,000 convenience stores", "jakarta tea market revenue  reached 5 TRILLION rupiah"]
+        response = FakeResponse([{"chunk": text, "relative_path": "page.html"} for text in texts])
+        if not self.fell_back:
+            get_search_cache().set(make_search_key(service_name, query, COLUMNS, category_value, limit), response)
+        return response
+
+@pytest.fixture
+def search(monkeypatch):
+    search = FakeSearch()
+    monkeypatch.setattr(retrieval_planner, "search_service", search)
+    get_search_cache().clear()
+    yield search
+    get_search_cache().clear()
+
+def test_chunk_hash_ignores_case_and_whitespace():
+    assert chunk_hash("Tea  Market\n") == chunk_hash("tea market")
+
+def test_content_terms_drop_stopwords():
+    assert content_terms("What is the size of the tea market") == {"size", "tea", "market"}
+
+def test_related_fields_are_grouped_up_to_the_limit():
+    terms = {
+        "a": {"tea", "market", "revenue"},
+        "b": {"tea", "market", "growth"},
+        "c": {"convenience", "stores"},
+        "d": {"tea", "market", "share"},
+    }
+    assert group_fields(terms, max_fields=2, min_similarity=0.4) == [["a", "b"], ["c"], ["d"]]
+    assert group_fields(terms, max_fields=5, min_similarity=0.4) == [["a", "b", "d"], ["c"]]
+    assert group_fields(terms, max_fields=5, min_similarity=1.0) == [["a"], ["b"], ["c"], ["d"]]
+
+def test_grouped_fields_share_one_merged_search(search, monkeypatch):
+    monkeypatch.setattr(retrieval_planner, "group_fields", lambda terms: [["Market size", "Market growth"], ["Store count"]])
+    plan_field_retrieval(REQUIRED_DATA, "ALL")
+
+    merged = "; ".join(field_query(field, REQUIRED_DATA[field]) for field in ("Market size", "Market growth"))
+    assert sorted(search.queries) == sorted([
+        (merged, NUM_CHUNKS_WEBPAGES * 2),
+        (field_query("Store count", REQUIRED_DATA["Store count"]), NUM_CHUNKS_WEBPAGES),
+    ])
+
+def test_fields_get_deduplicated_chunks_ranked_for_them(search, monkeypatch):
+    monkeypatch.setattr(retrieval_planner, "group_fields", lambda terms: [["Market size", "Market growth"], ["Store count"]])
+    planned = plan_field_retrieval(REQUIRED_DATA, "ALL", top_k=3)
+
+    def texts(field):
+        return [result["chunk"] for result in planned[field]["results"]]
+
+    market = {"Jakarta tea market revenue reached 5 trillion rupiah", "Annual tea market revenue growth was 8%"}
+    # The store chunk shares too few terms with the market fields to join them
+    assert set(texts("Market size")) == set(texts("Market growth")) == market
+    # The duplicate market chunk its own search found stays, ranked below the store chunk
+    assert texts("Store count") == ["Jakarta has 9,000 convenience stores", "Jakarta tea market revenue reached 5 trillion rupiah"]
+
+def refinement_search(field):
+    return search_service(CORTEX_SEARCH_SERVICE_WEBPAGES, field_query(field, REQUIRED_DATA[field]), "ALL", NUM_CHUNKS_WEBPAGES)
+
+def test_planned_fields_are_cached_for_refinement(search, monkeypatch):
+    monkeypatch.setattr(retrieval_planner, "group_fields", lambda terms: [list(terms)])
+    planned = plan_field_retrieval(REQUIRED_DATA, "ALL")
+
+    assert len(search.queries) == 1
+    for field in REQUIRED_DATA:
+        assert json.loads(refinement_search(field).model_dump_json()) == planned[field]
+    assert len(search.queries) == 1
+
+def test_fallback_answers_are_not_cached_per_field(search, monkeypatch):
+    monkeypatch.setattr(retrieval_planner, "group_fields", lambda terms: [list(terms)])
+    search.fell_back = True
+    plan_field_retrieval(REQUIRED_DATA, "ALL")
+
+    key = make_search_key(CORTEX_SEARCH_SERVICE_WEBPAGES, field_query("Market size", REQUIRED_DATA["Market size"]), COLUMNS, "ALL", NUM_CHUNKS_WEBPAGES)
+    assert key not in get_search_cache()
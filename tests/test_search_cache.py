@@ -0,0 +1,71 @@
+import pytest
+from src.utils import search_cache, snowflake_utils
+from src.utils.search_cache import TTLCache, make_search_key
+from src.utils.snowflake_utils import configure_backend, get_search_service, search_service
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(search_cache, "time", clock)
+    return clock
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = TTLCache(max_entries=10, ttl_seconds=5)
+    cache.set("key", "value")
+    clock.now = 5
+    assert cache.get("key") == "value"
+    clock.now = 5.1
+    assert cache.get("key") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 0}
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = TTLCache(max_entries=2, ttl_seconds=5)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+def test_contains_checks_expiry_without_counting_a_lookup(clock):
+    cache = TTLCache(max_entries=10, ttl_seconds=5)
+    cache.set("key", "value")
+    assert "key" in cache
+    clock.now = 6
+    assert "key" not in cache
+    assert cache.stats()["hits"] == cache.stats()["misses"] == 0
+
+def test_search_keys_ignore_case_and_whitespace_but_not_filters():
+    key = make_search_key("service", "Market  size\n", ["chunk"], "ALL", 5)
+    assert key == make_search_key("service", "market size", ["chunk"], "ALL", 5)
+    assert key != make_search_key("service", "market size", ["chunk"], "Retail", 5)
+    assert key != make_search_key("service", "market size", ["chunk"], "ALL", 7)
+
+class FakeSearchService:
+    def __init__(self):
+        self.queries = []
+
+    def search(self, query, columns, filter=None, limit=10):
+        self.queries.append((query, filter, limit))
+        return {"query": query}
+
+def test_search_service_reuses_cached_results(monkeypatch):
+    monkeypatch.setattr(snowflake_utils, "RETRIEVAL_BACKEND", "cortex")
+    configure_backend(lambda: None, lambda name: FakeSearchService())
+    try:
+        first = search_service("a", "Market  size", "ALL", 5)
+        assert search_service("a", "market size", "ALL", 5) is first
+        search_service("a", "market size", "Retail", 5)
+        assert get_search_service("a").queries == [
+            ("Market  size", None, 5),
+            ("market size", {"@eq": {"category": "Retail"}}, 5),
+        ]
+    finally:
+        configure_backend()
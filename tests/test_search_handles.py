@@ -0,0 +1,40 @@
+import pytest
+from src.utils import snowflake_utils
+from src.utils.snowflake_utils import configure_backend, get_search_service, search_service
+
+class FakeSearchService:
+    def __init__(self, name):
+        self.name = name
+        self.fail = False
+
+    def search(self, query, columns, filter=None, limit=10):
+        if self.fail:
+            raise ConnectionError("search failed")
+        return {"query": query, "limit": limit}
+
+@pytest.fixture
+def services(monkeypatch):
+    monkeypatch.setattr(snowflake_utils, "RETRIEVAL_BACKEND", "cortex")
+    built = []
+
+    def factory(name):
+        built.append(FakeSearchService(name))
+        return built[-1]
+
+    configure_backend(lambda: None, factory)
+    yield built
+    configure_backend()
+
+def test_handles_are_built_once_per_service(services):
+    assert get_search_service("a") is get_search_service("a")
+    assert [service.name for service in services] == ["a"]
+
+def test_failed_search_drops_only_that_service(services):
+    failing, other = get_search_service("a"), get_search_service("b")
+    failing.fail = True
+
+    with pytest.raises(ConnectionError):
+        search_service("a", "query", "ALL", 5)
+
+    assert get_search_service("b") is other
+    assert get_search_service("a") is not failing
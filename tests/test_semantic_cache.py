@@ -0,0 +1,58 @@
+import numpy as np
+from src.utils.semantic_cache import SemanticCache
+
+def unit(*components):
+    vector = np.array(components, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+def make_cache(tmp_path, threshold=0.9, max_entries=10):
+    return SemanticCache(tmp_path, threshold=threshold, max_entries=max_entries)
+
+def test_near_duplicate_problems_reuse_artifacts(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.store(unit(1, 0, 0), "Enter the tea market?", "model", "ALL", "framework", [{"title": "Market"}])
+
+    value, similarity = cache.lookup(unit(1, 0.1, 0), "framework", "model", "ALL")
+    assert value == [{"title": "Market"}]
+    assert similarity > 0.99
+    assert cache.lookup(unit(0, 1, 0), "framework", "model", "ALL") is None
+
+def test_lookups_match_model_category_and_field(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.store(unit(1, 0), "problem", "model", "Retail", "framework", "retail framework")
+
+    assert cache.lookup(unit(1, 0), "framework", "model", "Retail")[0] == "retail framework"
+    assert cache.lookup(unit(1, 0), "framework", "model", "ALL") is None
+    assert cache.lookup(unit(1, 0), "framework", "other", "Retail") is None
+    assert cache.lookup(unit(1, 0), "required_data", "model", "Retail") is None
+
+def test_same_problem_in_another_category_is_a_separate_entry(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.store(unit(1, 0), "problem", "model", "Retail", "framework", "retail")
+    cache.store(unit(1, 0), "problem", "model", "Energy", "framework", "energy")
+
+    assert cache.lookup(unit(1, 0), "framework", "model", "Retail")[0] == "retail"
+    assert cache.lookup(unit(1, 0), "framework", "model", "Energy")[0] == "energy"
+
+def test_best_match_wins_among_eligible_entries(tmp_path):
+    cache = make_cache(tmp_path, threshold=0.5)
+    cache.store(unit(1, 0), "close", "model", "ALL", "framework", "close")
+    cache.store(unit(1, 1), "further", "model", "ALL", "framework", "further")
+    cache.store(unit(1, 0.05), "closest, other field", "model", "ALL", "similar_cases", "cases")
+
+    assert cache.lookup(unit(1, 0.05), "framework", "model", "ALL")[0] == "close"
+
+def test_oldest_entries_are_evicted_beyond_max_entries(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2)
+    for i, vector in enumerate([unit(1, 0, 0), unit(0, 1, 0), unit(0, 0, 1)]):
+        cache.store(vector, f"problem {i}", "model", "ALL", "framework", i)
+
+    assert cache.lookup(unit(1, 0, 0), "framework", "model", "ALL") is None
+    assert cache.lookup(unit(0, 0, 1), "framework", "model", "ALL")[0] == 2
+
+def test_entries_stored_by_another_process_are_picked_up(tmp_path):
+    cache, other = make_cache(tmp_path), make_cache(tmp_path)
+    assert cache.lookup(unit(1, 0), "framework", "model", "ALL") is None
+
+    other.store(unit(1, 0), "problem", "model", "ALL", "framework", "shared")
+    assert cache.lookup(unit(1, 0), "framework", "model", "ALL")[0] == "shared"
@@ -0,0 +1,92 @@
+import threading
+import pytest
+from src.utils.session_pool import SnowflakeSessionPool, session_scope
+
+class FakeSession:
+    def __init__(self, number):
+        self.number = number
+        self.healthy = True
+        self.closed = False
+
+    def sql(self, query):
+        return self
+
+    def collect(self):
+        if not self.healthy:
+            raise ConnectionError("connection lost")
+        return [1]
+
+    def close(self):
+        self.closed = True
+
+def make_pool(size=2, health_check_interval=60.0, checkout_timeout=1.0):
+    created = []
+
+    def factory():
+        created.append(FakeSession(len(created) + 1))
+        return created[-1]
+
+    return SnowflakeSessionPool(factory, size, health_check_interval, checkout_timeout), created
+
+def test_checkout_reuses_returned_sessions():
+    pool, created = make_pool()
+    with pool.checkout() as first:
+        pass
+    with pool.checkout() as second:
+        assert second is first
+    assert len(created) == 1
+
+def test_concurrent_checkouts_never_exceed_the_pool_size():
+    pool, created = make_pool(size=1, checkout_timeout=0.05)
+    with pool.checkout():
+        with pytest.raises(TimeoutError):
+            with pool.checkout():
+                pass
+    assert len(created) == 1
+
+def test_waiting_checkout_gets_the_returned_session():
+    pool, created = make_pool(size=1, checkout_timeout=5.0)
+    got = []
+    with pool.checkout() as held:
+        waiter = threading.Thread(target=lambda: got.append(pool._acquire()))
+        waiter.start()
+    waiter.join()
+    assert got == [held]
+
+def test_session_that_raised_is_probed_and_replaced_if_dead():
+    pool, created = make_pool()
+    with pytest.raises(RuntimeError):
+        with pool.checkout() as session:
+            session.healthy = False
+            raise RuntimeError("query failed")
+
+    with pool.checkout() as replacement:
+        assert replacement is not session
+    assert session.closed
+
+def test_session_that_raised_is_kept_if_the_probe_succeeds():
+    pool, created = make_pool()
+    with pytest.raises(RuntimeError):
+        with pool.checkout() as session:
+            raise RuntimeError("bad query")
+
+    with pool.checkout() as again:
+        assert again is session
+    assert len(created) == 1
+
+def test_close_discards_idle_sessions():
+    pool, created = make_pool()
+    with pool.checkout():
+        pass
+    pool.close()
+    assert created[0].closed
+    with pool.checkout() as session:
+        assert session is not created[0]
+
+def test_session_scope_accepts_pools_and_plain_sessions():
+    pool, created = make_pool()
+    plain = FakeSession(0)
+    with session_scope(plain) as session:
+        assert session is plain
+    with session_scope(pool) as session:
+        assert session is created[0]
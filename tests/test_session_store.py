@@ -0,0 +1,92 @@
+import pytest
+from src.models import session_store
+from src.models.session_store import SQLiteSessionStore
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(session_store, "time", clock)
+    return clock
+
+@pytest.fixture
+def store(tmp_path, clock):
+    return SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"), compress_threshold=64)
+
+def stored_rows(store, session_id):
+    return dict(store._conn.execute(
+        "SELECT name, compressed FROM session_fields WHERE session_id = ?", (session_id,)
+    ).fetchall())
+
+def test_fields_round_trip_and_large_values_are_compressed(store):
+    fields = {"stage": "analysis", "collected_data": {"notes": "x" * 500}}
+    store.save("s1", fields)
+
+    assert store.load("s1") == fields
+    assert stored_rows(store, "s1") == {"stage": 0, "collected_data": 1}
+    assert store.load("missing") is None
+
+def test_save_skips_unchanged_fields(store):
+    store.save("s1", {"stage": "welcome", "current_problem": "p"})
+    store._conn.execute("UPDATE session_fields SET value = ? WHERE name = 'current_problem'", (b'"sentinel"',))
+
+    store.save("s1", {"stage": "analysis", "current_problem": "p"})
+    assert store.load("s1") == {"stage": "analysis", "current_problem": "sentinel"}
+
+def test_save_deletes_fields_the_session_no_longer_has(store):
+    store.save("s1", {"stage": "analysis", "regenerated_sections.a": "old"})
+    store.update_field("s1", "regenerated_sections.b", "new")
+    store.save("s1", {"stage": "welcome"})
+
+    assert store.load("s1") == {"stage": "welcome"}
+
+def test_update_field_leaves_other_fields_alone(store):
+    store.save("s1", {"stage": "analysis", "current_problem": "p"})
+    store.update_field("s1", "regenerated_sections.a", "content")
+
+    assert store.load("s1") == {"stage": "analysis", "current_problem": "p", "regenerated_sections.a": "content"}
+
+def test_sessions_are_listed_most_recent_first(store, clock):
+    store.save("old", {"stage": "welcome", "current_problem": "first"})
+    clock.now += 10
+    store.save("new", {"stage": "analysis", "current_problem": "second"})
+
+    listed = store.list_sessions()
+    assert [(s["session_id"], s["stage"], s["current_problem"]) for s in listed] == [
+        ("new", "analysis", "second"), ("old", "welcome", "first")
+    ]
+
+def test_compact_deletes_expired_sessions_with_their_fields(store, clock):
+    store.save("old", {"stage": "welcome"})
+    clock.now += 100
+    store.save("new", {"stage": "welcome"})
+    clock.now += 50
+
+    assert store.compact(ttl_seconds=120) == 1
+    assert store.load("old") is None and stored_rows(store, "old") == {}
+    assert store.load("new") == {"stage": "welcome"}
+
+def test_delete_removes_the_session(store):
+    store.save("s1", {"stage": "welcome"})
+    store.delete("s1")
+    assert store.load("s1") is None
+    assert store.list_sessions() == []
+
+def test_consulting_sessions_resume_with_their_regenerated_sections(store, monkeypatch):
+    from src.models import consulting_session
+    from src.models.consulting_session import ConsultingSession
+
+    monkeypatch.setattr(consulting_session, "get_session_store", lambda: store)
+    session = ConsultingSession(stage="problem_definition", current_problem="p")
+    session.save()
+    session.set_regenerated_section("regenerated_section_0", "better")
+
+    resumed = ConsultingSession.load(session.session_id)
+    assert (resumed.stage, resumed.current_problem) == ("problem_definition", "p")
+    assert resumed.get_regenerated_section("regenerated_section_0") == "better"
@@ -0,0 +1,89 @@
+import time
+import pytest
+from src.utils import task_card_cache
+from src.utils.task_card_cache import TaskCardCache
+
+TASKS = [
+    {"title": "Tea", "description": "Bottled tea", "query": "Enter the tea market?"},
+    {"title": "Coffee", "description": "Coffee chain", "query": "Open more stores?"},
+]
+
+@pytest.fixture
+def backend(monkeypatch):
+    calls = {"searches": 0, "batches": 0}
+
+    def get_similar_cases(query, category_value=None):
+        calls["searches"] += 1
+        return {"results": [{"relative_path": "case.md", "content": query}]}
+
+    def get_llm_responses(session, prompts, temperature=0.7, model_name=None):
+        calls["batches"] += 1
+        if temperature < 0.1:
+            return [{"response": "## Market\nSize the market"} for _ in prompts]
+        return [{"response": '{"Market size": {"type": "number"}}'} for _ in prompts]
+
+    monkeypatch.setattr(task_card_cache, "get_similar_cases", get_similar_cases)
+    monkeypatch.setattr(task_card_cache, "get_llm_responses", get_llm_responses)
+    monkeypatch.setattr(task_card_cache, "create_consulting_prompt", lambda query, cases, **kwargs: query)
+    return calls
+
+def make_cache(tmp_path, refresh_seconds=3600):
+    return TaskCardCache(str(tmp_path / "task_cards.json"), refresh_seconds=refresh_seconds)
+
+def test_warm_batches_stale_cards_and_skips_fresh_ones(tmp_path, backend):
+    cache = make_cache(tmp_path)
+    assert cache.warm(None, TASKS, "model") == 2
+    assert backend == {"searches": 2, "batches": 2}
+
+    assert cache.warm(None, TASKS, "model") == 0
+    assert cache.stale_tasks(TASKS, "other model") == TASKS
+
+    entry = cache.get(TASKS[0], "model")
+    assert entry["similar_cases"]["results"][0]["content"].startswith("Tea")
+    assert entry["required_data"] == {"Market size": {"type": "number"}}
+    assert entry["framework_sections"]
+
+def test_entries_expire_after_the_refresh_interval(tmp_path, backend):
+    cache = make_cache(tmp_path, refresh_seconds=60)
+    cache.warm(None, TASKS, "model")
+    cache._entries[TaskCardCache.fingerprint(task_card_cache.task_card_query(TASKS[0]), "model", "ALL")]["created_at"] -= 61
+    assert cache.stale_tasks(TASKS, "model") == TASKS[:1]
+
+def test_get_returns_a_copy_per_session(tmp_path, backend):
+    cache = make_cache(tmp_path)
+    cache.warm(None, TASKS, "model")
+
+    entry = cache.get(TASKS[0], "model")
+    entry["similar_cases"]["results"].clear()
+    entry["required_data"]["Extra"] = {}
+
+    fresh = cache.get(TASKS[0], "model")
+    assert fresh["similar_cases"]["results"]
+    assert "Extra" not in fresh["required_data"]
+
+def test_entries_written_by_another_process_are_picked_up(tmp_path, backend):
+    reader, writer = make_cache(tmp_path), make_cache(tmp_path)
+    assert reader.get(TASKS[0], "model") is None
+
+    time.sleep(0.01)  # A distinct file mtime
+    writer.warm(None, TASKS, "model")
+    assert reader.stale_tasks(TASKS, "model") == []
+    assert reader.get(TASKS[0], "model") is not None
+
+@pytest.mark.skipif(task_card_cache.fcntl is None, reason="needs fcntl")
+def test_only_one_process_warms_at_a_time(tmp_path, backend):
+    cache, other = make_cache(tmp_path), make_cache(tmp_path)
+    with other._warmup_lock() as acquired:
+        assert acquired
+        assert cache.warm(None, TASKS, "model") == 0
+    assert backend["batches"] == 0
+    assert cache.warm(None, TASKS, "model") == 2
+
+def test_removed_cards_are_dropped_on_the_next_warm(tmp_path, backend):
+    cache = make_cache(tmp_path)
+    cache.warm(None, TASKS, "model")
+    edited = {**TASKS[1], "query": "Close stores?"}
+    cache.warm(None, [TASKS[0], edited], "model")
+
+    assert cache.get(TASKS[1], "model") is None
+    assert cache.get(edited, "model") is not None